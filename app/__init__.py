@@ -4,6 +4,7 @@ from flask_migrate import Migrate
 from flask_login import LoginManager
 from flask_cors import CORS
 from config import Config
+from app.engine import apply_sqlite_pragmas, engine_options
 
 db = SQLAlchemy()
 migrate = Migrate()
@@ -22,8 +23,11 @@ def create_app(config_class=Config):
         }
     })
     
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config)
     db.init_app(app)
-    migrate.init_app(app, db)
+    with app.app_context():
+        apply_sqlite_pragmas(db.engine, app.config.get('SQLITE_PRAGMAS'))
+    migrate.init_app(app, db, render_as_batch=True)
     login_manager.init_app(app)
     login_manager.login_view = 'auth.login'
     login_manager.login_message = 'Please log in to access this page.'
@@ -43,6 +47,11 @@ def create_app(config_class=Config):
     from app.api import bp as api_bp
     app.register_blueprint(api_bp, url_prefix='/api')
     
+    if app.config['METRICS_ENABLED']:
+        from app import metrics
+        with app.app_context():
+            metrics.init_app(app, db.engine)
+    
     return app
 
-from app import models
\ No newline at end of file
+from app import models, search
\ No newline at end of file
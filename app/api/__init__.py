@@ -2,4 +2,4 @@ from flask import Blueprint
 
 bp = Blueprint('api', __name__)
 
-from app.api import routes, routes_campaigns
\ No newline at end of file
+from app.api import routes, routes_campaigns, routes_stats, routes_jobs, routes_search
\ No newline at end of file
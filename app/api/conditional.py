@@ -0,0 +1,29 @@
+import hashlib
+from flask import Response, request
+
+
+def collection_etag(query, serializer):
+    """Strong ETag for what `serializer` would render from `query`.
+
+    Costs one aggregate SELECT (row count and newest updated_at of the
+    collection and of everything it embeds) instead of loading the rows.
+    The request path, query string and Accept header are folded in so each
+    page, field set and format gets its own tag.
+    """
+    state = query.order_by(None).with_entities(*serializer.validators()).one()
+    accept = request.headers.get('Accept', '')
+    raw = '|'.join([request.full_path, accept] + [str(value) for value in state])
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def not_modified(etag):
+    """Empty 304 response when the client's If-None-Match still matches"""
+    if not request.if_none_match.contains(etag):
+        return None
+    return tag_response(Response(status=304), etag)
+
+
+def tag_response(response, etag):
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
@@ -0,0 +1,129 @@
+import json
+from datetime import datetime, timedelta, timezone
+from flask import Response, current_app, jsonify, request, stream_with_context
+from sqlalchemy import select, union
+from app.api.conditional import collection_etag, not_modified, tag_response
+
+NDJSON_MIMETYPE = 'application/x-ndjson'
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+STREAM_BATCH_SIZE = 500
+
+
+class PaginationError(ValueError):
+    """Raised for a malformed ?cursor=, ?limit= or ?updated_since="""
+
+
+def _int_arg(name, minimum):
+    raw = request.args.get(name)
+    if raw is None or raw == '':
+        return None
+    try:
+        value = int(raw)
+    except ValueError:
+        raise PaginationError(f'Invalid {name}: {raw}')
+    if value < minimum:
+        raise PaginationError(f'Invalid {name}: {raw}')
+    return value
+
+
+def updated_since_arg(name='updated_since'):
+    """Parse an ISO 8601 ?updated_since= into a naive UTC datetime, or None"""
+    raw = request.args.get(name)
+    if not raw:
+        return None
+    try:
+        value = datetime.fromisoformat(raw.replace('Z', '+00:00'))
+    except ValueError:
+        raise PaginationError(f'Invalid {name}: {raw}')
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def changed_ids(model, since, via=()):
+    """SELECT of the ids of `model` rows changed at or after `since`.
+
+    A row also counts as changed when a parent row joined through `via`
+    changed. Filtering with `model.id.in_(...)` lets every branch use its own
+    updated_at index, where an OR across a join would scan the whole table.
+    """
+    branches = [select(model.id).where(model.updated_at >= since)]
+    for parent in via:
+        branches.append(select(model.id).join(parent).where(parent.updated_at >= since))
+    return branches[0] if len(branches) == 1 else union(*branches)
+
+
+def wants_ndjson():
+    """True when the client asked for newline-delimited JSON"""
+    best = request.accept_mimetypes.best_match(['application/json', NDJSON_MIMETYPE])
+    return best == NDJSON_MIMETYPE
+
+
+def _stream(query, serializer):
+    try:
+        for row in query.yield_per(STREAM_BATCH_SIZE):
+            yield json.dumps(serializer.dump(row), default=str) + '\n'
+    except Exception as e:
+        # Headers are already sent, so the client only sees a truncated stream
+        current_app.logger.error(f'Error streaming {serializer.model.__name__} rows: {str(e)}')
+        raise
+
+
+def list_response(query, serializer, joined=()):
+    """Render a list endpoint from a filtered, unordered query.
+
+    Rows are ordered by primary key so `?cursor=<last id>` can resume a
+    listing with a keyset filter instead of an OFFSET scan.
+
+    - `Accept: application/x-ndjson` streams one JSON object per line from a
+      server-side cursor, honouring `cursor` and `limit` when given.
+    - `?cursor=` and/or `?limit=` return one page wrapped as
+      `{"items": [...], "next_cursor": "<id>" | null}`.
+    - Otherwise the full list is returned as a bare JSON array, as before.
+
+    Every response carries an ETag; a matching If-None-Match is answered
+    with 304 after a single aggregate query, without loading any rows.
+    `X-Sync-Timestamp`, for use as the next `?updated_since=`, is the time
+    the listing was taken at minus SYNC_OVERLAP seconds: `updated_at` is
+    stamped at flush, so a write flushed before this read and committed
+    after it would otherwise fall behind the timestamp and never be seen.
+    Rows in the overlap come back twice; clients dedupe them by id.
+    """
+    overlap = timedelta(seconds=current_app.config['SYNC_OVERLAP'])
+    synced_at = (datetime.utcnow() - overlap).isoformat()
+    cursor = _int_arg('cursor', 0)
+    limit = _int_arg('limit', 1)
+
+    etag = collection_etag(query, serializer)
+    response = not_modified(etag)
+    if response is None:
+        response = _render(query, serializer, joined, cursor, limit)
+        tag_response(response, etag)
+    response.headers['X-Sync-Timestamp'] = synced_at
+    return response
+
+
+def _render(query, serializer, joined, cursor, limit):
+    key = serializer.model.id
+    query = query.options(*serializer.options(joined=joined))
+    if cursor is not None:
+        query = query.filter(key > cursor)
+    query = query.order_by(key)
+
+    if wants_ndjson():
+        if limit is not None:
+            query = query.limit(limit)
+        return Response(stream_with_context(_stream(query, serializer)), mimetype=NDJSON_MIMETYPE)
+
+    if cursor is None and limit is None:
+        return jsonify(serializer.dump_many(query.all()))
+
+    limit = min(limit or DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE)
+    rows = query.limit(limit + 1).all()
+    next_cursor = str(rows[limit - 1].id) if len(rows) > limit else None
+
+    return jsonify({
+        'items': serializer.dump_many(rows[:limit]),
+        'next_cursor': next_cursor
+    })
@@ -1,12 +1,22 @@
-from flask import request, jsonify, current_app
+from flask import request, jsonify, current_app, url_for
 from flask_login import login_user
 from app.api import bp
-from app.models import User, Project, Campaign, Plan
-from app import db
+from app.models import User, Project, Campaign, Plan, Tombstone, adjust_counters
+from app.api.serializers import FieldError, ProjectSerializer, CampaignSerializer, \
+    PlanSerializer, TombstoneSerializer
+from app.api.pagination import PaginationError, changed_ids, list_response, updated_since_arg
+from app.jobs import enqueue
+from app import db, http_client
+from collections import Counter
 from functools import wraps
+from sqlalchemy import delete, insert, update
+from datetime import datetime
+import math
 import requests
 from werkzeug.security import check_password_hash
 
+MAX_PLAN_BATCH_SIZE = 1000
+
 def require_webhook_secret(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
@@ -85,11 +95,14 @@ def login_with_agency_crm():
             'Content-Type': 'application/json'
         }
 
-        response = requests.post(
+        response = http_client.post(
+            'agency_crm',
             f'{agency_crm_url}/api/authenticate',
             json={'email': data['email'], 'password': data['password']},
             headers=headers,
-            timeout=5
+            timeout=current_app.config['AGENCY_CRM_AUTH_TIMEOUT'],
+            # A user is waiting: one attempt, then the local fallback
+            retries=0
         )
 
         if response.status_code != 200:
@@ -219,32 +232,21 @@ def webhook_user_deleted():
 @bp.route('/campaigns', methods=['GET'])
 @require_api_key
 def get_campaigns():
-    """Get all active campaigns"""
+    """Get all active campaigns, or with ?updated_since= every campaign changed since then"""
     try:
-        campaigns = Campaign.query.join(Project).filter(
-            Campaign.status == 'active'
-        ).all()
-        
-        campaign_list = []
-        for campaign in campaigns:
-            campaign_list.append({
-                'id': campaign.id,
-                'code': campaign.code,
-                'name': campaign.name,
-                'project_id': campaign.project_id,
-                'project_name': campaign.project.name,
-                'project_code': campaign.project.code,
-                'client_brand_id': campaign.project.client_brand_id,
-                'client_brand_name': campaign.project.client_brand_name,
-                'start_date': campaign.start_date.isoformat(),
-                'end_date': campaign.end_date.isoformat(),
-                'overall_info': campaign.overall_info,
-                'status': campaign.status,
-                'created_at': campaign.created_at.isoformat()
-            })
+        serializer = CampaignSerializer.from_request()
+        since = updated_since_arg()
+        campaigns = Campaign.query.join(Project)
+        if since is None:
+            campaigns = campaigns.filter(Campaign.status == 'active')
+        else:
+            # Include every status so consumers see campaigns being deactivated
+            campaigns = campaigns.filter(Campaign.id.in_(changed_ids(Campaign, since, via=(Project,))))
         
-        return jsonify(campaign_list), 200
+        return list_response(campaigns, serializer, joined=('project',))
         
+    except (FieldError, PaginationError) as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -253,81 +255,57 @@ def get_campaigns():
 def get_campaign(campaign_id):
     """Get specific campaign by ID"""
     try:
-        campaign = Campaign.query.get_or_404(campaign_id)
-        
-        campaign_data = {
-            'id': campaign.id,
-            'code': campaign.code,
-            'name': campaign.name,
-            'project_id': campaign.project_id,
-            'project_name': campaign.project.name,
-            'project_code': campaign.project.code,
-            'client_brand_id': campaign.project.client_brand_id,
-            'client_brand_name': campaign.project.client_brand_name,
-            'start_date': campaign.start_date.isoformat(),
-            'end_date': campaign.end_date.isoformat(),
-            'overall_info': campaign.overall_info,
-            'status': campaign.status,
-            'created_at': campaign.created_at.isoformat(),
-            'updated_at': campaign.updated_at.isoformat()
-        }
+        serializer = CampaignSerializer.from_request(
+            default=CampaignSerializer.default + ('updated_at',)
+        )
+        campaign = Campaign.query.options(*serializer.options()).filter(
+            Campaign.id == campaign_id
+        ).first_or_404()
         
-        return jsonify(campaign_data), 200
+        return jsonify(serializer.dump(campaign)), 200
         
+    except FieldError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @bp.route('/projects', methods=['GET'])
 @require_api_key
 def get_projects():
-    """Get all active projects"""
+    """Get all active projects, or with ?updated_since= every project changed since then"""
     try:
-        projects = Project.query.filter(Project.status == 'active').all()
-        
-        project_list = []
-        for project in projects:
-            project_list.append({
-                'id': project.id,
-                'code': project.code,
-                'name': project.name,
-                'client_brand_id': project.client_brand_id,
-                'client_brand_name': project.client_brand_name,
-                'start_date': project.start_date.isoformat(),
-                'end_date': project.end_date.isoformat(),
-                'status': project.status,
-                'created_at': project.created_at.isoformat(),
-                'campaign_count': len(project.campaigns)
-            })
+        serializer = ProjectSerializer.from_request()
+        since = updated_since_arg()
+        if since is None:
+            projects = Project.query.filter(Project.status == 'active')
+        else:
+            projects = Project.query.filter(Project.id.in_(changed_ids(Project, since)))
         
-        return jsonify(project_list), 200
+        return list_response(projects, serializer)
         
+    except (FieldError, PaginationError) as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @bp.route('/campaigns/<int:campaign_id>/plans', methods=['GET'])
 @require_api_key
 def get_campaign_plans(campaign_id):
-    """Get all plans for a specific campaign"""
+    """Get all plans for a specific campaign, optionally only those changed ?updated_since="""
     try:
+        serializer = PlanSerializer.from_request()
+        since = updated_since_arg()
         campaign = Campaign.query.get_or_404(campaign_id)
         
-        plans = Plan.query.filter_by(campaign_id=campaign_id).order_by(Plan.created_at.asc()).all()
-        
-        plan_list = []
-        for plan in plans:
-            plan_list.append({
-                'id': plan.id,
-                'name': plan.name,
-                'campaign_id': plan.campaign_id,
-                'description': plan.description,
-                'budget': plan.budget,
-                'status': plan.status,
-                'created_at': plan.created_at.isoformat(),
-                'updated_at': plan.updated_at.isoformat()
-            })
+        # Plan ids are assigned in creation order, so id order is creation order
+        plans = Plan.query.filter_by(campaign_id=campaign_id)
+        if since is not None:
+            plans = plans.filter(Plan.updated_at >= since)
         
-        return jsonify(plan_list), 200
+        return list_response(plans, serializer)
         
+    except (FieldError, PaginationError) as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -341,17 +319,16 @@ def create_plan(campaign_id):
         data = request.get_json()
         if not data:
             return jsonify({'error': 'No data provided'}), 400
+        errors = _plan_batch_errors(0, data, require_campaign=False)
+        if errors:
+            return jsonify({'error': 'Invalid plan', 'details': errors}), 400
         
-        # Get the next plan number for this campaign
-        existing_plans = Plan.query.filter_by(campaign_id=campaign_id).count()
-        plan_number = existing_plans + 1
-        
-        # Create plan name if not provided
-        plan_name = data.get('name') or f'Plan{plan_number}'
+        # Reserve the next plan number; it names the plan if no name is given
+        default_name = Campaign.allocate_plan_names(campaign, 1)[0]
         
         # Create the plan
         plan = Plan(
-            name=plan_name,
+            name=data.get('name') or default_name,
             campaign_id=campaign_id,
             description=data.get('description', ''),
             budget=data.get('budget', 0.0),
@@ -361,19 +338,257 @@ def create_plan(campaign_id):
         db.session.add(plan)
         db.session.commit()
         
-        plan_data = {
-            'id': plan.id,
-            'name': plan.name,
-            'campaign_id': plan.campaign_id,
-            'description': plan.description,
-            'budget': plan.budget,
-            'status': plan.status,
-            'created_at': plan.created_at.isoformat(),
-            'updated_at': plan.updated_at.isoformat()
-        }
+        return jsonify(PlanSerializer().dump(plan)), 201
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+def _is_int(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+def _plan_batch_errors(index, item, require_campaign=True):
+    """Validation errors for a plan body, or one entry of a batch or reconcile body"""
+    if not isinstance(item, dict):
+        return [{'index': index, 'error': 'Plan must be an object'}]
+    errors = []
+    if require_campaign and not _is_int(item.get('campaign_id')):
+        errors.append({'index': index, 'field': 'campaign_id', 'error': 'campaign_id must be an integer'})
+    if 'id' in item and not _is_int(item['id']):
+        errors.append({'index': index, 'field': 'id', 'error': 'id must be an integer'})
+    for field, limit in (('name', 200), ('status', 20), ('description', None)):
+        value = item.get(field)
+        if value is not None and not isinstance(value, str):
+            errors.append({'index': index, 'field': field, 'error': f'{field} must be a string'})
+        elif value and limit and len(value) > limit:
+            errors.append({'index': index, 'field': field, 'error': f'{field} is longer than {limit} characters'})
+    # Leave `name` out to keep it (or get the next PlanN); null or blank would hit NOT NULL or mean nothing
+    if 'name' in item and (item['name'] is None or isinstance(item['name'], str) and not item['name'].strip()):
+        errors.append({'index': index, 'field': 'name', 'error': 'name must not be empty'})
+    budget = item.get('budget')
+    if budget is not None and not (_is_int(budget) or isinstance(budget, float) and math.isfinite(budget)):
+        errors.append({'index': index, 'field': 'budget', 'error': 'budget must be a number'})
+    return errors
+
+@bp.route('/plans/batch', methods=['POST'])
+@require_api_key
+def create_plans_batch():
+    """Create many plans, for one or more campaigns, in a single transaction.
+
+    Body: `{"plans": [{"campaign_id": 1, "name": ..., "description": ...,
+    "budget": ..., "status": ...}, ...]}` (a bare array is accepted too).
+    Nothing is created unless every entry is valid. Unnamed plans get the
+    campaign's next PlanN name. Returns the new ids in input order.
+    """
+    try:
+        data = request.get_json(silent=True)
+        items = data.get('plans') if isinstance(data, dict) else data
+        if not isinstance(items, list) or not items:
+            return jsonify({'error': 'Expected a non-empty list of plans'}), 400
+        if len(items) > MAX_PLAN_BATCH_SIZE:
+            return jsonify({'error': f'At most {MAX_PLAN_BATCH_SIZE} plans per batch'}), 400
+        
+        errors = []
+        for index, item in enumerate(items):
+            errors.extend(_plan_batch_errors(index, item))
+        if errors:
+            return jsonify({'error': 'Invalid plans', 'details': errors}), 400
+        
+        campaign_ids = {item['campaign_id'] for item in items}
+        campaigns = {c.id: c for c in Campaign.query.filter(Campaign.id.in_(campaign_ids))}
+        missing = [{'index': index, 'field': 'campaign_id', 'error': f"Campaign {item['campaign_id']} not found"}
+                   for index, item in enumerate(items) if item['campaign_id'] not in campaigns]
+        if missing:
+            return jsonify({'error': 'Invalid plans', 'details': missing}), 400
+        
+        # One counter UPDATE across all campaigns reserves a number for every new plan
+        counts = Counter(item['campaign_id'] for item in items)
+        default_names = {campaign_id: iter(names) for campaign_id, names in
+                         Campaign.allocate_plan_names_many(list(campaigns.values()), counts).items()}
+        
+        now = datetime.utcnow()
+        rows = []
+        for item in items:
+            default_name = next(default_names[item['campaign_id']])
+            rows.append({
+                'name': item.get('name') or default_name,
+                'campaign_id': item['campaign_id'],
+                'description': item.get('description', ''),
+                'budget': item.get('budget', 0.0),
+                'status': item.get('status') or 'draft',
+                'created_at': now,
+                'updated_at': now
+            })
+        created = db.session.execute(
+            insert(Plan).returning(Plan.id, Plan.campaign_id, Plan.name, sort_by_parameter_order=True), rows
+        ).all()
+        adjust_counters(db.session, Plan, counts)
+        db.session.commit()
+        
+        return jsonify({
+            'ids': [plan.id for plan in created],
+            'plans': [{'id': plan.id, 'campaign_id': plan.campaign_id, 'name': plan.name} for plan in created]
+        }), 201
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+PLAN_FIELDS = ('name', 'description', 'budget', 'status')
+
+def _match_plans(items, existing):
+    """Pair each desired plan with an existing row (by id, else by name).
+
+    Returns (matches, errors) where matches[i] is the matched Plan or None.
+    """
+    by_id = {plan.id: plan for plan in existing}
+    by_name = {}
+    for plan in existing:
+        by_name.setdefault(plan.name, []).append(plan)
+
+    matches, errors, claimed, names = [], [], set(), set()
+    for index, item in enumerate(items):
+        name = item.get('name')
+        if name:
+            if name in names:
+                errors.append({'index': index, 'field': 'name', 'error': f'Duplicate plan name "{name}"'})
+            names.add(name)
+
+        if 'id' in item:
+            plan = by_id.get(item['id'])
+            if plan is None:
+                errors.append({'index': index, 'field': 'id', 'error': f"Plan {item['id']} not found in campaign"})
+        else:
+            plan = next((p for p in by_name.get(name, []) if p.id not in claimed), None) if name else None
+
+        if plan is not None:
+            if plan.id in claimed:
+                errors.append({'index': index, 'field': 'id', 'error': f'Plan {plan.id} listed twice'})
+            claimed.add(plan.id)
+        matches.append(plan)
+    return matches, errors
+
+@bp.route('/campaigns/<int:campaign_id>/plans', methods=['PUT'])
+@require_api_key
+def reconcile_campaign_plans(campaign_id):
+    """Make a campaign's plans match the given set, in one transaction.
+
+    Body: `{"plans": [{"id" or "name", "description", "budget", "status"}, ...]}`
+    (a bare array is accepted too). Entries are matched to existing plans by
+    id, otherwise by name; matched plans get the given fields updated (omitted
+    fields are left alone), unmatched entries are created and existing plans
+    not in the set are deleted. Returns what was created, updated and deleted.
+    """
+    try:
+        campaign = Campaign.query.filter_by(id=campaign_id).with_for_update().first()
+        if campaign is None:
+            return jsonify({'error': 'Campaign not found'}), 404
+        
+        data = request.get_json(silent=True)
+        items = data.get('plans') if isinstance(data, dict) else data
+        if not isinstance(items, list):
+            return jsonify({'error': 'Expected a list of plans'}), 400
+        if len(items) > MAX_PLAN_BATCH_SIZE:
+            return jsonify({'error': f'At most {MAX_PLAN_BATCH_SIZE} plans per request'}), 400
+        
+        errors = []
+        for index, item in enumerate(items):
+            errors.extend(_plan_batch_errors(index, item, require_campaign=False))
+        if errors:
+            return jsonify({'error': 'Invalid plans', 'details': errors}), 400
+        
+        existing = Plan.query.filter_by(campaign_id=campaign_id).order_by(Plan.id).all()
+        matches, errors = _match_plans(items, existing)
+        if errors:
+            return jsonify({'error': 'Invalid plans', 'details': errors}), 400
+        
+        now = datetime.utcnow()
+        updates, updated, inserts = [], [], []
+        for item, plan in zip(items, matches):
+            if plan is None:
+                inserts.append(item)
+                continue
+            changes = {field: item[field] for field in PLAN_FIELDS
+                       if field in item and item[field] != getattr(plan, field)}
+            if changes:
+                updates.append({'id': plan.id, 'updated_at': now, **changes})
+                updated.append({'id': plan.id, 'name': changes.get('name', plan.name),
+                                'changed': sorted(changes)})
+        
+        matched_ids = {plan.id for plan in matches if plan is not None}
+        deleted = [{'id': plan.id, 'name': plan.name} for plan in existing if plan.id not in matched_ids]
+        
+        if updates:
+            db.session.execute(update(Plan), updates)
+        
+        created = []
+        if inserts:
+            default_names = iter(Campaign.allocate_plan_names(campaign, len(inserts)))
+            rows = []
+            for item in inserts:
+                default_name = next(default_names)
+                rows.append({
+                    'name': item.get('name') or default_name,
+                    'campaign_id': campaign_id,
+                    'description': item.get('description', ''),
+                    'budget': item.get('budget', 0.0),
+                    'status': item.get('status') or 'draft',
+                    'created_at': now,
+                    'updated_at': now
+                })
+            created = [dict(row._mapping) for row in db.session.execute(
+                insert(Plan).returning(Plan.id, Plan.name, sort_by_parameter_order=True), rows
+            )]
+        
+        # Deletes go last so SQLite cannot hand a removed plan's id to a new one.
+        # Bulk statements skip the mapper events, so tombstones and totals are written here.
+        if deleted:
+            db.session.execute(insert(Tombstone), [
+                {'entity_type': 'plan', 'entity_id': plan['id'], 'parent_id': campaign_id,
+                 'name': plan['name'], 'deleted_at': now}
+                for plan in deleted
+            ])
+            db.session.execute(
+                delete(Plan).where(Plan.id.in_([plan['id'] for plan in deleted]))
+                .execution_options(synchronize_session=False)
+            )
+        adjust_counters(db.session, Plan, {campaign_id: len(created) - len(deleted)})
+        
+        db.session.commit()
         
-        return jsonify(plan_data), 201
+        return jsonify({
+            'campaign_id': campaign_id,
+            'created': created,
+            'updated': updated,
+            'deleted': deleted,
+            'unchanged': len(matched_ids) - len(updated)
+        }), 200
         
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/deletions', methods=['GET'])
+@require_api_key
+def get_deletions():
+    """Tombstones of deleted projects, campaigns and plans.
+
+    Filter with ?since=<timestamp> and ?entity_type=project|campaign|plan;
+    paginates and streams like the other list endpoints.
+    """
+    try:
+        serializer = TombstoneSerializer.from_request()
+        since = updated_since_arg('since')
+        tombstones = Tombstone.query
+        if since is not None:
+            tombstones = tombstones.filter(Tombstone.deleted_at >= since)
+        if request.args.get('entity_type'):
+            tombstones = tombstones.filter(Tombstone.entity_type == request.args['entity_type'])
+        
+        return list_response(tombstones, serializer)
+        
+    except (FieldError, PaginationError) as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -382,78 +597,47 @@ def create_plan(campaign_id):
 def get_plan(plan_id):
     """Get specific plan by ID"""
     try:
-        plan = Plan.query.get_or_404(plan_id)
-        
-        plan_data = {
-            'id': plan.id,
-            'name': plan.name,
-            'campaign_id': plan.campaign_id,
-            'campaign_name': plan.campaign.name,
-            'campaign_code': plan.campaign.code,
-            'description': plan.description,
-            'budget': plan.budget,
-            'status': plan.status,
-            'created_at': plan.created_at.isoformat(),
-            'updated_at': plan.updated_at.isoformat()
-        }
+        serializer = PlanSerializer.from_request(
+            default=('id', 'name', 'campaign_id', 'campaign_name', 'campaign_code', 'description',
+                     'budget', 'status', 'created_at', 'updated_at')
+        )
+        plan = Plan.query.options(*serializer.options()).filter(
+            Plan.id == plan_id
+        ).first_or_404()
         
-        return jsonify(plan_data), 200
+        return jsonify(serializer.dump(plan)), 200
         
+    except FieldError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @bp.route('/campaigns/sync-to-ekranu', methods=['POST'])
 @require_api_key
 def sync_campaigns_to_ekranu():
-    """Send active campaigns to ekranu-crm as kampanijos"""
+    """Queue a push of new, changed and removed active campaigns to ekranu-crm.
+
+    Returns 202 with the job id; poll GET /api/jobs/<id> for the result.
+    Only campaigns whose payload differs from the last successful push are
+    sent; pass ?full=1 to resend everything.
+    """
     try:
-        # Get all active campaigns with their projects
-        campaigns = Campaign.query.join(Project).filter(
-            Campaign.status == 'active'
-        ).all()
-        
-        # Prepare data for ekranu-crm kampanijos
-        campaigns_data = []
-        for campaign in campaigns:
-            campaigns_data.append({
-                'name': f"{campaign.project.client_brand_name} - {campaign.name}",  # Brand + Campaign name
-                'client_brand_name': campaign.project.client_brand_name,
-                'campaign_name': campaign.name,
-                'external_id': f'projects_campaign_{campaign.id}',  # Unique identifier
-                'source_system': 'projects-crm'
-            })
+        full = request.args.get('full', '').lower() in ('1', 'true', 'yes')
+        job = enqueue('ekranu_push', {'full': full}, dedupe=not full)
         
-        # Send to ekranu-crm kampanijos endpoint
-        ekranu_url = 'http://172.20.89.236:5003/api/import-kampanijos'
-        headers = {
-            'Content-Type': 'application/json',
-            'X-API-Key': 'ekranu-crm-api-key'  # This should match the key in ekranu-crm
-        }
-        
-        response = requests.post(ekranu_url, json={'kampanijos': campaigns_data}, headers=headers, timeout=10)
-        
-        if response.status_code == 200:
-            result = response.json()
-            return jsonify({
-                'success': True,
-                'message': f'Successfully synced {len(campaigns_data)} campaigns to ekranu-crm',
-                'synced_count': result.get('imported_count', len(campaigns_data))
-            })
-        else:
-            return jsonify({
-                'success': False,
-                'message': f'Failed to sync campaigns: {response.text}'
-            }), 500
+        response = jsonify({
+            'success': True,
+            'message': 'Campaign sync to ekranu-crm queued',
+            'job_id': job.id,
+            'status_url': url_for('api.get_job', job_id=job.id)
+        })
+        response.headers['Location'] = url_for('api.get_job', job_id=job.id)
+        return response, 202
             
-    except requests.exceptions.RequestException as e:
-        return jsonify({
-            'success': False,
-            'message': f'Connection error to ekranu-crm: {str(e)}'
-        }), 500
     except Exception as e:
         return jsonify({
             'success': False,
-            'message': f'Error syncing campaigns: {str(e)}'
+            'message': f'Error queueing campaign sync: {str(e)}'
         }), 500
 
 @bp.route('/plans/<int:plan_id>', methods=['DELETE'])
@@ -527,31 +711,19 @@ def update_plan(plan_id):
         data = request.get_json()
         if not data:
             return jsonify({'error': 'No data provided'}), 400
+        errors = _plan_batch_errors(0, data, require_campaign=False)
+        if errors:
+            return jsonify({'error': 'Invalid plan', 'details': errors}), 400
         
         # Update fields if provided
-        if 'name' in data:
-            plan.name = data['name']
-        if 'description' in data:
-            plan.description = data['description']
-        if 'budget' in data:
-            plan.budget = float(data['budget'])
-        if 'status' in data:
-            plan.status = data['status']
+        for field in PLAN_FIELDS:
+            if field in data:
+                setattr(plan, field, data[field])
         
         db.session.commit()
         
-        plan_data = {
-            'id': plan.id,
-            'name': plan.name,
-            'campaign_id': plan.campaign_id,
-            'description': plan.description,
-            'budget': plan.budget,
-            'status': plan.status,
-            'created_at': plan.created_at.isoformat(),
-            'updated_at': plan.updated_at.isoformat()
-        }
-        
-        return jsonify(plan_data), 200
+        return jsonify(PlanSerializer().dump(plan)), 200
         
     except Exception as e:
+        db.session.rollback()
         return jsonify({'error': str(e)}), 500
\ No newline at end of file
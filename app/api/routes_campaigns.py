@@ -2,32 +2,25 @@ from flask import jsonify
 from app.api import bp
 from app.models import Campaign, Project
 from app.api.routes import require_api_key
+from app.api.serializers import FieldError, EkranuCampaignSerializer
+from app.api.pagination import PaginationError, changed_ids, list_response, updated_since_arg
 
 @bp.route('/campaigns/for-ekranu', methods=['GET'])
 @require_api_key
 def get_campaigns_for_ekranu():
     """Get active campaigns formatted for ekranu-crm selection"""
     try:
-        campaigns = Campaign.query.join(Project).filter(
-            Campaign.status == 'active'
-        ).all()
+        serializer = EkranuCampaignSerializer.from_request()
+        since = updated_since_arg()
+        campaigns = Campaign.query.join(Project)
+        if since is None:
+            campaigns = campaigns.filter(Campaign.status == 'active')
+        else:
+            campaigns = campaigns.filter(Campaign.id.in_(changed_ids(Campaign, since, via=(Project,))))
         
-        campaign_list = []
-        for campaign in campaigns:
-            campaign_list.append({
-                'id': campaign.id,
-                'name': f"{campaign.project.client_brand_name} - {campaign.name}",
-                'client_brand_name': campaign.project.client_brand_name,
-                'campaign_name': campaign.name,
-                'project_code': campaign.project.code,
-                'campaign_code': campaign.code,
-                'start_date': campaign.start_date.isoformat(),
-                'end_date': campaign.end_date.isoformat(),
-                'external_id': f'projects_campaign_{campaign.id}',
-                'source_system': 'projects-crm'
-            })
-        
-        return jsonify(campaign_list), 200
+        return list_response(campaigns, serializer, joined=('project',))
         
+    except (FieldError, PaginationError) as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
\ No newline at end of file
@@ -0,0 +1,38 @@
+from flask import jsonify, url_for
+from app.api import bp
+from app.api.routes import require_api_key
+from app.jobs import enqueue
+from app.models import Job
+from app import db, http_client
+
+@bp.route('/jobs/<int:job_id>', methods=['GET'])
+@require_api_key
+def get_job(job_id):
+    """Status and result of a queued background job"""
+    job = db.session.get(Job, job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job.to_dict()), 200
+
+@bp.route('/users/sync', methods=['POST'])
+@require_api_key
+def queue_user_sync():
+    """Queue a full user sync from agency-crm"""
+    try:
+        job = enqueue('sync_users', dedupe=True)
+        response = jsonify({
+            'success': True,
+            'message': 'User sync queued',
+            'job_id': job.id,
+            'status_url': url_for('api.get_job', job_id=job.id)
+        })
+        response.headers['Location'] = url_for('api.get_job', job_id=job.id)
+        return response, 202
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/upstreams', methods=['GET'])
+@require_api_key
+def get_upstreams():
+    """Circuit breaker state of each upstream, shared by all workers"""
+    return jsonify({'upstreams': http_client.circuit_states()}), 200
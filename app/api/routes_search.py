@@ -0,0 +1,42 @@
+from flask import jsonify, request
+from app.api import bp
+from app.api.routes import require_api_key
+from app.search import KINDS, search
+
+MAX_RESULTS = 100
+
+
+@bp.route('/search', methods=['GET'])
+@require_api_key
+def search_records():
+    """Ranked full-text search over projects, campaigns and plans.
+
+    ?q= is matched by word prefix against codes, names, brands, comments,
+    overall info and plan descriptions; ?type=project,campaign narrows
+    the kinds returned; ?limit= (default 20, at most 100).
+    """
+    try:
+        query = request.args.get('q', '').strip()
+        if not query:
+            return jsonify({'error': 'q is required'}), 400
+        kinds = [kind for raw in request.args.getlist('type') for kind in raw.split(',') if kind]
+        unknown = [kind for kind in kinds if kind not in KINDS]
+        if unknown:
+            return jsonify({'error': f'Invalid type: {", ".join(unknown)}'}), 400
+        limit = request.args.get('limit', 20, type=int)
+        if limit < 1 or limit > MAX_RESULTS:
+            return jsonify({'error': f'limit must be between 1 and {MAX_RESULTS}'}), 400
+
+        items = []
+        for hit in search(query, kinds, limit):
+            item = {'type': hit['kind'], 'id': hit['id'], 'code': hit['code'], 'name': hit['name'],
+                    'brand': hit['brand'], 'snippet': str(hit['snippet']), 'score': hit['score']}
+            if hit['kind'] == 'campaign':
+                item['project_id'] = hit['parent_id']
+            elif hit['kind'] == 'plan':
+                item['campaign_id'] = hit['parent_id']
+            items.append(item)
+        return jsonify({'query': query, 'items': items}), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
@@ -0,0 +1,130 @@
+from flask import jsonify, request
+from sqlalchemy import distinct, func
+from app.api import bp
+from app.api.routes import require_api_key
+from app.models import Project, Campaign, Plan
+from app import db
+
+GROUPINGS = {
+    'project': (Project.id, Project.code, Project.name),
+    'campaign': (Campaign.id, Campaign.code, Campaign.name, Project.id),
+}
+GROUP_FIELDS = {
+    'project': ('id', 'code', 'name'),
+    'campaign': ('id', 'code', 'name', 'project_id'),
+}
+
+
+def _id_list(name):
+    """Read ?name=1,2&name=3 style id filters"""
+    ids = []
+    for raw in request.args.getlist(name):
+        for part in raw.split(','):
+            if part.strip():
+                try:
+                    ids.append(int(part))
+                except ValueError:
+                    raise ValueError(f'{name} must be a comma-separated list of integers') from None
+    return ids
+
+
+def _stats_query():
+    query = db.session.query().select_from(Project).outerjoin(
+        Campaign, Campaign.project_id == Project.id
+    ).outerjoin(
+        Plan, Plan.campaign_id == Campaign.id
+    )
+
+    project_ids = _id_list('project_id')
+    if project_ids:
+        query = query.filter(Project.id.in_(project_ids))
+    campaign_ids = _id_list('campaign_id')
+    if campaign_ids:
+        query = query.filter(Campaign.id.in_(campaign_ids))
+    brand_ids = _id_list('client_brand_id')
+    if brand_ids:
+        query = query.filter(Project.client_brand_id.in_(brand_ids))
+    user_ids = _id_list('created_by_id')
+    if user_ids:
+        query = query.filter(Project.created_by_id.in_(user_ids))
+    if request.args.get('project_status'):
+        query = query.filter(Project.status == request.args['project_status'])
+    if request.args.get('campaign_status'):
+        query = query.filter(Campaign.status == request.args['campaign_status'])
+    return query
+
+
+def _aggregates():
+    return (
+        func.count(distinct(Project.id)),
+        func.count(distinct(Campaign.id)),
+        func.count(Plan.id),
+        func.count(Plan.budget),
+        func.coalesce(func.sum(Plan.budget), 0.0),
+    )
+
+
+def _stats(project_count, campaign_count, plan_count, budgeted_count, budget_total):
+    return {
+        'project_count': project_count,
+        'campaign_count': campaign_count,
+        'plan_count': plan_count,
+        'plan_budget_total': budget_total,
+        'plan_budget_avg': budget_total / budgeted_count if budgeted_count else None
+    }
+
+
+@bp.route('/stats', methods=['GET'])
+@require_api_key
+def get_stats():
+    """Project/campaign/plan counts and plan budget totals, computed in SQL.
+
+    Filters: project_id, campaign_id, client_brand_id, created_by_id (ids,
+    comma separated), project_status, campaign_status. With
+    ?group_by=project or ?group_by=campaign the response also carries one
+    row per group; everything comes back from a single SELECT.
+    """
+    try:
+        group_by = request.args.get('group_by')
+        if group_by and group_by not in GROUPINGS:
+            return jsonify({'error': f'Invalid group_by: {group_by}'}), 400
+
+        query = _stats_query()
+
+        if not group_by:
+            row = query.with_entities(*_aggregates()).one()
+            return jsonify({'totals': _stats(*row)}), 200
+
+        keys = GROUPINGS[group_by]
+        rows = query.with_entities(*keys, *_aggregates()).group_by(*keys).order_by(*keys[:1]).all()
+
+        groups = []
+        project_ids = set()
+        campaign_count = plan_count = budgeted_count = 0
+        budget_total = 0.0
+        for row in rows:
+            key_values, aggregates = row[:len(keys)], row[len(keys):]
+            project_ids.add(key_values[-1] if group_by == 'campaign' else key_values[0])
+            campaign_count += aggregates[1]
+            plan_count += aggregates[2]
+            budgeted_count += aggregates[3]
+            budget_total += aggregates[4]
+            if key_values[0] is None:
+                # A project without campaigns when grouping by campaign
+                continue
+            group = dict(zip(GROUP_FIELDS[group_by], key_values))
+            group.update(_stats(*aggregates))
+            del group['project_count']
+            if group_by == 'campaign':
+                del group['campaign_count']
+            groups.append(group)
+
+        return jsonify({
+            'totals': _stats(len(project_ids), campaign_count, plan_count, budgeted_count, budget_total),
+            'groups': groups
+        }), 200
+
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
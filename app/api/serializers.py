@@ -0,0 +1,230 @@
+from flask import request
+from sqlalchemy import func, select
+from sqlalchemy.orm import contains_eager, joinedload, load_only
+from app.models import Project, Campaign, Plan, Tombstone
+
+
+class FieldError(ValueError):
+    """Raised when ?fields= names a field the serializer does not know"""
+
+
+class Field:
+    """One output key: how to read it and which columns it needs loaded.
+
+    `columns` are attribute names on the serialized model, `related` maps a
+    many-to-one relationship name to the attribute names needed from it and
+    `depends` lists child models an aggregate field is computed from.
+    """
+
+    def __init__(self, getter, columns=(), related=None, depends=()):
+        self.getter = getter
+        self.columns = tuple(columns)
+        self.related = related or {}
+        self.depends = tuple(depends)
+
+
+def _iso(value):
+    return value.isoformat() if value is not None else None
+
+
+def column(name):
+    """Field that copies a plain column as-is"""
+    return Field(lambda obj: getattr(obj, name), columns=(name,))
+
+
+def date_column(name):
+    """Field that renders a date/datetime column as ISO 8601"""
+    return Field(lambda obj: _iso(getattr(obj, name)), columns=(name,))
+
+
+def aggregate(name, *models):
+    """Field backed by an aggregate column_property over child `models`"""
+    return Field(lambda obj: getattr(obj, name), columns=(name,), depends=models)
+
+
+class Serializer:
+    """Turns model rows into API dicts, loading only the columns it renders.
+
+    Subclasses declare `model`, the available `fields`, the `default`
+    field set returned when the caller does not pass ?fields= and the
+    `timestamp` column that moves whenever a row changes. Queries are
+    shaped with `options()` so every relationship a field needs is eagerly
+    loaded and each endpoint issues a fixed number of SELECTs.
+    """
+
+    model = None
+    fields = {}
+    default = ()
+    timestamp = 'updated_at'
+
+    def __init__(self, fields=None, default=None):
+        fields = list(fields) if fields else list(default or self.default)
+        unknown = [name for name in fields if name not in self.fields]
+        if unknown:
+            raise FieldError(f'Unknown field(s): {", ".join(unknown)}')
+        self.selected = fields
+
+    @classmethod
+    def from_request(cls, default=None):
+        """Build a serializer for the ?fields= of the current request"""
+        raw = request.args.get('fields', '')
+        fields = [name.strip() for name in raw.split(',') if name.strip()]
+        return cls(fields, default)
+
+    def _columns(self):
+        names = {'id'}
+        for name in self.selected:
+            names.update(self.fields[name].columns)
+        return names
+
+    def _related(self):
+        related = {}
+        for name in self.selected:
+            for relation, columns in self.fields[name].related.items():
+                related.setdefault(relation, {'id'}).update(columns)
+        return related
+
+    def options(self, joined=()):
+        """Loader options for a query over `model`.
+
+        Relationships listed in `joined` are already joined by the caller's
+        query and are populated from that join instead of a second JOIN.
+        """
+        options = [load_only(*[getattr(self.model, name) for name in sorted(self._columns())])]
+        for relation, columns in self._related().items():
+            attribute = getattr(self.model, relation)
+            target = attribute.property.mapper.class_
+            loader = contains_eager(attribute) if relation in joined else joinedload(attribute)
+            options.append(loader.load_only(*[getattr(target, name) for name in sorted(columns)]))
+        return options
+
+    def validators(self):
+        """Aggregate expressions that change whenever the output could change.
+
+        Evaluated against the caller's filtered query: its row count and
+        newest `updated_at`, plus table-wide count/newest `updated_at` of
+        every related or child model a selected field reads from.
+        """
+        expressions = [func.count(), func.max(getattr(self.model, self.timestamp))]
+        models = []
+        for relation in sorted(self._related()):
+            models.append(getattr(self.model, relation).property.mapper.class_)
+        for name in self.selected:
+            models.extend(m for m in self.fields[name].depends if m not in models)
+        for model in models:
+            expressions.append(select(func.count(model.id)).scalar_subquery())
+            expressions.append(select(func.max(model.updated_at)).scalar_subquery())
+        return expressions
+
+    def dump(self, obj):
+        return {name: self.fields[name].getter(obj) for name in self.selected}
+
+    def dump_many(self, objs):
+        return [self.dump(obj) for obj in objs]
+
+
+class ProjectSerializer(Serializer):
+    model = Project
+    fields = {
+        'id': column('id'),
+        'code': column('code'),
+        'name': column('name'),
+        'client_brand_id': column('client_brand_id'),
+        'client_brand_name': column('client_brand_name'),
+        'start_date': date_column('start_date'),
+        'end_date': date_column('end_date'),
+        'comments': column('comments'),
+        'overall_info': column('overall_info'),
+        'status': column('status'),
+        'created_by_id': column('created_by_id'),
+        'created_at': date_column('created_at'),
+        'updated_at': date_column('updated_at'),
+        'campaign_count': aggregate('campaign_count', Campaign),
+        'plan_count': aggregate('plan_count', Campaign, Plan),
+        'plan_budget_total': aggregate('plan_budget_total', Campaign, Plan),
+        'plan_budget_avg': aggregate('plan_budget_avg', Campaign, Plan),
+    }
+    default = ('id', 'code', 'name', 'client_brand_id', 'client_brand_name', 'start_date',
+               'end_date', 'status', 'created_at', 'campaign_count')
+
+
+class CampaignSerializer(Serializer):
+    model = Campaign
+    fields = {
+        'id': column('id'),
+        'code': column('code'),
+        'name': column('name'),
+        'project_id': column('project_id'),
+        'project_name': Field(lambda c: c.project.name, related={'project': ('name',)}),
+        'project_code': Field(lambda c: c.project.code, related={'project': ('code',)}),
+        'client_brand_id': Field(lambda c: c.project.client_brand_id,
+                                 related={'project': ('client_brand_id',)}),
+        'client_brand_name': Field(lambda c: c.project.client_brand_name,
+                                   related={'project': ('client_brand_name',)}),
+        'start_date': date_column('start_date'),
+        'end_date': date_column('end_date'),
+        'overall_info': column('overall_info'),
+        'status': column('status'),
+        'created_at': date_column('created_at'),
+        'updated_at': date_column('updated_at'),
+        'plan_count': aggregate('plan_count', Plan),
+        'plan_budget_total': aggregate('plan_budget_total', Plan),
+        'plan_budget_avg': aggregate('plan_budget_avg', Plan),
+    }
+    default = ('id', 'code', 'name', 'project_id', 'project_name', 'project_code', 'client_brand_id',
+               'client_brand_name', 'start_date', 'end_date', 'overall_info', 'status', 'created_at')
+
+
+class EkranuCampaignSerializer(Serializer):
+    """Campaigns in the shape ekranu-crm imports as kampanijos"""
+
+    model = Campaign
+    fields = {
+        'id': column('id'),
+        'name': Field(lambda c: f"{c.project.client_brand_name} - {c.name}",
+                      columns=('name',), related={'project': ('client_brand_name',)}),
+        'client_brand_name': Field(lambda c: c.project.client_brand_name,
+                                   related={'project': ('client_brand_name',)}),
+        'campaign_name': column('name'),
+        'project_code': Field(lambda c: c.project.code, related={'project': ('code',)}),
+        'campaign_code': column('code'),
+        'start_date': date_column('start_date'),
+        'end_date': date_column('end_date'),
+        'external_id': Field(lambda c: f'projects_campaign_{c.id}'),
+        'source_system': Field(lambda c: 'projects-crm'),
+    }
+    default = ('id', 'name', 'client_brand_name', 'campaign_name', 'project_code', 'campaign_code',
+               'start_date', 'end_date', 'external_id', 'source_system')
+
+
+class PlanSerializer(Serializer):
+    model = Plan
+    fields = {
+        'id': column('id'),
+        'name': column('name'),
+        'campaign_id': column('campaign_id'),
+        'campaign_name': Field(lambda p: p.campaign.name, related={'campaign': ('name',)}),
+        'campaign_code': Field(lambda p: p.campaign.code, related={'campaign': ('code',)}),
+        'description': column('description'),
+        'budget': column('budget'),
+        'status': column('status'),
+        'created_at': date_column('created_at'),
+        'updated_at': date_column('updated_at'),
+    }
+    default = ('id', 'name', 'campaign_id', 'description', 'budget', 'status', 'created_at',
+               'updated_at')
+
+
+class TombstoneSerializer(Serializer):
+    model = Tombstone
+    fields = {
+        'id': column('id'),
+        'entity_type': column('entity_type'),
+        'entity_id': column('entity_id'),
+        'parent_id': column('parent_id'),
+        'code': column('code'),
+        'name': column('name'),
+        'deleted_at': date_column('deleted_at'),
+    }
+    default = ('id', 'entity_type', 'entity_id', 'parent_id', 'code', 'name', 'deleted_at')
+    timestamp = 'deleted_at'
@@ -3,7 +3,7 @@ from flask_login import login_user, logout_user, current_user
 from app.auth import bp
 from app.models import User
 from app.auth.forms import LoginForm
-from app import db
+from app import db, http_client
 import requests
 
 @bp.route('/login', methods=['GET', 'POST'])
@@ -23,11 +23,14 @@ def login():
                 'Content-Type': 'application/json'
             }
 
-            response = requests.post(
+            response = http_client.post(
+                'agency_crm',
                 f'{agency_crm_url}/api/authenticate',
                 json={'email': form.email.data, 'password': form.password.data},
                 headers=headers,
-                timeout=5
+                timeout=current_app.config['AGENCY_CRM_AUTH_TIMEOUT'],
+                # A user is waiting: one attempt, then the local fallback
+                retries=0
             )
 
             if response.status_code == 200:
@@ -3,6 +3,7 @@ from flask_login import login_required, current_user
 from app.campaigns import bp
 from app.campaigns.forms import CampaignForm, PlanForm
 from app.models import Project, Campaign, Plan
+from app.view_models import CampaignPage
 from app import db
 
 @bp.route('/project/<int:project_id>')
@@ -23,7 +24,7 @@ def create(project_id):
     
     if form.validate_on_submit():
         campaign = Campaign(
-            code=Campaign.generate_campaign_code(project.code),
+            code=Campaign.generate_campaign_code(project),
             name=form.name.data,
             project=project,
             start_date=form.start_date.data,
@@ -40,8 +41,8 @@ def create(project_id):
 @bp.route('/<int:id>')
 @login_required
 def view(id):
-    campaign = Campaign.query.get_or_404(id)
-    return render_template('campaigns/view.html', title=campaign.name, campaign=campaign)
+    page = CampaignPage.load(id)
+    return render_template('campaigns/view.html', title=page.campaign.name, campaign=page.campaign, page=page)
 
 @bp.route('/<int:id>/edit', methods=['GET', 'POST'])
 @login_required
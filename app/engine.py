@@ -0,0 +1,48 @@
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+# PRAGMAs that mean nothing for an in-memory database
+_FILE_ONLY_PRAGMAS = ('journal_mode', 'mmap_size')
+
+
+def _is_memory_database(url):
+    return url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:')
+
+
+def engine_options(config):
+    """Default SQLALCHEMY_ENGINE_OPTIONS for the configured database.
+
+    File-backed and server databases get a sized, recycled, pre-pinged
+    QueuePool. In-memory SQLite keeps Flask-SQLAlchemy's single shared
+    connection, which takes no pool arguments. Explicit
+    SQLALCHEMY_ENGINE_OPTIONS entries always win.
+    """
+    url = make_url(config['SQLALCHEMY_DATABASE_URI'])
+    options = {}
+    if not _is_memory_database(url):
+        options.update(
+            pool_size=config['DB_POOL_SIZE'],
+            max_overflow=config['DB_MAX_OVERFLOW'],
+            pool_timeout=config['DB_POOL_TIMEOUT'],
+            pool_recycle=config['DB_POOL_RECYCLE'],
+            pool_pre_ping=True
+        )
+    options.update(config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    return options
+
+
+def apply_sqlite_pragmas(engine, pragmas):
+    """Run `PRAGMA name=value` for each of `pragmas` on every new connection of `engine`"""
+    if engine.dialect.name != 'sqlite' or not pragmas:
+        return
+    if _is_memory_database(engine.url):
+        pragmas = {name: value for name, value in pragmas.items() if name not in _FILE_ONLY_PRAGMAS}
+
+    @event.listens_for(engine, 'connect')
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f'PRAGMA {name}={value}')
+        finally:
+            cursor.close()
@@ -0,0 +1,363 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from flask import current_app
+from sqlalchemy import and_, insert, or_, select, update
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from app.models import UpstreamCircuit
+from app import db
+
+# Methods that are safe to resend after a read error or a retryable status.
+# Connection failures are retried for every method since nothing was sent.
+RETRY_METHODS = frozenset(['GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'])
+RETRY_STATUSES = (502, 503, 504)
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+# Guards every app's per-process cache of circuit rows (see CircuitBreaker)
+_cache_lock = threading.Lock()
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """Raised instead of calling an upstream whose circuit is open.
+
+    A RequestException, so callers that already fall back when the upstream
+    is unreachable do so at once instead of waiting out a timeout.
+    """
+
+
+class CircuitBreaker:
+    """Closed / open / half-open state of one upstream, shared by all workers.
+
+    `failure_threshold` consecutive failures (connection errors, timeouts,
+    5xx responses) open the circuit and calls are refused for
+    `reset_timeout` seconds. Then one trial call is let through
+    (half-open): success closes the circuit, failure opens it again.
+
+    The state is the upstream's `upstream_circuits` row, so once any
+    gunicorn worker opens the circuit every worker falls back. Each process
+    keeps the row it last read in `cache` for `cache_ttl` seconds, so a
+    healthy upstream costs no query per call and other workers' changes are
+    seen within that time. The row is written only when the state changes:
+    a failure, a trial claim, or a success after failures. Refused calls
+    are counted in the cache and added to `rejected_total` with the next
+    write. Like CodeSequence.advance this runs in short transactions of its
+    own; on SQLite they give up on a locked database after `lock_timeout`
+    seconds, and if the row can't be read or written the call just goes
+    ahead.
+    """
+    CLOSED, HALF_OPEN, OPEN = 'closed', 'half_open', 'open'
+
+    def __init__(self, upstream, failure_threshold, reset_timeout, clock=datetime.utcnow,
+                 cache=None, cache_ttl=0, lock_timeout=None):
+        self.upstream = upstream
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._cache = cache if cache is not None else {}
+        self.cache_ttl = cache_ttl
+        self.lock_timeout = lock_timeout
+
+    def _where(self, *conditions):
+        return and_(UpstreamCircuit.__table__.c.upstream == self.upstream, *conditions)
+
+    @contextmanager
+    def _transaction(self):
+        """Short transaction of its own that won't sit out busy_timeout behind the caller's write lock"""
+        with db.engine.begin() as connection:
+            if self.lock_timeout is None or connection.dialect.name != 'sqlite':
+                yield connection
+                return
+            previous = connection.exec_driver_sql('PRAGMA busy_timeout').scalar()
+            connection.exec_driver_sql(f'PRAGMA busy_timeout = {int(self.lock_timeout * 1000)}')
+            try:
+                yield connection
+            finally:
+                connection.exec_driver_sql(f'PRAGMA busy_timeout = {previous}')
+
+    def _cached(self):
+        with _cache_lock:
+            entry = self._cache.get(self.upstream)
+        if entry is None or entry['expires'] <= time.monotonic():
+            return None
+        return entry
+
+    def _remember(self, row):
+        """Cache the row just read (None: no failures yet); refusals not yet written are kept"""
+        with _cache_lock:
+            previous = self._cache.get(self.upstream)
+            self._cache[self.upstream] = {
+                'expires': time.monotonic() + self.cache_ttl,
+                'state': row.state if row else self.CLOSED,
+                'failures': row.failures if row else 0,
+                'since': (row.opened_at if row.state == self.OPEN else row.trial_started_at)
+                         if row and row.state != self.CLOSED else None,
+                'last_error': row.last_error if row else None,
+                'rejected': previous['rejected'] if previous else 0,
+            }
+
+    def _forget(self):
+        """Drop the cached row after writing it; unwritten refusals are kept"""
+        with _cache_lock:
+            entry = self._cache.get(self.upstream)
+            if entry is not None:
+                entry['expires'] = 0
+
+    def _take_rejected(self):
+        with _cache_lock:
+            entry = self._cache.get(self.upstream)
+            if entry is None:
+                return 0
+            rejected, entry['rejected'] = entry['rejected'], 0
+            return rejected
+
+    def pending_rejected(self):
+        """Refusals by this process not yet added to rejected_total"""
+        with _cache_lock:
+            entry = self._cache.get(self.upstream)
+            return entry['rejected'] if entry else 0
+
+    def _refuse(self, failures, last_error):
+        raise CircuitOpenError(f'{self.upstream} circuit is open after {failures} failures '
+                               f'(last: {last_error})')
+
+    def before_call(self):
+        """Raise CircuitOpenError unless a call may go out now.
+
+        Returns True when the call's outcome has to be written back (it is
+        the half-open trial, or there are failures to clear on success).
+        """
+        cached = self._cached()
+        if cached is not None:
+            if cached['state'] == self.CLOSED:
+                return bool(cached['failures'])
+            waited = (self._clock() - cached['since']).total_seconds() if cached['since'] else None
+            if waited is not None and waited < self.reset_timeout:
+                with _cache_lock:
+                    cached['rejected'] += 1
+                self._refuse(cached['failures'], cached['last_error'])
+            # Time for a trial: only the database can hand it to one worker
+
+        table = UpstreamCircuit.__table__
+        try:
+            with db.engine.connect() as connection:
+                row = connection.execute(select(table).where(self._where())).first()
+            self._remember(row)
+            if row is None or row.state == self.CLOSED:
+                return bool(row and row.failures)
+            now = self._clock()
+            started = table.c.opened_at if row.state == self.OPEN else table.c.trial_started_at
+            since = row.opened_at if row.state == self.OPEN else row.trial_started_at
+            if since is None or (now - since).total_seconds() >= self.reset_timeout:
+                # Compare-and-set: one worker wins the trial, the others are refused below
+                with self._transaction() as connection:
+                    claimed = connection.execute(update(table).where(self._where(
+                        table.c.state == row.state, started.is_(None) if since is None else started == since
+                    )).values(state=self.HALF_OPEN, trial_started_at=now, updated_at=now)).rowcount
+                if claimed:
+                    self._forget()
+                    return True
+            with self._transaction() as connection:
+                connection.execute(update(table).where(self._where()).values(
+                    rejected_total=table.c.rejected_total + 1 + self._take_rejected()))
+        except SQLAlchemyError as e:
+            # Includes OperationalError on a locked database
+            current_app.logger.warning(f"{self.upstream} circuit state unavailable, calling anyway: {str(e)}")
+            return False
+        self._refuse(row.failures, row.last_error)
+
+    def _ensure_row(self):
+        """Create the upstream's row on its first failure"""
+        table = UpstreamCircuit.__table__
+        with db.engine.connect() as connection:
+            if connection.execute(select(table.c.upstream).where(self._where())).first() is not None:
+                return
+        try:
+            with self._transaction() as connection:
+                connection.execute(insert(table).values(
+                    upstream=self.upstream, state=self.CLOSED, failures=0,
+                    opened_total=0, rejected_total=0, updated_at=self._clock()))
+        except IntegrityError:
+            pass  # another worker created it first
+
+    def record_success(self):
+        """Returns True if this closed an open or half-open circuit"""
+        table = UpstreamCircuit.__table__
+        try:
+            with self._transaction() as connection:
+                row = connection.execute(select(table.c.state, table.c.failures).where(self._where())).first()
+                if row is None or (row.state == self.CLOSED and not row.failures):
+                    return False
+                connection.execute(update(table).where(self._where()).values(
+                    state=self.CLOSED, failures=0, trial_started_at=None, updated_at=self._clock(),
+                    rejected_total=table.c.rejected_total + self._take_rejected()))
+                return row.state != self.CLOSED
+        except SQLAlchemyError as e:
+            current_app.logger.warning(f"{self.upstream} circuit state not saved: {str(e)}")
+            return False
+        finally:
+            self._forget()
+
+    def record_failure(self, error):
+        """Returns True if this opened the circuit"""
+        table = UpstreamCircuit.__table__
+        now = self._clock()
+        try:
+            self._ensure_row()
+            with self._transaction() as connection:
+                connection.execute(update(table).where(self._where()).values(
+                    failures=table.c.failures + 1, last_error=str(error), updated_at=now,
+                    rejected_total=table.c.rejected_total + self._take_rejected()))
+                return bool(connection.execute(update(table).where(self._where(or_(
+                    table.c.state == self.HALF_OPEN,
+                    and_(table.c.state == self.CLOSED, table.c.failures >= self.failure_threshold)
+                ))).values(state=self.OPEN, opened_at=now, trial_started_at=None,
+                           opened_total=table.c.opened_total + 1)).rowcount)
+        except SQLAlchemyError as e:
+            current_app.logger.warning(f"{self.upstream} circuit state not saved: {str(e)}")
+            return False
+        finally:
+            self._forget()
+
+    def release_trial(self):
+        """Let another caller make the half-open trial (this one never reached the upstream)"""
+        table = UpstreamCircuit.__table__
+        try:
+            with self._transaction() as connection:
+                connection.execute(update(table).where(self._where(table.c.state == self.HALF_OPEN)).values(
+                    trial_started_at=None))
+        except SQLAlchemyError as e:
+            current_app.logger.warning(f"{self.upstream} circuit state not saved: {str(e)}")
+        finally:
+            self._forget()
+
+    @staticmethod
+    def snapshot(row, now, reset_timeout):
+        retry_in = None
+        if row.state == CircuitBreaker.OPEN:
+            retry_in = round(max(reset_timeout - (now - row.opened_at).total_seconds(), 0.0), 1)
+        return {
+            'upstream': row.upstream,
+            'state': row.state,
+            'failures': row.failures,
+            'retry_in': retry_in,
+            'opened_at': row.opened_at.isoformat() if row.opened_at else None,
+            'last_error': row.last_error,
+            'opened_total': row.opened_total,
+            'rejected_total': row.rejected_total
+        }
+
+
+def _build_session(config, retries):
+    retry = Retry(
+        total=retries,
+        connect=retries,
+        read=retries,
+        status=retries,
+        backoff_factor=config['HTTP_BACKOFF_FACTOR'],
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=RETRY_METHODS,
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(
+        pool_connections=1,
+        pool_maxsize=config['HTTP_POOL_SIZE'],
+        max_retries=retry
+    )
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def get_session(upstream, retries=None):
+    """Keep-alive Session for `upstream`, one per upstream per process.
+
+    Keyed by pid as well so a forked worker never shares pooled sockets
+    with its parent. `retries` overrides HTTP_RETRIES and gets a session
+    (and pool) of its own.
+    """
+    key = (os.getpid(), upstream, retries)
+    session = _sessions.get(key)
+    if session is None:
+        with _sessions_lock:
+            session = _sessions.get(key)
+            if session is None:
+                config = current_app.config
+                session = _build_session(config, config['HTTP_RETRIES'] if retries is None else retries)
+                _sessions[key] = session
+    return session
+
+
+def get_breaker(upstream):
+    """The CircuitBreaker of `upstream`, configured from the app"""
+    config = current_app.config
+    cache = current_app.extensions.setdefault('circuit_states', {})
+    return CircuitBreaker(upstream, config['CIRCUIT_FAILURE_THRESHOLD'], config['CIRCUIT_RESET_TIMEOUT'],
+                          cache=cache, cache_ttl=config['CIRCUIT_STATE_TTL'],
+                          lock_timeout=config['CIRCUIT_LOCK_TIMEOUT'])
+
+
+def circuit_states():
+    """State of every upstream that has failed at least once, by upstream name.
+
+    `rejected_total` includes this process's refusals not yet written.
+    """
+    now = datetime.utcnow()
+    reset_timeout = current_app.config['CIRCUIT_RESET_TIMEOUT']
+    rows = UpstreamCircuit.query.order_by(UpstreamCircuit.upstream).all()
+    states = [CircuitBreaker.snapshot(row, now, reset_timeout) for row in rows]
+    for state in states:
+        state['rejected_total'] += get_breaker(state['upstream']).pending_rejected()
+    return states
+
+
+def request(upstream, method, url, retries=None, **kwargs):
+    """Send a request to `upstream` through its pooled session.
+
+    Uses the configured (connect, read) timeout unless `timeout` is given,
+    retries connection errors and 502/503/504 with exponential backoff
+    (HTTP_RETRIES times, or `retries`; pass 0 where a user is waiting), and
+    logs the latency of every call. Raises requests' exceptions as usual,
+    and CircuitOpenError without sending anything while the upstream's
+    circuit is open.
+    """
+    config = current_app.config
+    kwargs.setdefault('timeout', (config['HTTP_CONNECT_TIMEOUT'], config['HTTP_READ_TIMEOUT']))
+    breaker = get_breaker(upstream)
+    report = breaker.before_call()
+    started = time.perf_counter()
+    try:
+        response = get_session(upstream, retries).request(method, url, **kwargs)
+    except requests.exceptions.RequestException as e:
+        elapsed = (time.perf_counter() - started) * 1000
+        current_app.logger.warning(f"{upstream} {method} {url} failed after {elapsed:.0f}ms: {str(e)}")
+        if breaker.record_failure(e):
+            current_app.logger.error(f"{upstream} circuit opened for {breaker.reset_timeout:.0f}s")
+        raise
+    except Exception:
+        # Not the upstream's fault, but a half-open trial must not stay in flight
+        if report:
+            breaker.release_trial()
+        raise
+    elapsed = (time.perf_counter() - started) * 1000
+    current_app.logger.info(f"{upstream} {method} {url} -> {response.status_code} in {elapsed:.0f}ms")
+    if response.status_code >= 500:
+        if breaker.record_failure(f'HTTP {response.status_code}'):
+            current_app.logger.error(f"{upstream} circuit opened for {breaker.reset_timeout:.0f}s")
+    elif report and breaker.record_success():
+        current_app.logger.warning(f"{upstream} circuit closed")
+    return response
+
+
+def get(upstream, url, **kwargs):
+    return request(upstream, 'GET', url, **kwargs)
+
+
+def post(upstream, url, **kwargs):
+    return request(upstream, 'POST', url, **kwargs)
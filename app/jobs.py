@@ -0,0 +1,184 @@
+import os
+import socket
+import time
+from datetime import datetime, timedelta
+from flask import current_app, g
+from sqlalchemy import update
+from app.models import Job
+from app import db
+
+HANDLERS = {}
+
+
+def job_handler(kind):
+    """Register `func(payload) -> result` as the handler for jobs of `kind`"""
+    def decorator(func):
+        HANDLERS[kind] = func
+        return func
+    return decorator
+
+
+def enqueue(kind, payload=None, dedupe=False, max_attempts=None):
+    """Add a job to the outbox and commit it.
+
+    With `dedupe`, an existing pending or running job of the same kind is
+    returned instead of queueing another one.
+    """
+    if dedupe:
+        existing = Job.query.filter(
+            Job.kind == kind,
+            Job.status.in_(['pending', 'running'])
+        ).order_by(Job.id).first()
+        if existing:
+            return existing
+
+    job = Job(
+        kind=kind,
+        payload=payload or {},
+        status='pending',
+        max_attempts=max_attempts or current_app.config['JOB_MAX_ATTEMPTS'],
+        run_at=datetime.utcnow()
+    )
+    db.session.add(job)
+    db.session.commit()
+    return job
+
+
+def default_worker_id():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def claim_next(worker_id):
+    """Claim the next due job, or return None.
+
+    The candidate row is selected FOR UPDATE SKIP LOCKED where the database
+    supports it, and the claim itself is a conditional UPDATE on
+    status='pending', so two workers can never run the same job.
+    """
+    now = datetime.utcnow()
+    candidate = db.session.query(Job.id).filter(
+        Job.status == 'pending',
+        Job.run_at <= now
+    ).order_by(Job.run_at, Job.id).limit(1).with_for_update(skip_locked=True).scalar()
+    if candidate is None:
+        db.session.rollback()
+        return None
+
+    claimed = db.session.execute(
+        update(Job)
+        .where(Job.id == candidate, Job.status == 'pending')
+        .values(status='running', locked_at=now, locked_by=worker_id,
+                attempts=Job.attempts + 1, updated_at=now)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.session.commit()
+    if not claimed:
+        return None
+    return db.session.get(Job, candidate, populate_existing=True)
+
+
+def backoff_delay(attempts):
+    config = current_app.config
+    return min(config['JOB_BACKOFF_BASE'] * (2 ** max(attempts - 1, 0)), config['JOB_BACKOFF_MAX'])
+
+
+def report_progress(result):
+    """Store a partial result on the running job and commit it.
+
+    Lets a long handler show how far it got in GET /api/jobs/<id> before it
+    finishes; the final result replaces it. Does nothing outside run_job.
+    """
+    job_id = g.get('job_id')
+    if job_id is None:
+        return
+    db.session.execute(
+        update(Job)
+        .where(Job.id == job_id)
+        .values(result=result, updated_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+
+
+def run_job(job):
+    """Run a claimed job and record its outcome, rescheduling failures"""
+    handler = HANDLERS.get(job.kind)
+    g.job_id = job.id
+    try:
+        if handler is None:
+            raise LookupError(f'No handler registered for job kind {job.kind!r}')
+        result = handler(job.payload or {})
+    except Exception as e:
+        db.session.rollback()
+        job = db.session.get(Job, job.id, populate_existing=True)
+        job.last_error = str(e)
+        job.locked_at = None
+        job.locked_by = None
+        if job.attempts >= job.max_attempts:
+            job.status = 'failed'
+            job.finished_at = datetime.utcnow()
+            current_app.logger.error(f'Job {job.id} ({job.kind}) failed permanently: {str(e)}')
+        else:
+            delay = backoff_delay(job.attempts)
+            job.status = 'pending'
+            job.run_at = datetime.utcnow() + timedelta(seconds=delay)
+            current_app.logger.warning(f'Job {job.id} ({job.kind}) attempt {job.attempts} failed, '
+                                       f'retrying in {delay:.0f}s: {str(e)}')
+        db.session.commit()
+        return job
+    finally:
+        g.pop('job_id', None)
+
+    job = db.session.get(Job, job.id, populate_existing=True)
+    job.status = 'done'
+    job.result = result
+    job.last_error = None
+    job.locked_at = None
+    job.locked_by = None
+    job.finished_at = datetime.utcnow()
+    db.session.commit()
+    current_app.logger.info(f'Job {job.id} ({job.kind}) done after {job.attempts} attempt(s)')
+    return job
+
+
+def release_stale():
+    """Return running jobs whose worker died to the queue"""
+    cutoff = datetime.utcnow() - timedelta(seconds=current_app.config['JOB_LOCK_TIMEOUT'])
+    released = db.session.execute(
+        update(Job)
+        .where(Job.status == 'running', Job.locked_at < cutoff)
+        .values(status='pending', locked_at=None, locked_by=None, run_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.session.commit()
+    if released:
+        current_app.logger.warning(f'Released {released} stale job(s)')
+    return released
+
+
+def work(worker_id=None, once=False, poll_interval=None, stop=None):
+    """Claim and run jobs until `stop` (a threading.Event) is set.
+
+    With `once`, return as soon as no job is due. The job in progress is
+    always finished before stopping. Returns the number of jobs run.
+    """
+    import app.services  # noqa: F401 - registers the job handlers
+
+    worker_id = worker_id or default_worker_id()
+    poll_interval = poll_interval if poll_interval is not None else current_app.config['JOB_POLL_INTERVAL']
+    processed = 0
+    release_stale()
+    while stop is None or not stop.is_set():
+        job = claim_next(worker_id)
+        if job is None:
+            if once:
+                break
+            if stop is not None:
+                stop.wait(poll_interval)
+            else:
+                time.sleep(poll_interval)
+            release_stale()
+            continue
+        run_job(job)
+        processed += 1
+    return processed
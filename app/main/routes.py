@@ -1,19 +1,27 @@
-from flask import render_template, redirect, url_for
+from flask import render_template, redirect, request, url_for
 from flask_login import login_required, current_user
 from app.main import bp
-from app.models import Project, Campaign
+from app.models import Project
+from app.search import search as run_search
 
 @bp.route('/')
 @bp.route('/index')
 def index():
     if current_user.is_authenticated:
         recent_projects = Project.query.filter_by(created_by=current_user).order_by(Project.created_at.desc()).limit(5).all()
-        total_projects = Project.query.filter_by(created_by=current_user).count()
-        total_campaigns = Campaign.query.join(Project).filter(Project.created_by == current_user).count()
         
+        # Totals are stored on the user row, already loaded by Flask-Login
         return render_template('main/index.html', 
                              title='Dashboard',
                              recent_projects=recent_projects,
-                             total_projects=total_projects,
-                             total_campaigns=total_campaigns)
-    return redirect(url_for('auth.login'))
\ No newline at end of file
+                             total_projects=current_user.total_projects,
+                             total_campaigns=current_user.total_campaigns,
+                             total_plans=current_user.total_plans)
+    return redirect(url_for('auth.login'))
+
+@bp.route('/search')
+@login_required
+def search():
+    query = request.args.get('q', '').strip()
+    results = run_search(query, limit=50) if query else []
+    return render_template('main/search.html', title='Search', query=query, results=results)
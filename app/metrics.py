@@ -0,0 +1,206 @@
+"""Per-endpoint request metrics in Prometheus text format, served on /metrics.
+
+Counts are kept in memory for the current process: each gunicorn worker
+reports its own, so every request series carries a `worker` label (the
+pid) and a scrape through the load balancer never looks like a counter
+reset. Sum over `worker` in queries. Recording a request is a handful of
+dict updates under a lock, cheap enough to leave on in production.
+"""
+import os
+import threading
+import time
+from bisect import bisect_left
+from flask import Response, g, has_request_context, request
+from sqlalchemy import event
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def lines(self, name, labels):
+        cumulative = 0
+        for bound, count in zip(self.buckets + ('+Inf',), self.counts):
+            cumulative += count
+            yield f'{name}_bucket{_labels(labels, le=bound)} {cumulative}'
+        yield f'{name}_sum{_labels(labels)} {self.sum}'
+        yield f'{name}_count{_labels(labels)} {self.count}'
+
+
+class _Endpoint:
+    def __init__(self):
+        self.statuses = {}
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.queries = Histogram(QUERY_COUNT_BUCKETS)
+        self.query_seconds = 0.0
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints = {}
+
+    def record(self, method, endpoint, status, seconds, query_count, query_seconds):
+        with self._lock:
+            stats = self._endpoints.get((method, endpoint))
+            if stats is None:
+                stats = self._endpoints[(method, endpoint)] = _Endpoint()
+            stats.statuses[status] = stats.statuses.get(status, 0) + 1
+            stats.latency.observe(seconds)
+            stats.queries.observe(query_count)
+            stats.query_seconds += query_seconds
+
+    def reset(self):
+        with self._lock:
+            self._endpoints.clear()
+
+    def render(self):
+        # Read at scrape time: a worker forked from a preloaded app has its own pid
+        worker = str(os.getpid())
+        with self._lock:
+            endpoints = [(dict(worker=worker, method=method, endpoint=endpoint), stats)
+                         for (method, endpoint), stats in sorted(self._endpoints.items())]
+            lines = [
+                '# HELP http_requests_total Requests handled, by endpoint and status code.',
+                '# TYPE http_requests_total counter',
+            ]
+            for labels, stats in endpoints:
+                for status, count in sorted(stats.statuses.items()):
+                    lines.append(f'http_requests_total{_labels(labels, status=status)} {count}')
+
+            lines += [
+                '# HELP http_request_duration_seconds Time from request start until the response was returned.',
+                '# TYPE http_request_duration_seconds histogram',
+            ]
+            for labels, stats in endpoints:
+                lines.extend(stats.latency.lines('http_request_duration_seconds', labels))
+
+            lines += [
+                '# HELP http_request_sql_queries SQL statements executed per request.',
+                '# TYPE http_request_sql_queries histogram',
+            ]
+            for labels, stats in endpoints:
+                lines.extend(stats.queries.lines('http_request_sql_queries', labels))
+
+            lines += [
+                '# HELP http_request_sql_seconds_total Time spent executing SQL statements.',
+                '# TYPE http_request_sql_seconds_total counter',
+            ]
+            for labels, stats in endpoints:
+                lines.append(f'http_request_sql_seconds_total{_labels(labels)} {stats.query_seconds}')
+        return '\n'.join(lines) + '\n'
+
+
+def _labels(labels, **extra):
+    labels = dict(labels, **extra)
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{value}"' for key, value in labels.items()) + '}'
+
+
+registry = MetricsRegistry()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context():
+        conn.info.setdefault('metrics_query_started', {})[context] = time.perf_counter()
+
+
+def _count_query(conn, context):
+    started = conn.info.get('metrics_query_started', {}).pop(context, None)
+    if started is None or not has_request_context():
+        return
+    g.metrics_query_count = g.get('metrics_query_count', 0) + 1
+    g.metrics_query_seconds = g.get('metrics_query_seconds', 0.0) + time.perf_counter() - started
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    _count_query(conn, context)
+
+
+def _handle_error(exception_context):
+    # A failed statement never reaches after_cursor_execute; count it here so
+    # its start time is not left behind on the pooled connection
+    connection = exception_context.connection
+    if connection is not None and not connection.invalidated:
+        _count_query(connection, exception_context.execution_context)
+
+
+def _start_timer():
+    g.metrics_started = time.perf_counter()
+
+
+def _remember_status(response):
+    g.metrics_status = response.status_code
+    return response
+
+
+def _record(exc):
+    started = g.pop('metrics_started', None)
+    if started is None:
+        return
+    status = g.pop('metrics_status', 500 if exc is not None else 200)
+    registry.record(
+        request.method,
+        request.endpoint or 'unmatched',
+        status,
+        time.perf_counter() - started,
+        g.pop('metrics_query_count', 0),
+        g.pop('metrics_query_seconds', 0.0)
+    )
+
+
+CIRCUIT_STATES = {'closed': 0, 'half_open': 1, 'open': 2}
+# (metric, type, help, value of a circuit_states() entry)
+CIRCUIT_METRICS = (
+    ('upstream_circuit_state', 'gauge', 'Circuit breaker state: 0 closed, 1 half-open, 2 open.',
+     lambda state: CIRCUIT_STATES[state['state']]),
+    ('upstream_circuit_failures', 'gauge', 'Consecutive failed calls to the upstream.',
+     lambda state: state['failures']),
+    ('upstream_circuit_opened_total', 'counter', 'Times the circuit opened.',
+     lambda state: state['opened_total']),
+    ('upstream_circuit_rejected_total', 'counter', 'Calls refused without contacting the upstream.',
+     lambda state: state['rejected_total']),
+)
+
+
+def render_circuits(states):
+    """Prometheus lines for app.http_client.circuit_states().
+
+    No `worker` label: the state is shared, every worker reports the same row.
+    """
+    lines = []
+    for name, kind, help_text, value in CIRCUIT_METRICS:
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}']
+        lines += [f'{name}{_labels(dict(upstream=state["upstream"]))} {value(state)}' for state in states]
+    return '\n'.join(lines) + '\n'
+
+
+def metrics():
+    """Prometheus scrape endpoint"""
+    from app.http_client import circuit_states
+    return Response(registry.render() + render_circuits(circuit_states()), mimetype='text/plain; version=0.0.4')
+
+
+def init_app(app, engine):
+    """Record every request to `app` and every statement sent through `engine`"""
+    from app.api.routes import require_api_key
+
+    event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+    event.listen(engine, 'handle_error', _handle_error)
+    app.before_request(_start_timer)
+    app.after_request(_remember_status)
+    app.teardown_request(_record)
+    app.add_url_rule('/metrics', 'metrics', require_api_key(metrics))
@@ -2,6 +2,10 @@ from datetime import datetime
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
 from app import db, login_manager
+from sqlalchemy import event
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
 import string
 
 @login_manager.user_loader
@@ -19,6 +23,10 @@ class User(UserMixin, db.Model):
     agency_crm_id = db.Column(db.Integer, unique=True)
     is_active = db.Column(db.Boolean, default=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Stored totals for the dashboard, see adjust_counters
+    total_projects = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    total_campaigns = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    total_plans = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     
     projects = db.relationship('Project', back_populates='created_by', lazy='dynamic')
     
@@ -43,29 +51,53 @@ class Project(db.Model):
     end_date = db.Column(db.Date, nullable=False)
     comments = db.Column(db.Text)
     overall_info = db.Column(db.Text)
-    status = db.Column(db.String(20), default='active')
+    status = db.Column(db.String(20), default='active', index=True)
     created_by_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+    # Campaign suffixes handed out so far (1 = A, 27 = AA); NULL until first used
+    last_campaign_number = db.Column(db.Integer)
+    # Stored totals, see adjust_counters (campaign_count/plan_count below are computed on read)
+    total_campaigns = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    total_plans = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     
     created_by = db.relationship('User', back_populates='projects')
     campaigns = db.relationship('Campaign', back_populates='project', cascade='all, delete-orphan')
     
+    __table_args__ = (
+        # "My projects, newest first" (projects list and dashboard), and the
+        # other sort orders of the projects list
+        db.Index('ix_projects_created_by_id_created_at', 'created_by_id', 'created_at'),
+        db.Index('ix_projects_created_by_id_start_date', 'created_by_id', 'start_date'),
+        db.Index('ix_projects_created_by_id_end_date', 'created_by_id', 'end_date'),
+        db.Index('ix_projects_created_by_id_code', 'created_by_id', 'code'),
+    )
+    
     @staticmethod
     def generate_project_code():
-        current_year = datetime.now().year % 100
-        
-        last_project = Project.query.filter(
-            Project.code.like(f'PLN-{current_year:02d}-%')
-        ).order_by(Project.id.desc()).first()
-        
-        if last_project:
-            last_number = int(last_project.code.split('-')[-1])
-            new_number = last_number + 1
-        else:
-            new_number = 1
+        return Project.allocate_project_codes(1)[0]
+    
+    @staticmethod
+    def allocate_project_codes(count):
+        """Reserve `count` consecutive PLN-YY-NNN codes for the current year.
         
-        return f'PLN-{current_year:02d}-{new_number:03d}'
+        The numbers come from the year's row in code_sequences, advanced by a
+        single UPDATE in the caller's transaction, so concurrent creates never
+        get the same code and a rolled back create gives its number back.
+        """
+        prefix = f'PLN-{datetime.now().year % 100:02d}'
+        last = CodeSequence.advance(prefix, count, lambda: Project._highest_code_number(prefix))
+        return [f'{prefix}-{number:03d}' for number in range(last - count + 1, last + 1)]
+    
+    @staticmethod
+    def _highest_code_number(prefix):
+        """Highest number already used under `prefix`, to seed its sequence"""
+        highest = 0
+        for (code,) in db.session.query(Project.code).filter(Project.code.like(f'{prefix}-%')):
+            suffix = code.rsplit('-', 1)[-1]
+            if suffix.isdigit():
+                highest = max(highest, int(suffix))
+        return highest
     
     def __repr__(self):
         return f'<Project {self.code}: {self.name}>'
@@ -76,41 +108,139 @@ class Campaign(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     code = db.Column(db.String(25), unique=True, nullable=False)
     name = db.Column(db.String(200), nullable=False)
-    project_id = db.Column(db.Integer, db.ForeignKey('projects.id'), nullable=False)
+    project_id = db.Column(db.Integer, db.ForeignKey('projects.id'), nullable=False, index=True)
     start_date = db.Column(db.Date, nullable=False)
     end_date = db.Column(db.Date, nullable=False)
     overall_info = db.Column(db.Text)
-    status = db.Column(db.String(20), default='active')
+    status = db.Column(db.String(20), default='active', index=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+    # Plans created so far, for default PlanN names; NULL until first used
+    last_plan_number = db.Column(db.Integer)
     
     project = db.relationship('Project', back_populates='campaigns')
     plans = db.relationship('Plan', back_populates='campaign', cascade='all, delete-orphan')
     
     @staticmethod
-    def generate_campaign_code(project_code):
-        last_campaign = Campaign.query.join(Project).filter(
-            Project.code == project_code
-        ).order_by(Campaign.id.desc()).first()
+    def generate_campaign_code(project):
+        return Campaign.allocate_campaign_codes(project, 1)[0]
+    
+    @staticmethod
+    def allocate_campaign_codes(project, count):
+        """Reserve `count` campaign codes (PROJECT-A, ..., PROJECT-Z, PROJECT-AA, ...).
+        
+        The project's last_campaign_number is advanced by one UPDATE in the
+        caller's transaction. A project that has never been counted starts
+        from its highest existing suffix; COALESCE makes that seed apply only
+        if no concurrent create has set the counter first.
+        """
+        if count < 1:
+            raise ValueError(f'Invalid count: {count}')
         
-        if last_campaign:
-            last_letter = last_campaign.code.split('-')[-1]
-            if last_letter and last_letter[0] in string.ascii_uppercase:
-                next_index = string.ascii_uppercase.index(last_letter[0]) + 1
-                if next_index < len(string.ascii_uppercase):
-                    next_letter = string.ascii_uppercase[next_index]
-                else:
-                    next_letter = 'AA'
-            else:
-                next_letter = 'A'
-        else:
-            next_letter = 'A'
+        seed = 0
+        if project.last_campaign_number is None:
+            for (code,) in db.session.query(Campaign.code).filter(Campaign.project_id == project.id):
+                seed = max(seed, campaign_suffix_number(code.rsplit('-', 1)[-1]))
         
-        return f'{project_code}-{next_letter}'
+        last = _advance_counter(project, 'last_campaign_number', seed, count)
+        return [f'{project.code}-{campaign_suffix(number)}' for number in range(last - count + 1, last + 1)]
+    
+    @staticmethod
+    def allocate_plan_names(campaign, count):
+        """Reserve `count` default plan names (Plan1, Plan2, ...) for `campaign`.
+        
+        Same scheme as allocate_campaign_codes: one UPDATE of the campaign's
+        last_plan_number, seeded from its existing plans on first use.
+        """
+        return Campaign.allocate_plan_names_many([campaign], {campaign.id: count})[campaign.id]
+    
+    @staticmethod
+    def allocate_plan_names_many(campaigns, counts):
+        """Reserve default plan names for several campaigns at once.
+        
+        `counts` maps campaign id to how many names it needs; returns
+        {campaign id: [names]}. Whatever the number of campaigns this is one
+        seed SELECT (only if some counter was never set), one UPDATE and one
+        SELECT of the new counter values.
+        """
+        if not counts or min(counts.values()) < 1:
+            raise ValueError(f'Invalid counts: {counts}')
+        
+        unseeded = [campaign.id for campaign in campaigns if campaign.last_plan_number is None]
+        names = {campaign_id: [] for campaign_id in unseeded}
+        if unseeded:
+            for campaign_id, name in db.session.query(Plan.campaign_id, Plan.name).filter(
+                    Plan.campaign_id.in_(unseeded)):
+                names[campaign_id].append(name)
+        seeds = {}
+        for campaign_id, existing in names.items():
+            numbers = [int(name[4:]) for name in existing if name.startswith('Plan') and name[4:].isdigit()]
+            seeds[campaign_id] = max([len(existing)] + numbers)
+        
+        last = _advance_counters(campaigns, 'last_plan_number', seeds, counts)
+        return {campaign_id: [f'Plan{number}' for number in range(last[campaign_id] - count + 1,
+                                                                     last[campaign_id] + 1)]
+                for campaign_id, count in counts.items()}
     
     def __repr__(self):
         return f'<Campaign {self.code}: {self.name}>'
 
+def _insert_or_ignore(model, **values):
+    """INSERT a row in the session's transaction unless its primary key is already taken"""
+    dialect = db.session.get_bind().dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        insert = (sqlite_insert if dialect == 'sqlite' else postgresql_insert)(model.__table__)
+        db.session.execute(insert.values(**values).on_conflict_do_nothing())
+        return
+    try:
+        with db.session.begin_nested():
+            db.session.execute(model.__table__.insert().values(**values))
+    except IntegrityError:
+        pass
+
+def _advance_counter(obj, attribute, seed, count):
+    """Add `count` to a per-row counter column with one UPDATE and return the new value.
+    
+    `seed` only applies while the column is still NULL. updated_at is left
+    alone so handing out numbers does not show up as a change to the row.
+    """
+    return _advance_counters([obj], attribute, {obj.id: seed}, {obj.id: count})[obj.id]
+
+def _advance_counters(objs, attribute, seeds, counts):
+    """_advance_counter for several rows of one model: `counts` and `seeds`
+    ({row id: value}, a missing seed is 0) go into a single UPDATE ... CASE,
+    and the new values ({row id: value}) are read back with one SELECT."""
+    model = type(objs[0])
+    column = getattr(model, attribute)
+    ids = sorted(counts)
+    db.session.execute(
+        db.update(model).where(model.id.in_(ids)).values({
+            column: db.case(*[(model.id == row_id, db.func.coalesce(column, seeds.get(row_id, 0)) + counts[row_id])
+                              for row_id in ids]),
+            model.updated_at: model.updated_at
+        }).execution_options(synchronize_session=False)
+    )
+    for obj in objs:
+        db.session.expire(obj, [attribute])
+    return dict(db.session.execute(db.select(model.id, column).where(model.id.in_(ids))).all())
+
+def campaign_suffix(number):
+    """1 -> A, 26 -> Z, 27 -> AA, 28 -> AB, ..."""
+    suffix = ''
+    while number > 0:
+        number, remainder = divmod(number - 1, 26)
+        suffix = string.ascii_uppercase[remainder] + suffix
+    return suffix
+
+def campaign_suffix_number(suffix):
+    """Inverse of campaign_suffix; 0 for anything that is not a letter suffix"""
+    if not suffix or not all(letter in string.ascii_uppercase for letter in suffix):
+        return 0
+    number = 0
+    for letter in suffix:
+        number = number * 26 + string.ascii_uppercase.index(letter) + 1
+    return number
+
 class Plan(db.Model):
     __tablename__ = 'plans'
     
@@ -121,9 +251,333 @@ class Plan(db.Model):
     budget = db.Column(db.Float)
     status = db.Column(db.String(20), default='draft')
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
     
     campaign = db.relationship('Campaign', back_populates='plans')
     
+    __table_args__ = (
+        # Also serves every plans-of-a-campaign lookup via its leading column
+        db.Index('ix_plans_campaign_id_name', 'campaign_id', 'name'),
+    )
+    
+    def __repr__(self):
+        return f'<Plan {self.name}>'
+
+class CodeSequence(db.Model):
+    """Last number handed out per code prefix (e.g. PLN-25)"""
+    __tablename__ = 'code_sequences'
+    
+    name = db.Column(db.String(50), primary_key=True)
+    value = db.Column(db.Integer, nullable=False, default=0)
+    
+    @staticmethod
+    def advance(name, count=1, seed=None):
+        """Add `count` to sequence `name` and return its new value.
+        
+        The increment is one UPDATE, which holds the row lock until the
+        caller commits. A missing row is created first, in the caller's
+        transaction, starting from `seed()` (or 0); the INSERT does nothing
+        if another process created the row at the same moment, and then its
+        row is used instead. (A side connection would wait on the write lock
+        the caller may already hold, e.g. after flushing a Project.)
+        """
+        if count < 1:
+            raise ValueError(f'Invalid count: {count}')
+        
+        statement = db.update(CodeSequence).where(CodeSequence.name == name).values(
+            value=CodeSequence.value + count
+        ).execution_options(synchronize_session=False)
+        
+        current = db.select(CodeSequence.value).where(CodeSequence.name == name)
+        if db.session.execute(current).first() is None:
+            _insert_or_ignore(CodeSequence, name=name, value=seed() if seed else 0)
+        
+        db.session.execute(statement)
+        return db.session.execute(current).scalar_one()
+    
     def __repr__(self):
-        return f'<Plan {self.name}>'
\ No newline at end of file
+        return f'<CodeSequence {self.name}={self.value}>'
+
+class Brand(db.Model):
+    """Local mirror of agency-crm brands, kept fresh by BrandService"""
+    __tablename__ = 'brands'
+    
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)  # agency-crm brand id
+    name = db.Column(db.String(200))
+    full_name = db.Column(db.String(200), nullable=False)
+    is_active = db.Column(db.Boolean, default=True, nullable=False, index=True)
+    synced_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<Brand {self.id}: {self.full_name}>'
+
+class SyncState(db.Model):
+    """Freshness bookkeeping for data mirrored from other systems"""
+    __tablename__ = 'sync_state'
+    
+    name = db.Column(db.String(50), primary_key=True)
+    last_attempt_at = db.Column(db.DateTime)
+    last_success_at = db.Column(db.DateTime)
+    last_error = db.Column(db.Text)
+    item_count = db.Column(db.Integer, default=0)
+    
+    @staticmethod
+    def get(name):
+        return db.session.get(SyncState, name) or SyncState(name=name, item_count=0)
+    
+    def is_stale(self, ttl_seconds):
+        if self.last_success_at is None:
+            return True
+        return (datetime.utcnow() - self.last_success_at).total_seconds() > ttl_seconds
+    
+    def __repr__(self):
+        return f'<SyncState {self.name}>'
+
+class UpstreamCircuit(db.Model):
+    """Circuit breaker state of an upstream, shared by every worker (see app.http_client)"""
+    __tablename__ = 'upstream_circuits'
+    
+    upstream = db.Column(db.String(50), primary_key=True)
+    state = db.Column(db.String(10), nullable=False, default='closed')  # closed, open, half_open
+    failures = db.Column(db.Integer, nullable=False, default=0)  # consecutive
+    opened_at = db.Column(db.DateTime)
+    trial_started_at = db.Column(db.DateTime)
+    last_error = db.Column(db.Text)
+    opened_total = db.Column(db.Integer, nullable=False, default=0)
+    rejected_total = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<UpstreamCircuit {self.upstream} {self.state}>'
+
+class EkranuPush(db.Model):
+    """Last campaign payload successfully pushed to ekranu-crm, per external_id"""
+    __tablename__ = 'ekranu_pushes'
+    
+    external_id = db.Column(db.String(50), primary_key=True)
+    campaign_id = db.Column(db.Integer, nullable=False)
+    content_hash = db.Column(db.String(64), nullable=False)
+    pushed_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<EkranuPush {self.external_id}>'
+
+class Job(db.Model):
+    """Durable outbox entry for work done outside the request cycle (see app/jobs.py)"""
+    __tablename__ = 'jobs'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)
+    payload = db.Column(db.JSON)
+    status = db.Column(db.String(20), default='pending', nullable=False)  # pending, running, done, failed
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    max_attempts = db.Column(db.Integer, default=5, nullable=False)
+    run_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    locked_at = db.Column(db.DateTime)
+    locked_by = db.Column(db.String(100))
+    last_error = db.Column(db.Text)
+    result = db.Column(db.JSON)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
+    
+    __table_args__ = (
+        db.Index('ix_jobs_status_run_at', 'status', 'run_at'),
+        db.Index('ix_jobs_kind_status', 'kind', 'status'),
+    )
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'attempts': self.attempts,
+            'max_attempts': self.max_attempts,
+            'run_at': self.run_at.isoformat() if self.run_at else None,
+            'last_error': self.last_error,
+            'result': self.result,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+    
+    def __repr__(self):
+        return f'<Job {self.id} {self.kind} {self.status}>'
+
+class Tombstone(db.Model):
+    """Record of a deleted project, campaign or plan, kept for delta sync consumers"""
+    __tablename__ = 'tombstones'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    entity_type = db.Column(db.String(20), nullable=False)
+    entity_id = db.Column(db.Integer, nullable=False)
+    parent_id = db.Column(db.Integer)
+    code = db.Column(db.String(25))
+    name = db.Column(db.String(200))
+    deleted_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
+    
+    __table_args__ = (
+        db.Index('ix_tombstones_entity_type_deleted_at', 'entity_type', 'deleted_at'),
+    )
+    
+    @staticmethod
+    def record(connection, entity_type, entity_id, parent_id=None, code=None, name=None):
+        """Insert a tombstone on the flushing connection (usable from mapper events)"""
+        connection.execute(Tombstone.__table__.insert().values(
+            entity_type=entity_type,
+            entity_id=entity_id,
+            parent_id=parent_id,
+            code=code,
+            name=name,
+            deleted_at=datetime.utcnow()
+        ))
+    
+    def __repr__(self):
+        return f'<Tombstone {self.entity_type} {self.entity_id}>'
+
+def _counter_statements(model):
+    """UPDATEs adding :delta to every stored total that counts `model` rows
+    under the parent row :parent_id"""
+    users, projects, campaigns = User.__table__, Project.__table__, Campaign.__table__
+    parent_id = db.bindparam('parent_id')
+    if model is Project:
+        targets = [(users, 'total_projects', parent_id)]
+    elif model is Campaign:
+        owner_id = db.select(projects.c.created_by_id).where(projects.c.id == parent_id).scalar_subquery()
+        targets = [(projects, 'total_campaigns', parent_id), (users, 'total_campaigns', owner_id)]
+    else:
+        project_id = db.select(campaigns.c.project_id).where(campaigns.c.id == parent_id).scalar_subquery()
+        owner_id = db.select(projects.c.created_by_id).where(projects.c.id == project_id).scalar_subquery()
+        targets = [(projects, 'total_plans', project_id), (users, 'total_plans', owner_id)]
+    
+    statements = []
+    for table, name, row_id in targets:
+        values = {name: table.c[name] + db.bindparam('delta')}
+        if 'updated_at' in table.c:
+            # A recount is not a change to the row as far as delta sync is concerned
+            values['updated_at'] = table.c.updated_at
+        statements.append(db.update(table).where(table.c.id == row_id).values(values))
+    return statements
+
+def adjust_counters(connection, model, deltas):
+    """Add `deltas` ({parent id: change}) to the stored totals counting `model` rows.
+    
+    The parent is what the rows point at: created_by_id for projects,
+    project_id for campaigns, campaign_id for plans. ORM inserts and deletes
+    are counted by the mapper events below; bulk INSERT/DELETE statements
+    skip those and must call this themselves. `connection` may be the session.
+    """
+    params = [{'parent_id': parent_id, 'delta': delta} for parent_id, delta in deltas.items() if delta]
+    if not params:
+        return
+    for statement in _counter_statements(model):
+        connection.execute(statement, params)
+
+def rebuild_counters():
+    """Recompute every stored total from the rows themselves; returns (users, projects) updated"""
+    users, projects = User.__table__, Project.__table__
+    campaigns, plans = Campaign.__table__, Plan.__table__
+    
+    updated_projects = db.session.execute(db.update(projects).values({
+        projects.c.total_campaigns: db.select(db.func.count()).select_from(campaigns)
+            .where(campaigns.c.project_id == projects.c.id).scalar_subquery(),
+        projects.c.total_plans: db.select(db.func.count()).select_from(plans)
+            .join(campaigns, plans.c.campaign_id == campaigns.c.id)
+            .where(campaigns.c.project_id == projects.c.id).scalar_subquery(),
+        projects.c.updated_at: projects.c.updated_at
+    })).rowcount
+    
+    def owned(expression):
+        return db.select(expression).where(projects.c.created_by_id == users.c.id).scalar_subquery()
+    
+    updated_users = db.session.execute(db.update(users).values({
+        users.c.total_projects: owned(db.func.count()),
+        users.c.total_campaigns: owned(db.func.coalesce(db.func.sum(projects.c.total_campaigns), 0)),
+        users.c.total_plans: owned(db.func.coalesce(db.func.sum(projects.c.total_plans), 0))
+    })).rowcount
+    db.session.commit()
+    return updated_users, updated_projects
+
+@event.listens_for(Project, 'after_insert')
+def _project_inserted(mapper, connection, target):
+    adjust_counters(connection, Project, {target.created_by_id: 1})
+
+@event.listens_for(Campaign, 'after_insert')
+def _campaign_inserted(mapper, connection, target):
+    adjust_counters(connection, Campaign, {target.project_id: 1})
+
+@event.listens_for(Plan, 'after_insert')
+def _plan_inserted(mapper, connection, target):
+    adjust_counters(connection, Plan, {target.campaign_id: 1})
+
+@event.listens_for(Project, 'after_delete')
+def _project_deleted(mapper, connection, target):
+    adjust_counters(connection, Project, {target.created_by_id: -1})
+    Tombstone.record(connection, 'project', target.id, code=target.code, name=target.name)
+
+@event.listens_for(Campaign, 'after_delete')
+def _campaign_deleted(mapper, connection, target):
+    # Runs before the project row goes, as the unit of work deletes children first
+    adjust_counters(connection, Campaign, {target.project_id: -1})
+    Tombstone.record(connection, 'campaign', target.id, parent_id=target.project_id,
+                     code=target.code, name=target.name)
+
+@event.listens_for(Plan, 'after_delete')
+def _plan_deleted(mapper, connection, target):
+    adjust_counters(connection, Plan, {target.campaign_id: -1})
+    Tombstone.record(connection, 'plan', target.id, parent_id=target.campaign_id, name=target.name)
+
+# SQL-side aggregates. Deferred so ordinary loads skip them; serializers and
+# views that need them ask for them explicitly (load_only/undefer) and get the
+# numbers in the same SELECT as the parent rows via correlated subqueries.
+Campaign.plan_count = db.column_property(
+    db.select(db.func.count(Plan.id))
+    .where(Plan.campaign_id == Campaign.id)
+    .correlate_except(Plan)
+    .scalar_subquery(),
+    deferred=True
+)
+Campaign.plan_budget_total = db.column_property(
+    db.select(db.func.coalesce(db.func.sum(Plan.budget), 0.0))
+    .where(Plan.campaign_id == Campaign.id)
+    .correlate_except(Plan)
+    .scalar_subquery(),
+    deferred=True
+)
+Campaign.plan_budget_avg = db.column_property(
+    db.select(db.func.avg(Plan.budget))
+    .where(Plan.campaign_id == Campaign.id)
+    .correlate_except(Plan)
+    .scalar_subquery(),
+    deferred=True
+)
+Project.campaign_count = db.column_property(
+    db.select(db.func.count(Campaign.id))
+    .where(Campaign.project_id == Project.id)
+    .correlate_except(Campaign)
+    .scalar_subquery(),
+    deferred=True
+)
+Project.plan_count = db.column_property(
+    db.select(db.func.count(Plan.id))
+    .join(Campaign, Plan.campaign_id == Campaign.id)
+    .where(Campaign.project_id == Project.id)
+    .correlate_except(Campaign, Plan)
+    .scalar_subquery(),
+    deferred=True
+)
+Project.plan_budget_total = db.column_property(
+    db.select(db.func.coalesce(db.func.sum(Plan.budget), 0.0))
+    .join(Campaign, Plan.campaign_id == Campaign.id)
+    .where(Campaign.project_id == Project.id)
+    .correlate_except(Campaign, Plan)
+    .scalar_subquery(),
+    deferred=True
+)
+Project.plan_budget_avg = db.column_property(
+    db.select(db.func.avg(Plan.budget))
+    .join(Campaign, Plan.campaign_id == Campaign.id)
+    .where(Campaign.project_id == Project.id)
+    .correlate_except(Campaign, Plan)
+    .scalar_subquery(),
+    deferred=True
+)
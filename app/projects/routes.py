@@ -1,31 +1,33 @@
-from flask import render_template, redirect, url_for, flash, request
+from flask import render_template, redirect, url_for, flash, request, current_app
 from flask_login import login_required, current_user
 from app.projects import bp
 from app.projects.forms import ProjectForm
 from app.models import Project, Campaign
-from app.services import AgencyCRMService
+from app.services import BrandService
+from app.view_models import PROJECT_SORTS, PROJECT_STATUSES, ProjectListPage, ProjectPage
 from app import db
 
 @bp.route('/')
 @login_required
 def index():
-    projects = Project.query.filter_by(created_by=current_user).order_by(Project.created_at.desc()).all()
-    return render_template('projects/index.html', title='Projects', projects=projects)
+    page = ProjectListPage(current_user, request.args, current_app.config['PROJECTS_PER_PAGE']).load()
+    return render_template('projects/index.html', title='Projects', page=page, projects=page.projects,
+                           statuses=PROJECT_STATUSES, sorts=PROJECT_SORTS)
 
 @bp.route('/create', methods=['GET', 'POST'])
 @login_required
 def create():
     form = ProjectForm()
     
-    brands = AgencyCRMService.get_brands()
-    form.client_brand_id.choices = [(0, 'Select a brand')] + [(b['id'], b['full_name']) for b in brands]
+    brands = BrandService.get_brands()
+    form.client_brand_id.choices = [(0, 'Select a brand')] + [(b.id, b.full_name) for b in brands]
     
     if form.validate_on_submit():
         project = Project(
             code=Project.generate_project_code(),
             name=form.name.data,
             client_brand_id=form.client_brand_id.data,
-            client_brand_name=next((b['full_name'] for b in brands if b['id'] == form.client_brand_id.data), ''),
+            client_brand_name=BrandService.get_brand_name(form.client_brand_id.data),
             start_date=form.start_date.data,
             end_date=form.end_date.data,
             comments=form.comments.data,
@@ -42,8 +44,8 @@ def create():
 @bp.route('/<int:id>')
 @login_required
 def view(id):
-    project = Project.query.get_or_404(id)
-    return render_template('projects/view.html', title=project.name, project=project)
+    page = ProjectPage.load(id)
+    return render_template('projects/view.html', title=page.project.name, project=page.project, page=page)
 
 @bp.route('/<int:id>/edit', methods=['GET', 'POST'])
 @login_required
@@ -55,13 +57,16 @@ def edit(id):
     
     form = ProjectForm(obj=project)
     
-    brands = AgencyCRMService.get_brands()
-    form.client_brand_id.choices = [(0, 'Select a brand')] + [(b['id'], b['full_name']) for b in brands]
+    brands = BrandService.get_brands()
+    form.client_brand_id.choices = [(0, 'Select a brand')] + [(b.id, b.full_name) for b in brands]
+    if project.client_brand_id not in [b.id for b in brands]:
+        # Keep a brand that has since been deactivated in agency-crm selectable
+        form.client_brand_id.choices.append((project.client_brand_id, project.client_brand_name))
     
     if form.validate_on_submit():
         project.name = form.name.data
         project.client_brand_id = form.client_brand_id.data
-        project.client_brand_name = next((b['full_name'] for b in brands if b['id'] == form.client_brand_id.data), '')
+        project.client_brand_name = BrandService.get_brand_name(form.client_brand_id.data) or project.client_brand_name
         project.start_date = form.start_date.data
         project.end_date = form.end_date.data
         project.comments = form.comments.data
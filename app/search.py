@@ -0,0 +1,158 @@
+"""Full-text search over projects, campaigns and plans (SQLite FTS5).
+
+All three live in one FTS5 table, `search_index`, so a query is ranked
+across them in a single statement. Each row's rowid encodes what it
+indexes (id * 4 + KINDS[kind]); triggers on the source tables keep it in
+step with every write, including the bulk INSERT/DELETE paths that skip
+the mapper events. Campaigns and plans carry their project's brand so
+they can be found by it too.
+
+The table and triggers come from the migration on real databases and
+from `db.create_all()` (via the metadata event below) in tests. Rebuild
+it with `flask rebuild-search-index` after loading rows with triggers
+disabled or restoring an old dump.
+"""
+import re
+from markupsafe import Markup, escape
+from sqlalchemy import event, text
+from app import db
+
+KINDS = {'project': 1, 'campaign': 2, 'plan': 3}
+# bm25() weights for kind, parent_id, code, name, brand, body
+RANK = 'bm25(search_index, 0.0, 0.0, 10.0, 5.0, 2.0, 1.0)'
+# snippet() markers; control characters so they can't clash with user text
+_MARK_START, _MARK_END = '\x02', '\x03'
+
+# Per kind: source table, the columns whose change re-indexes a row, and SQL
+# for (parent_id, code, name, brand, body) over a row named `{row}`
+_SOURCES = {
+    'project': ('projects', ('code', 'name', 'client_brand_name', 'comments', 'overall_info'), (
+        'NULL', '{row}.code', '{row}.name', '{row}.client_brand_name',
+        "coalesce({row}.comments, '') || ' ' || coalesce({row}.overall_info, '')"
+    )),
+    'campaign': ('campaigns', ('code', 'name', 'overall_info', 'project_id'), (
+        '{row}.project_id', '{row}.code', '{row}.name',
+        '(SELECT client_brand_name FROM projects WHERE projects.id = {row}.project_id)',
+        '{row}.overall_info'
+    )),
+    'plan': ('plans', ('name', 'description', 'campaign_id'), (
+        '{row}.campaign_id', 'NULL', '{row}.name',
+        '(SELECT projects.client_brand_name FROM campaigns JOIN projects ON projects.id = campaigns.project_id '
+        'WHERE campaigns.id = {row}.campaign_id)',
+        '{row}.description'
+    )),
+}
+_COLUMNS = 'rowid, kind, parent_id, code, name, brand, body'
+
+
+def _values(kind, row):
+    """SQL for one search_index row of `kind`, read from the source row `row`"""
+    _, _, expressions = _SOURCES[kind]
+    return ', '.join([f'{row}.id * 4 + {KINDS[kind]}', f"'{kind}'"] + [e.format(row=row) for e in expressions])
+
+
+def _triggers(kind):
+    table, columns, _ = _SOURCES[kind]
+    rowid = f'old.id * 4 + {KINDS[kind]}'
+    insert = f'INSERT INTO search_index ({_COLUMNS}) SELECT {_values(kind, "new")};'
+    delete = f'DELETE FROM search_index WHERE rowid = {rowid};'
+    return [
+        f'CREATE TRIGGER IF NOT EXISTS {table}_search_insert AFTER INSERT ON {table} BEGIN {insert} END',
+        f'CREATE TRIGGER IF NOT EXISTS {table}_search_update AFTER UPDATE OF {", ".join(columns)} ON {table} '
+        f'BEGIN {delete} {insert} END',
+        f'CREATE TRIGGER IF NOT EXISTS {table}_search_delete AFTER DELETE ON {table} BEGIN {delete} END',
+    ]
+
+
+SEARCH_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5("
+    "kind UNINDEXED, parent_id UNINDEXED, code, name, brand, body, "
+    "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')",
+    *_triggers('project'),
+    *_triggers('campaign'),
+    *_triggers('plan'),
+    # A project's brand is copied onto its campaigns and plans
+    'CREATE TRIGGER IF NOT EXISTS projects_search_brand AFTER UPDATE OF client_brand_name ON projects '
+    'WHEN old.client_brand_name IS NOT new.client_brand_name BEGIN '
+    'UPDATE search_index SET brand = new.client_brand_name WHERE rowid IN ('
+    'SELECT id * 4 + 2 FROM campaigns WHERE project_id = new.id UNION ALL '
+    'SELECT plans.id * 4 + 3 FROM plans JOIN campaigns ON campaigns.id = plans.campaign_id '
+    'WHERE campaigns.project_id = new.id); END',
+]
+
+
+@event.listens_for(db.metadata, 'after_create')
+def _create_search_index(target, connection, **kw):
+    if connection.dialect.name == 'sqlite':
+        for statement in SEARCH_DDL:
+            connection.exec_driver_sql(statement)
+
+
+@event.listens_for(db.metadata, 'before_drop')
+def _drop_search_index(target, connection, **kw):
+    if connection.dialect.name == 'sqlite':
+        connection.exec_driver_sql('DROP TABLE IF EXISTS search_index')
+
+
+def rebuild_search_index():
+    """Re-index every project, campaign and plan; returns the number of rows indexed"""
+    db.session.execute(text('DELETE FROM search_index'))
+    indexed = 0
+    for kind, (table, _, _) in _SOURCES.items():
+        indexed += db.session.execute(text(
+            f'INSERT INTO search_index ({_COLUMNS}) SELECT {_values(kind, table)} FROM {table}'
+        )).rowcount
+    # Merge the index b-trees written above into one, for faster queries
+    db.session.execute(text("INSERT INTO search_index (search_index) VALUES ('optimize')"))
+    db.session.commit()
+    return indexed
+
+
+def match_expression(query):
+    """FTS5 MATCH string for free text typed by a user, or None if it has no words.
+
+    Each whitespace-separated term becomes a quoted phrase of its word
+    characters with a trailing prefix wildcard, so "PLN-25-01 spring" finds
+    PLN-25-014 and "Springtime", and no FTS5 syntax ever reaches the parser.
+    """
+    phrases = []
+    for term in query.split():
+        words = re.findall(r'\w+', term)
+        if words:
+            phrases.append('"' + ' '.join(words) + '"*')
+    return ' '.join(phrases) or None
+
+
+def highlight(snippet):
+    """A snippet() result as escaped HTML, matches wrapped in <mark>"""
+    return Markup(str(escape(snippet)).replace(_MARK_START, '<mark>').replace(_MARK_END, '</mark>'))
+
+
+def search(query, kinds=None, limit=20):
+    """Best matches for `query` as dicts, best first, from a single statement.
+
+    Each has kind, id, parent_id (the campaign's project, the plan's
+    campaign), code, name, brand, snippet (HTML) and score (lower is
+    better). `kinds` limits the result to some of KINDS.
+    """
+    expression = match_expression(query or '')
+    if expression is None:
+        return []
+    sql = (f"SELECT rowid, kind, parent_id, code, name, brand, {RANK} AS score, "
+           f"snippet(search_index, -1, '{_MARK_START}', '{_MARK_END}', '…', 12) AS snippet "
+           "FROM search_index WHERE search_index MATCH :expression")
+    params = {'expression': expression, 'limit': limit}
+    if kinds:
+        sql += ' AND kind IN (' + ', '.join(f':kind{i}' for i in range(len(kinds))) + ')'
+        params.update({f'kind{i}': kind for i, kind in enumerate(kinds)})
+    sql += ' ORDER BY score LIMIT :limit'
+    return [{
+        'kind': row.kind,
+        'id': row.rowid // 4,
+        'parent_id': row.parent_id,
+        'code': row.code,
+        'name': row.name,
+        'brand': row.brand,
+        'snippet': highlight(row.snippet),
+        'score': row.score,
+    } for row in db.session.execute(text(sql), params)]
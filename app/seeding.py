@@ -0,0 +1,186 @@
+"""Synthetic data for load tests and benchmarks (`flask seed`).
+
+Distributions are skewed the way production data is: a few planners own
+most projects, a few brands get most of the work, and campaign and plan
+counts per parent are mostly small with a long tail. The same user and
+brand scheme is served by benchmarks/fake_upstreams.py, so seeded users
+can log in against the fake agency-crm.
+"""
+import random
+from collections import Counter
+from datetime import date, datetime, time, timedelta
+from sqlalchemy import func, insert
+from app.models import User, Project, Campaign, Plan, Brand, CodeSequence, adjust_counters, campaign_suffix
+from app import db
+
+SEED_PASSWORD = 'password'
+PLAN_STATUSES = ('draft', 'approved', 'final')
+HISTORY_DAYS = 3 * 365
+# Free-text fields are filled from this, so full-text search has something to find
+NOTE_WORDS = (
+    'awareness', 'launch', 'summer', 'winter', 'spring', 'autumn', 'outdoor', 'digital', 'radio',
+    'television', 'cinema', 'print', 'social', 'video', 'display', 'search', 'billboards', 'transit',
+    'youth', 'families', 'premium', 'discount', 'loyalty', 'regional', 'national', 'Vilnius', 'Kaunas',
+    'Klaipėda', 'Riga', 'Tallinn', 'reach', 'frequency', 'retargeting', 'sponsorship', 'holiday',
+    'back-to-school', 'rebrand', 'promo', 'sampling', 'influencers', 'podcast', 'newsletter',
+)
+
+
+def seed_user_email(number):
+    return f'seed-user-{number}@example.com'
+
+
+def seed_brand_name(number):
+    return f'Brand {number}'
+
+
+def _long_tail(rng, mean, maximum):
+    """1 or more, mostly near `mean`, occasionally much larger"""
+    return min(1 + int(rng.expovariate(1 / max(mean - 1, 0.1))), maximum)
+
+
+def _skewed_choice(rng, count):
+    """Index in [0, count) where low indexes are picked far more often"""
+    return min(int(rng.paretovariate(1.16)) - 1, count - 1)
+
+
+def _notes(rng, words):
+    """A few random NOTE_WORDS, or None about a third of the time"""
+    if rng.random() < 0.3:
+        return None
+    return ' '.join(rng.choice(NOTE_WORDS) for _ in range(rng.randint(1, words))).capitalize()
+
+
+def _next_id(model):
+    return (db.session.query(func.max(model.id)).scalar() or 0) + 1
+
+
+def seed_database(users=20, projects=500, brands=40, campaigns_per_project=4,
+                  plans_per_campaign=3, random_seed=42):
+    """Add generated rows on top of whatever is already there and return the counts.
+
+    Rows are written with bulk INSERTs and explicit ids, so run this while
+    nothing else writes to the database.
+    """
+    rng = random.Random(random_seed)
+    today = date.today()
+
+    # Draw every project's dates first so each year's codes can be reserved as
+    # one block. Committed per year: CodeSequence.advance creates a missing
+    # sequence row on its own connection, which must not wait on our writes.
+    drafts = []
+    for _ in range(projects):
+        created_at = datetime.combine(today - timedelta(days=rng.randrange(HISTORY_DAYS)),
+                                      time(rng.randrange(8, 19), rng.randrange(60)))
+        start_date = created_at.date() + timedelta(days=rng.randrange(60))
+        end_date = start_date + timedelta(days=rng.randrange(30, 365))
+        drafts.append((created_at, start_date, end_date))
+    codes = {}
+    for year in sorted({created_at.year for created_at, _, _ in drafts}):
+        prefix = f'PLN-{year % 100:02d}'
+        count = sum(1 for created_at, _, _ in drafts if created_at.year == year)
+        last = CodeSequence.advance(prefix, count, lambda: Project._highest_code_number(prefix))
+        db.session.commit()
+        codes[year] = iter(range(last - count + 1, last + 1))
+
+    template = User()
+    template.set_password(SEED_PASSWORD)
+    password_hash = template.password_hash
+
+    existing_emails = {email for (email,) in db.session.query(User.email).filter(
+        User.email.in_([seed_user_email(n) for n in range(1, users + 1)])
+    )}
+    user_rows = [{
+        'email': seed_user_email(n),
+        'first_name': 'Seed',
+        'last_name': f'User {n}',
+        'agency_crm_id': n,
+        'password_hash': password_hash,
+        'is_active': True,
+        'created_at': datetime.utcnow()
+    } for n in range(1, users + 1) if seed_user_email(n) not in existing_emails]
+    if user_rows:
+        db.session.execute(insert(User), user_rows)
+    owner_ids = [user_id for (user_id,) in db.session.query(User.id).filter(
+        User.email.in_([seed_user_email(n) for n in range(1, users + 1)])
+    ).order_by(User.id)]
+
+    existing_brands = {brand_id for (brand_id,) in db.session.query(Brand.id)}
+    brand_rows = [{'id': n, 'name': seed_brand_name(n), 'full_name': seed_brand_name(n),
+                   'is_active': True, 'synced_at': datetime.utcnow()}
+                  for n in range(1, brands + 1) if n not in existing_brands]
+    if brand_rows:
+        db.session.execute(insert(Brand), brand_rows)
+
+    project_rows, campaign_rows, plan_rows = [], [], []
+    project_id, campaign_id, plan_id = _next_id(Project), _next_id(Campaign), _next_id(Plan)
+    for created_at, start_date, end_date in drafts:
+        project_code = f'PLN-{created_at.year % 100:02d}-{next(codes[created_at.year]):03d}'
+        brand_id = _skewed_choice(rng, brands) + 1
+        finished = end_date < today and rng.random() < 0.8
+        campaign_count = _long_tail(rng, campaigns_per_project, 60)
+        project_rows.append({
+            'id': project_id,
+            'code': project_code,
+            'name': f'{seed_brand_name(brand_id)} {start_date:%B %Y}',
+            'client_brand_id': brand_id,
+            'client_brand_name': seed_brand_name(brand_id),
+            'start_date': start_date,
+            'end_date': end_date,
+            'comments': _notes(rng, 12),
+            'overall_info': _notes(rng, 20),
+            'status': 'completed' if finished else 'active',
+            'created_by_id': owner_ids[_skewed_choice(rng, len(owner_ids))],
+            'created_at': created_at,
+            'updated_at': created_at,
+            'last_campaign_number': campaign_count
+        })
+
+        span = max((end_date - start_date).days, 1)
+        for number in range(1, campaign_count + 1):
+            campaign_start = start_date + timedelta(days=rng.randrange(span))
+            plan_count = _long_tail(rng, plans_per_campaign, 40)
+            campaign_rows.append({
+                'id': campaign_id,
+                'code': f'{project_code}-{campaign_suffix(number)}',
+                'name': f'Flight {number}',
+                'project_id': project_id,
+                'start_date': campaign_start,
+                'end_date': min(campaign_start + timedelta(days=rng.randrange(7, 60)), end_date),
+                'overall_info': _notes(rng, 10),
+                'status': 'completed' if finished or rng.random() < 0.2 else 'active',
+                'created_at': created_at,
+                'updated_at': created_at,
+                'last_plan_number': plan_count
+            })
+            for plan_number in range(1, plan_count + 1):
+                plan_rows.append({
+                    'id': plan_id,
+                    'name': f'Plan{plan_number}',
+                    'campaign_id': campaign_id,
+                    'description': _notes(rng, 8) or '',
+                    'budget': round(rng.lognormvariate(8, 1), 2) if rng.random() < 0.9 else None,
+                    'status': rng.choices(PLAN_STATUSES, weights=(5, 3, 2))[0],
+                    'created_at': created_at,
+                    'updated_at': created_at
+                })
+                plan_id += 1
+            campaign_id += 1
+        project_id += 1
+
+    for model, rows in ((Project, project_rows), (Campaign, campaign_rows), (Plan, plan_rows)):
+        if rows:
+            db.session.execute(insert(model), rows)
+    # Bulk inserts skip the mapper events that keep the stored totals current
+    adjust_counters(db.session, Project, Counter(row['created_by_id'] for row in project_rows))
+    adjust_counters(db.session, Campaign, Counter(row['project_id'] for row in campaign_rows))
+    adjust_counters(db.session, Plan, Counter(row['campaign_id'] for row in plan_rows))
+    db.session.commit()
+
+    return {
+        'users': len(user_rows),
+        'brands': len(brand_rows),
+        'projects': len(project_rows),
+        'campaigns': len(campaign_rows),
+        'plans': len(plan_rows)
+    }
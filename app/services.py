@@ -1,25 +1,33 @@
+import hashlib
+import json
+from datetime import datetime, timedelta
 import requests
 from flask import current_app
-from app.models import User
-from app import db
+from sqlalchemy import insert, update
+from sqlalchemy.exc import IntegrityError
+from app.models import User, Brand, SyncState, Project, Campaign, EkranuPush
+from app.jobs import enqueue, job_handler, report_progress
+from app import db, http_client
 
 class AgencyCRMService:
+    @staticmethod
+    def fetch_brands():
+        """Get all brands from agency-crm API, raising on any failure"""
+        url = f"{current_app.config['AGENCY_CRM_API_URL']}/brands"
+        headers = {'X-API-Key': current_app.config['AGENCY_CRM_API_KEY']}
+        response = http_client.get('agency_crm', url, headers=headers)
+
+        if response.status_code != 200:
+            raise RuntimeError(f"HTTP {response.status_code} - {response.text}")
+        brands = response.json().get('brands', [])
+        current_app.logger.info(f"Fetched {len(brands)} brands from agency-crm")
+        return brands
+
     @staticmethod
     def get_brands():
         """Get all brands from agency-crm API"""
         try:
-            url = f"{current_app.config['AGENCY_CRM_API_URL']}/brands"
-            headers = {'X-API-Key': current_app.config['AGENCY_CRM_API_KEY']}
-            response = requests.get(url, headers=headers, timeout=10)
-
-            if response.status_code == 200:
-                data = response.json()
-                brands = data.get('brands', [])
-                current_app.logger.info(f"Fetched {len(brands)} brands from agency-crm")
-                return brands
-            else:
-                current_app.logger.error(f"Error fetching brands: HTTP {response.status_code} - {response.text}")
-            return []
+            return AgencyCRMService.fetch_brands()
         except Exception as e:
             current_app.logger.error(f"Error fetching brands: {str(e)}")
             return []
@@ -30,7 +38,7 @@ class AgencyCRMService:
         try:
             url = f"{current_app.config['AGENCY_CRM_API_URL']}/brands/{brand_id}"
             headers = {'X-API-Key': current_app.config['AGENCY_CRM_API_KEY']}
-            response = requests.get(url, headers=headers, timeout=10)
+            response = http_client.get('agency_crm', url, headers=headers)
             
             if response.status_code == 200:
                 return response.json()
@@ -46,7 +54,8 @@ class AgencyCRMService:
             url = f"{current_app.config['AGENCY_CRM_API_URL']}/auth/login"
             headers = {'X-API-Key': current_app.config['AGENCY_CRM_API_KEY']}
             data = {'email': email, 'password': password}
-            response = requests.post(url, json=data, headers=headers, timeout=10)
+            response = http_client.post('agency_crm', url, json=data, headers=headers,
+                                        timeout=current_app.config['AGENCY_CRM_AUTH_TIMEOUT'], retries=0)
             
             if response.status_code == 200:
                 response_data = response.json()
@@ -96,49 +105,384 @@ class AgencyCRMService:
     def get_users():
         """Get all users from agency-crm API"""
         try:
-            url = f"{current_app.config['AGENCY_CRM_API_URL']}/users"
-            headers = {'X-API-Key': current_app.config['AGENCY_CRM_API_KEY']}
-            response = requests.get(url, headers=headers, timeout=10)
-            
-            if response.status_code == 200:
-                return response.json()
-            return []
+            users = []
+            for page in AgencyCRMService.iter_user_pages():
+                users.extend(page)
+            return users
         except Exception as e:
             current_app.logger.error(f"Error fetching users: {str(e)}")
             return []
     
+    @staticmethod
+    def iter_user_pages(per_page=None):
+        """Yield agency-crm users one page at a time, raising on failure.
+        
+        Understands both a paginated `{"users": [...], "has_next": ...}`
+        response and a plain list; a plain list is paged until a short or
+        repeated page shows the upstream has nothing more (or ignores paging).
+        """
+        per_page = per_page or current_app.config['AGENCY_CRM_USERS_PAGE_SIZE']
+        url = f"{current_app.config['AGENCY_CRM_API_URL']}/users"
+        headers = {'X-API-Key': current_app.config['AGENCY_CRM_API_KEY']}
+        page = 1
+        previous_first_id = None
+        while True:
+            response = http_client.get('agency_crm', url, headers=headers,
+                                       params={'page': page, 'per_page': per_page})
+            if response.status_code != 200:
+                raise RuntimeError(f"HTTP {response.status_code} - {response.text}")
+            data = response.json()
+            
+            if isinstance(data, list):
+                users = data
+                if users and users[0].get('id') == previous_first_id:
+                    return
+                has_next = len(users) >= per_page
+            else:
+                users = data.get('users', [])
+                has_next = bool(data.get('has_next') or data.get('next_page'))
+            
+            if users:
+                yield users
+            if not users or not has_next:
+                return
+            previous_first_id = users[0].get('id')
+            page += 1
+    
+    @staticmethod
+    def _sync_user_page(users_data):
+        """Apply one page of remote users with one SELECT and bulk writes"""
+        remote = {}
+        for user_data in users_data:
+            if user_data.get('email'):
+                remote[user_data['email']] = user_data
+        
+        existing = {
+            row.email: row for row in db.session.query(
+                User.id, User.email, User.first_name, User.last_name, User.agency_crm_id
+            ).filter(User.email.in_(list(remote)))
+        }
+        
+        inserts, updates = [], []
+        for email, user_data in remote.items():
+            row = existing.get(email)
+            if row is None:
+                inserts.append({
+                    'email': email,
+                    'first_name': user_data.get('first_name', ''),
+                    'last_name': user_data.get('last_name', ''),
+                    'agency_crm_id': user_data.get('id'),
+                    'is_active': True,
+                    'created_at': datetime.utcnow()
+                })
+                continue
+            
+            values = {
+                'first_name': user_data.get('first_name', row.first_name),
+                'last_name': user_data.get('last_name', row.last_name),
+                'agency_crm_id': user_data.get('id', row.agency_crm_id)
+            }
+            if values != {'first_name': row.first_name, 'last_name': row.last_name,
+                          'agency_crm_id': row.agency_crm_id}:
+                updates.append({'id': row.id, **values})
+        
+        if inserts:
+            db.session.execute(insert(User), inserts)
+        if updates:
+            db.session.execute(update(User), updates)
+        db.session.commit()
+        return len(inserts), len(updates), len(remote) - len(inserts) - len(updates)
+    
     @staticmethod
     def sync_all_users():
-        """Sync all users from agency-crm to projects-crm"""
+        """Sync all users from agency-crm to projects-crm, one page per transaction.
+        
+        Returns a dict of created/updated/unchanged/failed counts. A page that
+        violates a constraint is rolled back and counted as failed; the other
+        pages still sync. Fetch errors (agency-crm unreachable, an error
+        status mid-pagination, an open circuit) are raised, so the job is
+        retried; pages committed before the failure stay synced.
+        """
+        counts = {'created': 0, 'updated': 0, 'unchanged': 0, 'failed': 0}
         try:
-            users_data = AgencyCRMService.get_users()
-            synced_count = 0
-            
-            for user_data in users_data:
-                email = user_data.get('email')
-                if not email:
+            for page in AgencyCRMService.iter_user_pages():
+                try:
+                    created, updated, unchanged = AgencyCRMService._sync_user_page(page)
+                except IntegrityError as e:
+                    db.session.rollback()
+                    current_app.logger.error(f"Error syncing a page of {len(page)} users: {str(e)}")
+                    counts['failed'] += len(page)
                     continue
-                
-                user = User.query.filter_by(email=email).first()
-                if not user:
-                    user = User(
-                        email=email,
-                        first_name=user_data.get('first_name', ''),
-                        last_name=user_data.get('last_name', ''),
-                        agency_crm_id=user_data.get('id'),
-                        is_active=True
-                    )
-                    db.session.add(user)
-                    synced_count += 1
-                else:
-                    # Update existing user
-                    user.first_name = user_data.get('first_name', user.first_name)
-                    user.last_name = user_data.get('last_name', user.last_name)
-                    user.agency_crm_id = user_data.get('id', user.agency_crm_id)
-            
-            db.session.commit()
-            current_app.logger.info(f"Synced {synced_count} users from agency-crm")
-            return synced_count
+                counts['created'] += created
+                counts['updated'] += updated
+                counts['unchanged'] += unchanged
         except Exception as e:
-            current_app.logger.error(f"Error syncing users: {str(e)}")
-            return 0
\ No newline at end of file
+            db.session.rollback()
+            current_app.logger.error(f"Error syncing users after {counts}: {str(e)}")
+            raise
+        
+        current_app.logger.info(f"Synced users from agency-crm: {counts}")
+        return counts
+
+class BrandService:
+    """Brands served from the local `brands` table, mirrored from agency-crm.
+
+    Reads never wait on agency-crm once the mirror has been filled: a stale
+    mirror is refreshed by a `refresh_brands` job while callers keep getting
+    the local rows. If that job sits unclaimed for BRAND_REFRESH_MAX_WAIT
+    seconds (no `flask worker` running) the next read refreshes inline.
+    """
+    STATE_NAME = 'brands'
+
+    @staticmethod
+    def refresh():
+        """Pull brands from agency-crm and apply only the differences locally.
+
+        New brands are inserted, changed names updated and brands no longer
+        returned are deactivated (projects keep referencing their ids).
+        Returns a dict of created/updated/deactivated/unchanged counts.
+        """
+        state = SyncState.get(BrandService.STATE_NAME)
+        state.last_attempt_at = datetime.utcnow()
+        try:
+            remote = AgencyCRMService.fetch_brands()
+        except Exception as e:
+            current_app.logger.error(f"Error refreshing brands: {str(e)}")
+            state.last_error = str(e)
+            db.session.add(state)
+            db.session.commit()
+            raise
+
+        counts = {'created': 0, 'updated': 0, 'deactivated': 0, 'unchanged': 0}
+        local = {brand.id: brand for brand in Brand.query.all()}
+        now = datetime.utcnow()
+        seen = set()
+        for data in remote:
+            if data.get('id') is None:
+                continue
+            brand_id = int(data['id'])
+            seen.add(brand_id)
+            name = data.get('name')
+            full_name = data.get('full_name') or name or ''
+            brand = local.get(brand_id)
+            if brand is None:
+                db.session.add(Brand(id=brand_id, name=name, full_name=full_name,
+                                     is_active=True, synced_at=now))
+                counts['created'] += 1
+            elif (brand.name, brand.full_name, brand.is_active) != (name, full_name, True):
+                brand.name = name
+                brand.full_name = full_name
+                brand.is_active = True
+                brand.synced_at = now
+                counts['updated'] += 1
+            else:
+                counts['unchanged'] += 1
+
+        for brand_id, brand in local.items():
+            if brand_id not in seen and brand.is_active:
+                brand.is_active = False
+                brand.synced_at = now
+                counts['deactivated'] += 1
+
+        state.last_success_at = now
+        state.last_error = None
+        state.item_count = len(seen)
+        db.session.add(state)
+        db.session.commit()
+        current_app.logger.info(f"Refreshed brands from agency-crm: {counts}")
+        return counts
+
+    @staticmethod
+    def refresh_in_background():
+        """Queue a refresh job unless one is already pending"""
+        return enqueue('refresh_brands', dedupe=True)
+
+    @staticmethod
+    def ensure_fresh():
+        """Refresh inline on first use or when no worker takes the queued job, otherwise in the background"""
+        config = current_app.config
+        state = SyncState.get(BrandService.STATE_NAME)
+        if not state.is_stale(config['BRAND_CACHE_TTL']):
+            return
+        if state.last_attempt_at is None and Brand.query.first() is None:
+            refresh_now = True
+        else:
+            job = BrandService.refresh_in_background()
+            # Due for longer than the bound and never claimed; a job waiting out its backoff is not due yet
+            cutoff = datetime.utcnow() - timedelta(seconds=config['BRAND_REFRESH_MAX_WAIT'])
+            refresh_now = (job.status == 'pending' and job.run_at < cutoff
+                           and (state.last_attempt_at is None or state.last_attempt_at < cutoff))
+            if refresh_now:
+                current_app.logger.warning(f'Brand refresh job {job.id} not picked up since {job.run_at}, '
+                                           f'is `flask worker` running? Refreshing inline')
+        if refresh_now:
+            try:
+                BrandService.refresh()
+            except Exception:
+                pass
+
+    @staticmethod
+    def get_brands():
+        """Active brands ordered for display, read from the local mirror"""
+        BrandService.ensure_fresh()
+        return Brand.query.filter_by(is_active=True).order_by(Brand.full_name).all()
+
+    @staticmethod
+    def get_brand_name(brand_id):
+        brand = db.session.get(Brand, brand_id)
+        return brand.full_name if brand else ''
+
+class EkranuSyncService:
+    """Pushes active campaigns to ekranu-crm as kampanijos, sending only changes.
+
+    The payload and content hash of every campaign ekranu-crm accepted is
+    kept in `ekranu_pushes`, so later runs send new and changed campaigns
+    plus the external ids of campaigns that are gone, in bounded chunks.
+
+    Gone campaigns go out as `removed_external_ids` and their rows are only
+    dropped once ekranu-crm answers with a `removed_count`. A build that
+    ignores the field leaves them in place, to be sent again on every run.
+    """
+
+    @staticmethod
+    def campaign_payloads():
+        """Current payload of every active campaign, keyed by external_id"""
+        rows = db.session.query(
+            Campaign.id, Campaign.name, Project.client_brand_name
+        ).join(Project).filter(Campaign.status == 'active').order_by(Campaign.id)
+
+        payloads = {}
+        for campaign_id, name, brand_name in rows:
+            external_id = f'projects_campaign_{campaign_id}'
+            payloads[external_id] = {
+                'name': f"{brand_name} - {name}",  # Brand + Campaign name
+                'client_brand_name': brand_name,
+                'campaign_name': name,
+                'external_id': external_id,  # Unique identifier
+                'source_system': 'projects-crm'
+            }
+        return payloads
+
+    @staticmethod
+    def content_hash(payload):
+        return hashlib.sha256(json.dumps(payload, sort_keys=True).encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def _post_chunk(kampanijos, removed):
+        config = current_app.config
+        headers = {
+            'Content-Type': 'application/json',
+            'X-API-Key': config['EKRANU_API_KEY']
+        }
+        body = {'kampanijos': kampanijos}
+        if removed:
+            body['removed_external_ids'] = removed
+        response = http_client.post('ekranu', f"{config['EKRANU_URL']}/api/import-kampanijos",
+                                    json=body, headers=headers)
+        if response.status_code != 200:
+            raise RuntimeError(f'HTTP {response.status_code} - {response.text}')
+        return response.json()
+
+    @staticmethod
+    def push_campaigns(full=False, progress=None):
+        """Send new/changed/removed campaigns in chunks of EKRANU_SYNC_CHUNK_SIZE.
+
+        `full` resends every active campaign regardless of recorded hashes.
+        `progress`, if given, is called with each chunk's report as it
+        completes. Each chunk's bookkeeping is committed once ekranu-crm
+        accepts it, so a failed run resumes where it stopped. Returns a
+        summary dict; `success` is False if a chunk failed.
+        """
+        chunk_size = max(1, current_app.config['EKRANU_SYNC_CHUNK_SIZE'])
+        payloads = EkranuSyncService.campaign_payloads()
+        hashes = {external_id: EkranuSyncService.content_hash(payload)
+                  for external_id, payload in payloads.items()}
+        pushed = {push.external_id: push for push in EkranuPush.query.all()}
+
+        changed = [external_id for external_id in payloads
+                   if full or external_id not in pushed or pushed[external_id].content_hash != hashes[external_id]]
+        removed = [external_id for external_id in pushed if external_id not in payloads]
+
+        chunks = [(changed[i:i + chunk_size], []) for i in range(0, len(changed), chunk_size)]
+        chunks += [([], removed[i:i + chunk_size]) for i in range(0, len(removed), chunk_size)]
+
+        summary = {
+            'success': True,
+            'total': len(payloads),
+            'sent': 0,
+            'removed': 0,
+            'removal_unacknowledged': 0,
+            'unchanged': len(payloads) - len(changed),
+            'imported': 0,
+            'chunks': []
+        }
+        for index, (upserts, removals) in enumerate(chunks, start=1):
+            report = {'chunk': index, 'of': len(chunks), 'sent': len(upserts), 'removed': 0}
+            try:
+                result = EkranuSyncService._post_chunk([payloads[e] for e in upserts], removals)
+            except Exception as e:
+                db.session.rollback()
+                current_app.logger.error(f'ekranu push chunk {index}/{len(chunks)} failed: {str(e)}')
+                report['error'] = str(e)
+                summary['chunks'].append(report)
+                summary['success'] = False
+                summary['error'] = str(e)
+                if progress:
+                    progress(report)
+                break
+
+            now = datetime.utcnow()
+            for external_id in upserts:
+                push = pushed.get(external_id)
+                if push is None:
+                    push = EkranuPush(external_id=external_id,
+                                      campaign_id=int(external_id.rsplit('_', 1)[-1]))
+                    db.session.add(push)
+                push.content_hash = hashes[external_id]
+                push.pushed_at = now
+            if removals and 'removed_count' in result:
+                EkranuPush.query.filter(EkranuPush.external_id.in_(removals)).delete(synchronize_session=False)
+                report['removed'] = len(removals)
+            elif removals:
+                report['removal_unacknowledged'] = len(removals)
+                current_app.logger.warning(f"ekranu push chunk {index}/{len(chunks)}: removal of "
+                                           f"{len(removals)} campaigns not acknowledged, keeping them")
+            db.session.commit()
+
+            report['imported'] = result.get('imported_count', len(upserts))
+            summary['sent'] += len(upserts)
+            summary['removed'] += report['removed']
+            summary['removal_unacknowledged'] += report.get('removal_unacknowledged', 0)
+            summary['imported'] += report['imported']
+            summary['chunks'].append(report)
+            current_app.logger.info(f"ekranu push chunk {index}/{len(chunks)}: "
+                                    f"{len(upserts)} sent, {report['removed']} removed")
+            if progress:
+                progress(report)
+
+        return summary
+
+
+@job_handler('ekranu_push')
+def _ekranu_push_job(payload):
+    chunks = []
+
+    def progress(report):
+        chunks.append(report)
+        report_progress({'chunks': chunks})
+
+    summary = EkranuSyncService.push_campaigns(full=payload.get('full', False), progress=progress)
+    if not summary['success']:
+        # Chunks accepted so far are recorded, so the retry resumes from here
+        raise RuntimeError(summary['error'])
+    return summary
+
+
+@job_handler('sync_users')
+def _sync_users_job(payload):
+    return AgencyCRMService.sync_all_users()
+
+
+@job_handler('refresh_brands')
+def _refresh_brands_job(payload):
+    return BrandService.refresh()
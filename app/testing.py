@@ -0,0 +1,138 @@
+"""Helpers for the test scripts: a throwaway app, SQL capture, query budgets and SQLite query plans"""
+import re
+from collections import Counter
+from contextlib import contextmanager
+from sqlalchemy import event
+from app import create_app, db
+from config import Config
+
+# EXPLAIN QUERY PLAN detail for a table read without any index, e.g. "SCAN plans".
+# "SCAN plans USING INDEX ..." (walking an index) and "SEARCH ..." are fine.
+_FULL_SCAN = re.compile(r'^SCAN (\w+)$')
+# A parenthesised run of placeholders, e.g. an expanded IN list or one VALUES row
+_PLACEHOLDERS = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+_REPEATED_GROUPS = re.compile(r'\(\?\)(?:\s*,\s*\(\?\))+')
+
+
+def create_test_app(database_uri='sqlite://', **settings):
+    """App bound to `database_uri` (in-memory by default) with the schema created"""
+    class TestConfig(Config):
+        SQLALCHEMY_DATABASE_URI = database_uri
+        TESTING = True
+        WTF_CSRF_ENABLED = False
+
+    for name, value in settings.items():
+        setattr(TestConfig, name, value)
+
+    app = create_app(TestConfig)
+    with app.app_context():
+        db.create_all()
+    return app
+
+
+def login(client, user):
+    """Log `user` into the test client's session, as Flask-Login would"""
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user.id)
+        session['_fresh'] = True
+
+
+class CapturedQuery:
+    def __init__(self, statement, parameters, executemany):
+        self.statement = statement
+        self.parameters = parameters
+        self.executemany = executemany
+
+    def __repr__(self):
+        return f'<CapturedQuery {self.statement[:60]!r}>'
+
+
+def normalize_statement(statement):
+    """SQL text with whitespace collapsed and IN lists / VALUES rows folded to `(?)`,
+    so statements that differ only in their bound parameters compare equal"""
+    statement = ' '.join(statement.split())
+    statement = _PLACEHOLDERS.sub('(?)', statement)
+    return _REPEATED_GROUPS.sub('(?)', statement)
+
+
+class QueryLog(list):
+    """The CapturedQuery objects of one block, with N+1 helpers"""
+
+    @property
+    def count(self):
+        return len(self)
+
+    def repeated(self, min_count=2):
+        """[(statement, times)] for statements run with `min_count` or more different
+        sets of bound parameters - the signature of a per-row lazy load. Re-running
+        a statement with the same parameters (a refresh after commit) is not counted.
+        """
+        variants = {}
+        for query in self:
+            variants.setdefault(normalize_statement(query.statement), set()).add(repr(query.parameters))
+        counts = Counter({statement: len(parameters) for statement, parameters in variants.items()})
+        return [(statement, times) for statement, times in counts.most_common() if times >= min_count]
+
+    def report(self):
+        lines = [f'{self.count} statement(s):']
+        lines.extend(f'  {i + 1}. {" ".join(query.statement.split())}' for i, query in enumerate(self))
+        return '\n'.join(lines)
+
+
+@contextmanager
+def capture_queries(engine=None):
+    """Collect every statement sent to `engine` (default: db.engine) into a QueryLog while active"""
+    engine = engine or db.engine
+    queries = QueryLog()
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        queries.append(CapturedQuery(statement, parameters, executemany))
+
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield queries
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+
+@contextmanager
+def query_budget(max_queries, allow_repeated=(), engine=None):
+    """Fail if the block runs more than `max_queries` statements or repeats one.
+
+    Usable as a context manager around a test-client request or as a test
+    decorator. Statements containing any of the `allow_repeated` substrings
+    may repeat (e.g. an intentional per-batch INSERT).
+    """
+    with capture_queries(engine) as log:
+        yield log
+    problems = []
+    if log.count > max_queries:
+        problems.append(f'ran {log.count} statements, budget is {max_queries}')
+    for statement, times in log.repeated():
+        if not any(allowed in statement for allowed in allow_repeated):
+            problems.append(f'N+1: {times} x {statement}')
+    if problems:
+        raise AssertionError('\n'.join(problems) + '\n' + log.report())
+
+
+def explain_query_plan(query, engine=None):
+    """SQLite EXPLAIN QUERY PLAN detail lines for a captured SELECT/UPDATE/DELETE"""
+    if not query.statement.lstrip().upper().startswith(('SELECT', 'UPDATE', 'DELETE', 'WITH')):
+        return []
+    parameters = query.parameters
+    if query.executemany:
+        parameters = parameters[0] if parameters else ()
+    with (engine or db.engine).connect() as connection:
+        rows = connection.exec_driver_sql(f'EXPLAIN QUERY PLAN {query.statement}', parameters).all()
+    return [row[-1] for row in rows]
+
+
+def full_scans(query, engine=None):
+    """Tables that `query` reads start to finish without using an index"""
+    tables = set(db.metadata.tables)
+    scanned = []
+    for detail in explain_query_plan(query, engine):
+        match = _FULL_SCAN.match(detail)
+        if match and match.group(1) in tables:
+            scanned.append(match.group(1))
+    return scanned
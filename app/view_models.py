@@ -0,0 +1,209 @@
+"""Prepared data for the HTML pages, loaded in a fixed number of queries.
+
+Templates render these instead of walking relationships, so a page never
+lazy-loads children just to count them. Counts and budget totals come
+from the deferred column_property aggregates in app.models, evaluated in
+the same SELECT as the rows they describe.
+"""
+import base64
+import json
+from datetime import date, datetime
+from flask import abort
+from sqlalchemy import or_
+from sqlalchemy.orm import contains_eager, load_only, undefer
+from app.models import Project, Campaign, Plan, Brand
+from app import db
+
+PROJECT_STATUSES = ('active', 'completed')
+# Sort keys of the project list; each is backed by an index on
+# (created_by_id, column), with the primary key breaking ties
+PROJECT_SORTS = {
+    'created_at': Project.created_at,
+    'start_date': Project.start_date,
+    'end_date': Project.end_date,
+    'code': Project.code,
+}
+DEFAULT_PROJECT_SORT = '-created_at'
+
+
+class ProjectPage:
+    """projects/view.html: a project and its campaigns with plan counts and budgets"""
+
+    def __init__(self, project, campaigns):
+        self.project = project
+        self.campaigns = campaigns
+        self.campaign_count = len(campaigns)
+        self.plan_count = sum(campaign.plan_count for campaign in campaigns)
+        self.plan_budget_total = sum(campaign.plan_budget_total for campaign in campaigns)
+
+    @classmethod
+    def load(cls, project_id):
+        """Two SELECTs however many campaigns and plans the project has; 404 if missing"""
+        project = db.session.get(Project, project_id) or abort(404)
+        campaigns = Campaign.query.options(
+            load_only(Campaign.id, Campaign.code, Campaign.name, Campaign.start_date,
+                      Campaign.end_date, Campaign.status),
+            undefer(Campaign.plan_count),
+            undefer(Campaign.plan_budget_total)
+        ).filter(Campaign.project_id == project_id).order_by(Campaign.id).all()
+        return cls(project, campaigns)
+
+
+class CampaignPage:
+    """campaigns/view.html: a campaign, its project's name and code, and its plans"""
+
+    def __init__(self, campaign, plans):
+        self.campaign = campaign
+        self.project = campaign.project
+        self.plans = plans
+        self.plan_count = campaign.plan_count
+        self.plan_budget_total = campaign.plan_budget_total
+
+    @classmethod
+    def load(cls, campaign_id):
+        """Two SELECTs however many plans the campaign has; 404 if missing"""
+        campaign = Campaign.query.join(Campaign.project).options(
+            contains_eager(Campaign.project).load_only(Project.id, Project.name, Project.code),
+            undefer(Campaign.plan_count),
+            undefer(Campaign.plan_budget_total)
+        ).filter(Campaign.id == campaign_id).first_or_404()
+        plans = Plan.query.options(
+            load_only(Plan.id, Plan.name, Plan.budget, Plan.status)
+        ).filter(Plan.campaign_id == campaign_id).order_by(Plan.id).all()
+        return cls(campaign, plans)
+
+
+def _parse_date(raw):
+    try:
+        return date.fromisoformat(raw) if raw else None
+    except ValueError:
+        return None
+
+
+class ProjectListPage:
+    """projects/index.html: one keyset page of a user's projects.
+
+    `args` are the request's query arguments: status, brand (id), from and
+    to (ISO dates; projects running at any point in between), code (prefix),
+    sort (a PROJECT_SORTS key, `-` for descending), per_page, and after or
+    before (opaque cursors from next_args/prev_args). Each page is a single
+    indexed range read of per_page + 1 rows, however deep it is.
+    """
+
+    def __init__(self, user, args, per_page):
+        self.user = user
+        self.status = args.get('status') if args.get('status') in PROJECT_STATUSES else ''
+        self.brand = args.get('brand', type=int)
+        self.date_from = _parse_date(args.get('from'))
+        self.date_to = _parse_date(args.get('to'))
+        self.code = (args.get('code') or '').strip().upper()
+        sort = args.get('sort') or DEFAULT_PROJECT_SORT
+        self.sort = sort if sort.lstrip('-') in PROJECT_SORTS else DEFAULT_PROJECT_SORT
+        self.per_page = min(max(args.get('per_page', per_page, type=int), 1), 100)
+        self.after = self._decode(args.get('after'))
+        self.before = None if self.after else self._decode(args.get('before'))
+        self.projects = []
+        self.has_next = self.has_prev = False
+
+    @property
+    def filtered(self):
+        return bool(self.status or self.brand or self.date_from or self.date_to or self.code)
+
+    @property
+    def column(self):
+        return PROJECT_SORTS[self.sort.lstrip('-')]
+
+    @property
+    def descending(self):
+        return self.sort.startswith('-')
+
+    def filter_args(self):
+        """Query arguments that reproduce the current filters and sort"""
+        args = {'status': self.status, 'brand': self.brand, 'code': self.code,
+                'from': self.date_from.isoformat() if self.date_from else None,
+                'to': self.date_to.isoformat() if self.date_to else None}
+        if self.sort != DEFAULT_PROJECT_SORT:
+            args['sort'] = self.sort
+        return {key: value for key, value in args.items() if value}
+
+    def next_args(self):
+        return dict(self.filter_args(), after=self._encode(self.projects[-1]))
+
+    def prev_args(self):
+        return dict(self.filter_args(), before=self._encode(self.projects[0]))
+
+    def _encode(self, project):
+        value = getattr(project, self.column.key)
+        if isinstance(value, (date, datetime)):
+            value = value.isoformat()
+        payload = json.dumps([value, project.id])
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def _decode(self, raw):
+        """(sort value, id) from a cursor, or None for a missing or mangled one"""
+        if not raw:
+            return None
+        try:
+            value, project_id = json.loads(base64.urlsafe_b64decode(raw + '=' * (-len(raw) % 4)))
+            if self.column.key == 'created_at':
+                value = datetime.fromisoformat(value)
+            elif self.column.key != 'code':
+                value = date.fromisoformat(value)
+            return value, int(project_id)
+        except (ValueError, TypeError):
+            return None
+
+    def _query(self):
+        query = Project.query.options(load_only(
+            Project.id, Project.code, Project.name, Project.client_brand_name, Project.start_date,
+            Project.end_date, Project.status, Project.created_at, Project.total_campaigns
+        )).filter(Project.created_by_id == self.user.id)
+        if self.status:
+            query = query.filter(Project.status == self.status)
+        if self.brand:
+            query = query.filter(Project.client_brand_id == self.brand)
+        if self.date_from:
+            query = query.filter(Project.end_date >= self.date_from)
+        if self.date_to:
+            query = query.filter(Project.start_date <= self.date_to)
+        if self.code:
+            # A range rather than LIKE, so it can use the code index
+            query = query.filter(Project.code >= self.code, Project.code < self.code + '\uffff')
+        return query
+
+    def _seek(self, query, cursor, forward):
+        """Rows strictly past `cursor` in sort order (or before it when not `forward`).
+
+        The plain `>=`/`<=` on the sort column is redundant but lets the
+        index seek straight to the cursor; the OR alone would be a filter
+        applied while walking the index from the start.
+        """
+        column, (value, project_id) = self.column, cursor
+        if forward != self.descending:
+            return query.filter(column >= value, or_(column > value, Project.id > project_id))
+        return query.filter(column <= value, or_(column < value, Project.id < project_id))
+
+    def _order(self, query, forward):
+        ascending = forward != self.descending
+        if ascending:
+            return query.order_by(self.column.asc(), Project.id.asc())
+        return query.order_by(self.column.desc(), Project.id.desc())
+
+    def load(self):
+        forward = self.before is None
+        query = self._query()
+        cursor = self.after or self.before
+        if cursor:
+            query = self._seek(query, cursor, forward)
+        rows = self._order(query, forward).limit(self.per_page + 1).all()
+        more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if forward:
+            self.projects, self.has_next, self.has_prev = rows, more, self.after is not None
+        else:
+            self.projects, self.has_next, self.has_prev = rows[::-1], True, more
+        return self
+
+    def brands(self):
+        """Brand choices for the filter, from the local mirror"""
+        return Brand.query.filter_by(is_active=True).order_by(Brand.full_name).all()
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""Local stand-ins for agency-crm and ekranu, for load tests and benchmarks.
+
+Serves just the endpoints projects-crm calls, with the same user and brand
+scheme as `flask seed`: user N is seed-user-N@example.com with password
+"password", and brands are 1..--brands. --latency adds a fixed delay to
+every response and --failure-rate answers that share of requests with 503,
+to see how projects-crm behaves when an upstream is slow or flaky.
+
+    python benchmarks/fake_upstreams.py --latency 0.05
+    AGENCY_CRM_URL=http://localhost:5001 AGENCY_CRM_API_URL=http://localhost:5001/api \\
+        EKRANU_URL=http://localhost:5003 flask serve
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.seeding import SEED_PASSWORD, seed_brand_name, seed_user_email  # noqa: E402
+
+SEED_EMAIL = re.compile(r'^seed-user-(\d+)@example\.com$')
+
+
+def seed_user(number):
+    return {
+        'id': number,
+        'email': seed_user_email(number),
+        'first_name': 'Seed',
+        'last_name': f'User {number}',
+        'name': f'Seed User {number}',
+        'role': 'user'
+    }
+
+
+def seed_brand(number):
+    return {'id': number, 'name': seed_brand_name(number), 'full_name': seed_brand_name(number),
+            'is_active': True}
+
+
+class FakeHandler(BaseHTTPRequestHandler):
+    """Routes on (method, path regex); subclasses fill in ROUTES"""
+    ROUTES = ()
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self._dispatch('GET')
+
+    def do_POST(self):
+        self._dispatch('POST')
+
+    def _dispatch(self, method):
+        options = self.server.options
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        if options.latency:
+            time.sleep(options.latency)
+        if options.failure_rate and random.random() < options.failure_rate:
+            return self._send(503, {'error': 'injected failure'})
+
+        url = urlparse(self.path)
+        for route_method, pattern, handler in self.ROUTES:
+            match = re.fullmatch(pattern, url.path)
+            if route_method == method and match:
+                try:
+                    data = json.loads(body) if body else {}
+                except ValueError:
+                    return self._send(400, {'error': 'invalid JSON'})
+                query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+                status, payload = handler(self, data, query, *match.groups())
+                return self._send(status, payload)
+        self._send(404, {'error': 'not found'})
+
+    def _send(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if self.server.options.verbose:
+            super().log_message(format, *args)
+
+
+def _check_credentials(data):
+    match = SEED_EMAIL.match(data.get('email') or '')
+    if not match or data.get('password') != SEED_PASSWORD:
+        return None
+    return seed_user(int(match.group(1)))
+
+
+class AgencyCRMHandler(FakeHandler):
+    def brands(self, data, query):
+        return 200, {'brands': [seed_brand(n) for n in range(1, self.server.options.brands + 1)]}
+
+    def brand(self, data, query, brand_id):
+        if not 1 <= int(brand_id) <= self.server.options.brands:
+            return 404, {'error': 'Brand not found'}
+        return 200, seed_brand(int(brand_id))
+
+    def authenticate(self, data, query):
+        user = _check_credentials(data)
+        if user is None:
+            return 401, {'error': 'Invalid credentials'}
+        return 200, {'user': user}
+
+    def auth_login(self, data, query):
+        user = _check_credentials(data)
+        if user is None:
+            return 401, {'success': False, 'error': 'Invalid credentials'}
+        return 200, {'success': True, 'user': user}
+
+    def users(self, data, query):
+        page = max(int(query.get('page', 1)), 1)
+        per_page = max(int(query.get('per_page', 100)), 1)
+        first = (page - 1) * per_page + 1
+        last = min(first + per_page - 1, self.server.options.users)
+        return 200, {'users': [seed_user(n) for n in range(first, last + 1)],
+                     'has_next': last < self.server.options.users}
+
+    def create_user(self, data, query):
+        return 201, {'user': dict(data, id=self.server.options.users + 1)}
+
+    ROUTES = (
+        ('GET', r'/api/brands', brands),
+        ('GET', r'/api/brands/(\d+)', brand),
+        ('POST', r'/api/authenticate', authenticate),
+        ('POST', r'/api/auth/login', auth_login),
+        ('GET', r'/api/users', users),
+        ('POST', r'/api/users', create_user),
+    )
+
+
+class EkranuHandler(FakeHandler):
+    def import_kampanijos(self, data, query):
+        return 200, {'imported_count': len(data.get('kampanijos', [])),
+                     'removed_count': len(data.get('removed_external_ids', []))}
+
+    ROUTES = (
+        ('POST', r'/api/import-kampanijos', import_kampanijos),
+    )
+
+
+def start(handler, port, options):
+    server = ThreadingHTTPServer(('127.0.0.1', port), handler)
+    server.daemon_threads = True
+    server.options = options
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--agency-port', type=int, default=5001)
+    parser.add_argument('--ekranu-port', type=int, default=5003)
+    parser.add_argument('--users', type=int, default=20, help='Users served by /api/users')
+    parser.add_argument('--brands', type=int, default=40, help='Brands served by /api/brands')
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds to wait before each response')
+    parser.add_argument('--failure-rate', type=float, default=0.0, help='Share of requests answered with 503')
+    parser.add_argument('--verbose', action='store_true', help='Log every request')
+    options = parser.parse_args()
+
+    servers = [start(AgencyCRMHandler, options.agency_port, options),
+               start(EkranuHandler, options.ekranu_port, options)]
+    print(f'agency-crm on http://127.0.0.1:{options.agency_port}, '
+          f'ekranu on http://127.0.0.1:{options.ekranu_port} (Ctrl+C to stop)')
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+    for server in servers:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""Drive a running projects-crm with concurrent requests and report latency per route.
+
+Each of --concurrency threads loops for --duration seconds, picking a route
+at random (weighted like real traffic: mostly API reads, some page views)
+with ids drawn from the campaigns the server returns. HTML routes are
+requested logged in as a seed user, so run it against a database filled by
+`flask seed` with benchmarks/fake_upstreams.py standing in for agency-crm.
+
+    flask seed --projects 2000
+    python benchmarks/fake_upstreams.py &
+    AGENCY_CRM_URL=http://localhost:5001 AGENCY_CRM_API_URL=http://localhost:5001/api flask serve &
+    python benchmarks/load.py --concurrency 16 --duration 30 --output before.json
+    ... change something, restart ...
+    python benchmarks/load.py --concurrency 16 --duration 30 --output after.json --compare before.json
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import statistics
+import sys
+import threading
+import time
+from datetime import datetime
+
+import requests
+
+# (name, path template, weight, needs a logged-in session)
+ROUTES = (
+    ('api_projects', '/api/projects?limit=100', 10, False),
+    ('api_campaigns', '/api/campaigns?limit=100', 10, False),
+    ('api_campaign', '/api/campaigns/{campaign_id}', 20, False),
+    ('api_campaign_plans', '/api/campaigns/{campaign_id}/plans', 20, False),
+    ('api_stats', '/api/stats?group_by=project', 2, False),
+    ('api_for_ekranu', '/api/campaigns/for-ekranu', 2, False),
+    ('api_search', '/api/search?q=summer%20radio', 3, False),
+    ('index', '/', 5, True),
+    ('projects_index', '/projects/', 5, True),
+    ('project_view', '/projects/{project_id}', 10, True),
+    ('campaign_view', '/campaigns/{campaign_id}', 10, True),
+    ('search', '/search?q=PLN-2', 2, True),
+)
+CSRF_TOKEN = re.compile(r'name="csrf_token"[^>]*value="([^"]+)"')
+
+
+def login(session, base_url, email, password):
+    """Log `session` in through the HTML form, as a browser would"""
+    form = session.get(f'{base_url}/auth/login', timeout=30)
+    match = CSRF_TOKEN.search(form.text)
+    data = {'email': email, 'password': password}
+    if match:
+        data['csrf_token'] = match.group(1)
+    response = session.post(f'{base_url}/auth/login', data=data, timeout=30, allow_redirects=False)
+    if response.status_code != 302 or '/auth/login' in response.headers.get('Location', ''):
+        raise SystemExit(f'Could not log in as {email} (HTTP {response.status_code})')
+
+
+def sample_ids(base_url, headers):
+    """(project_id, campaign_id) pairs to fill the route templates with"""
+    response = requests.get(f'{base_url}/api/campaigns', params={'limit': 1000, 'fields': 'id,project_id'},
+                            headers=headers, timeout=60)
+    response.raise_for_status()
+    pairs = [(item['project_id'], item['id']) for item in response.json()['items']]
+    if not pairs:
+        raise SystemExit('No active campaigns to request; fill the database with `flask seed` first')
+    return pairs
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = min(int(round(fraction * (len(sorted_values) - 1))), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+def worker(options, headers, pairs, routes, weights, deadline, results, lock):
+    session = requests.Session()
+    session.headers.update(headers)
+    if any(route[3] for route in routes):
+        user = random.randint(1, options.users)
+        login(session, options.base_url, f'seed-user-{user}@example.com', options.password)
+    local = {name: {'latencies': [], 'errors': 0} for name, _, _, _ in routes}
+
+    while time.perf_counter() < deadline:
+        name, template, _, _ = random.choices(routes, weights=weights)[0]
+        project_id, campaign_id = random.choice(pairs)
+        url = options.base_url + template.format(project_id=project_id, campaign_id=campaign_id)
+        started = time.perf_counter()
+        try:
+            response = session.get(url, timeout=30, allow_redirects=False)
+            ok = response.status_code == 200
+        except requests.exceptions.RequestException:
+            ok = False
+        elapsed = time.perf_counter() - started
+        local[name]['latencies'].append(elapsed)
+        if not ok:
+            local[name]['errors'] += 1
+
+    with lock:
+        for name, stats in local.items():
+            results[name]['latencies'].extend(stats['latencies'])
+            results[name]['errors'] += stats['errors']
+
+
+def summarize(results, seconds):
+    summary = {}
+    for name, stats in results.items():
+        latencies = sorted(stats['latencies'])
+        if not latencies:
+            continue
+        summary[name] = {
+            'requests': len(latencies),
+            'errors': stats['errors'],
+            'rps': round(len(latencies) / seconds, 1),
+            'mean_ms': round(statistics.fmean(latencies) * 1000, 1),
+            'p50_ms': round(percentile(latencies, 0.50) * 1000, 1),
+            'p95_ms': round(percentile(latencies, 0.95) * 1000, 1),
+            'p99_ms': round(percentile(latencies, 0.99) * 1000, 1),
+        }
+    everything = sorted(latency for stats in results.values() for latency in stats['latencies'])
+    if everything:
+        summary['total'] = {
+            'requests': len(everything),
+            'errors': sum(stats['errors'] for stats in results.values()),
+            'rps': round(len(everything) / seconds, 1),
+            'mean_ms': round(statistics.fmean(everything) * 1000, 1),
+            'p50_ms': round(percentile(everything, 0.50) * 1000, 1),
+            'p95_ms': round(percentile(everything, 0.95) * 1000, 1),
+            'p99_ms': round(percentile(everything, 0.99) * 1000, 1),
+        }
+    return summary
+
+
+def _change(new, old):
+    if not old:
+        return ''
+    return f' ({(new - old) / old * 100:+.0f}%)'
+
+
+def print_report(summary, baseline=None):
+    baseline = baseline or {}
+    print(f"{'route':<20} {'requests':>9} {'errors':>7} {'rps':>14} {'p50 ms':>14} {'p95 ms':>14} {'p99 ms':>14}")
+    for name, stats in summary.items():
+        old = baseline.get(name, {})
+        cells = [f"{stats[key]}{_change(stats[key], old.get(key))}" for key in ('rps', 'p50_ms', 'p95_ms', 'p99_ms')]
+        print(f"{name:<20} {stats['requests']:>9} {stats['errors']:>7} " + ' '.join(f'{cell:>14}' for cell in cells))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--base-url', default=os.environ.get('PROJECTS_CRM_URL', 'http://localhost:5002'))
+    parser.add_argument('--api-key', default=os.environ.get('API_KEY', 'projects-crm-api-key'))
+    parser.add_argument('--concurrency', type=int, default=8, help='Client threads')
+    parser.add_argument('--duration', type=float, default=20, help='Seconds to run')
+    parser.add_argument('--users', type=int, default=20, help='Seed users to log in as (seed-user-1..N)')
+    parser.add_argument('--password', default='password', help='Password of the seed users')
+    parser.add_argument('--routes', help='Comma-separated route names to run (default: all)')
+    parser.add_argument('--output', help='Write the results as JSON to this file')
+    parser.add_argument('--compare', help='Earlier --output file to show changes against')
+    options = parser.parse_args()
+    options.base_url = options.base_url.rstrip('/')
+
+    routes = ROUTES
+    if options.routes:
+        wanted = set(options.routes.split(','))
+        routes = tuple(route for route in ROUTES if route[0] in wanted)
+        if not routes:
+            raise SystemExit(f"No routes named {options.routes}; choose from {', '.join(r[0] for r in ROUTES)}")
+    weights = [route[2] for route in routes]
+
+    headers = {'X-API-Key': options.api_key}
+    pairs = sample_ids(options.base_url, headers)
+    results = {name: {'latencies': [], 'errors': 0} for name, _, _, _ in routes}
+    lock = threading.Lock()
+
+    started = time.perf_counter()
+    deadline = started + options.duration
+    threads = [threading.Thread(target=worker, args=(options, headers, pairs, routes, weights,
+                                                     deadline, results, lock))
+               for _ in range(options.concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    summary = summarize(results, time.perf_counter() - started)
+
+    baseline = None
+    if options.compare:
+        with open(options.compare) as f:
+            baseline = json.load(f)['routes']
+    print_report(summary, baseline)
+
+    if options.output:
+        with open(options.output, 'w') as f:
+            json.dump({
+                'started_at': datetime.utcnow().isoformat(),
+                'base_url': options.base_url,
+                'concurrency': options.concurrency,
+                'duration': options.duration,
+                'routes': summary
+            }, f, indent=2)
+        print(f'Results written to {options.output}')
+    if summary.get('total', {}).get('errors'):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
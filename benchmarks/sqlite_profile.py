@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""Mixed read/write throughput of SQLite with and without the engine profile.
+
+Several worker processes share one database file, like gunicorn workers.
+Each loops for --seconds: mostly reads (a campaign with its plans), and
+with probability --write-ratio a plan insert plus commit, as TV-Planner
+pushes do. Prints operations per second, p95 latency and how many
+operations failed with "database is locked".
+
+    python benchmarks/sqlite_profile.py --workers 4 --seconds 5
+"""
+
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy.exc import OperationalError  # noqa: E402
+
+from app import db  # noqa: E402
+from app.models import User, Project, Campaign, Plan  # noqa: E402
+from app.testing import create_test_app  # noqa: E402
+
+PROFILES = {
+    # SQLite defaults: rollback journal, synchronous=FULL, no busy_timeout
+    # beyond the driver's own 5 second wait
+    'default': {'SQLITE_PRAGMAS': {}},
+    'tuned': {},
+}
+
+
+def make_app(path, profile):
+    return create_test_app(f'sqlite:///{path}', **PROFILES[profile])
+
+
+def seed(path, profile, campaigns):
+    app = make_app(path, profile)
+    with app.app_context():
+        user = User(email='bench@example.com')
+        project = Project(code='PLN-00-001', name='Bench', client_brand_id=1, created_by=user,
+                          start_date=date(2026, 1, 1), end_date=date(2026, 12, 31))
+        db.session.add(project)
+        for i in range(campaigns):
+            campaign = Campaign(code=f'PLN-00-001-{i}', name=f'C{i}', project=project,
+                                start_date=date(2026, 1, 1), end_date=date(2026, 2, 1))
+            db.session.add(campaign)
+            for k in range(5):
+                db.session.add(Plan(name=f'Plan{k + 1}', campaign=campaign, budget=100.0))
+        db.session.commit()
+        db.engine.dispose()
+
+
+def worker(path, profile, seconds, write_ratio, campaigns, results):
+    app = make_app(path, profile)
+    reads = writes = locked = 0
+    latencies = []
+    with app.app_context():
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            campaign_id = random.randint(1, campaigns)
+            started = time.perf_counter()
+            try:
+                if random.random() < write_ratio:
+                    db.session.add(Plan(name='Bench', campaign_id=campaign_id, budget=1.0))
+                    db.session.commit()
+                    writes += 1
+                else:
+                    campaign = db.session.get(Campaign, campaign_id)
+                    [plan.budget for plan in campaign.plans]
+                    db.session.rollback()
+                    reads += 1
+            except OperationalError:
+                db.session.rollback()
+                locked += 1
+                continue
+            latencies.append(time.perf_counter() - started)
+        db.engine.dispose()
+    results.put((reads, writes, locked, latencies))
+
+
+def run(profile, args):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.db')
+        seed(path, profile, args.campaigns)
+        results = multiprocessing.Queue()
+        processes = [
+            multiprocessing.Process(target=worker, args=(path, profile, args.seconds, args.write_ratio,
+                                                         args.campaigns, results))
+            for _ in range(args.workers)
+        ]
+        for process in processes:
+            process.start()
+        collected = [results.get() for _ in processes]
+        for process in processes:
+            process.join()
+
+    reads = sum(r[0] for r in collected)
+    writes = sum(r[1] for r in collected)
+    locked = sum(r[2] for r in collected)
+    latencies = sorted(l for r in collected for l in r[3])
+    p95 = latencies[int(len(latencies) * 0.95)] * 1000 if latencies else 0.0
+    print(f'{profile:8} {(reads + writes) / args.seconds:10.0f} ops/s  '
+          f'{reads / args.seconds:8.0f} reads/s  {writes / args.seconds:7.0f} writes/s  '
+          f'p95 {p95:7.1f} ms  {locked} locked')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--write-ratio', type=float, default=0.2)
+    parser.add_argument('--campaigns', type=int, default=200)
+    parser.add_argument('--profile', choices=sorted(PROFILES), action='append')
+    args = parser.parse_args()
+
+    for profile in args.profile or ['default', 'tuned']:
+        run(profile, args)
+
+
+if __name__ == '__main__':
+    main()
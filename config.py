@@ -9,11 +9,78 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or \
         'sqlite:///' + os.path.join(basedir, 'projects.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # Connection pool for file-backed and server databases (app/engine.py)
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 5))
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 10))
+    DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', 30))
+    DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 1800))
+
+    # PRAGMAs run on every new SQLite connection; set to {} to leave SQLite's defaults.
+    # WAL lets readers run alongside the single writer, and busy_timeout (ms) makes
+    # writers wait for the lock instead of failing with "database is locked".
+    SQLITE_PRAGMAS = {
+        'journal_mode': os.environ.get('SQLITE_JOURNAL_MODE', 'WAL'),
+        'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT', 5000)),
+        'synchronous': os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL'),
+        'cache_size': int(os.environ.get('SQLITE_CACHE_SIZE', -64000)),  # negative = KiB
+        'mmap_size': int(os.environ.get('SQLITE_MMAP_SIZE', 268435456)),
+        'temp_store': 'MEMORY',
+    }
     
     # Agency CRM API configuration
     AGENCY_CRM_API_URL = os.environ.get('AGENCY_CRM_API_URL', 'http://localhost:5001/api')
     AGENCY_CRM_API_KEY = os.environ.get('AGENCY_CRM_API_KEY', '')
 
+    # Delta sync: X-Sync-Timestamp is this many seconds behind the read, so writes
+    # still in flight then (stamped at flush, committed later) are listed next time.
+    # Keep it above the longest write transaction
+    SYNC_OVERLAP = float(os.environ.get('SYNC_OVERLAP', 60))
+
+    # ekranu-crm campaign push
+    EKRANU_URL = os.environ.get('EKRANU_URL', 'http://172.20.89.236:5003')
+    EKRANU_API_KEY = os.environ.get('EKRANU_API_KEY', 'ekranu-crm-api-key')
+    EKRANU_SYNC_CHUNK_SIZE = int(os.environ.get('EKRANU_SYNC_CHUNK_SIZE', 200))
+
+    # Background job worker (flask worker)
+    JOB_POLL_INTERVAL = float(os.environ.get('JOB_POLL_INTERVAL', 2))
+    JOB_MAX_ATTEMPTS = int(os.environ.get('JOB_MAX_ATTEMPTS', 5))
+    JOB_BACKOFF_BASE = float(os.environ.get('JOB_BACKOFF_BASE', 30))
+    JOB_BACKOFF_MAX = float(os.environ.get('JOB_BACKOFF_MAX', 3600))
+    # Running jobs locked longer than this are assumed orphaned by a dead worker
+    JOB_LOCK_TIMEOUT = float(os.environ.get('JOB_LOCK_TIMEOUT', 900))
+
+    # Outbound HTTP (app/http_client.py): pooled keep-alive sessions per upstream
+    HTTP_POOL_SIZE = int(os.environ.get('HTTP_POOL_SIZE', 10))
+    HTTP_CONNECT_TIMEOUT = float(os.environ.get('HTTP_CONNECT_TIMEOUT', 3.05))
+    HTTP_READ_TIMEOUT = float(os.environ.get('HTTP_READ_TIMEOUT', 10))
+    HTTP_RETRIES = int(os.environ.get('HTTP_RETRIES', 2))
+    HTTP_BACKOFF_FACTOR = float(os.environ.get('HTTP_BACKOFF_FACTOR', 0.3))
+    # Circuit breaker per upstream: this many consecutive failures refuse calls
+    # for CIRCUIT_RESET_TIMEOUT seconds, so callers fall back without waiting
+    CIRCUIT_FAILURE_THRESHOLD = int(os.environ.get('CIRCUIT_FAILURE_THRESHOLD', 5))
+    CIRCUIT_RESET_TIMEOUT = float(os.environ.get('CIRCUIT_RESET_TIMEOUT', 30))
+    # Each process re-reads the shared circuit state at most this often; state
+    # writes give up after CIRCUIT_LOCK_TIMEOUT seconds on a locked SQLite database
+    CIRCUIT_STATE_TTL = float(os.environ.get('CIRCUIT_STATE_TTL', 2))
+    CIRCUIT_LOCK_TIMEOUT = float(os.environ.get('CIRCUIT_LOCK_TIMEOUT', 0.5))
+    # Interactive logins give up sooner than background calls and are never retried
+    AGENCY_CRM_AUTH_TIMEOUT = float(os.environ.get('AGENCY_CRM_AUTH_TIMEOUT', 5))
+
+    # Page size requested from agency-crm during a full user sync
+    AGENCY_CRM_USERS_PAGE_SIZE = int(os.environ.get('AGENCY_CRM_USERS_PAGE_SIZE', 500))
+
+    # Rows per page of the projects list (?per_page= may ask for up to 100)
+    PROJECTS_PER_PAGE = int(os.environ.get('PROJECTS_PER_PAGE', 25))
+
+    # Brands are mirrored locally and refreshed in the background once older than this
+    BRAND_CACHE_TTL = int(os.environ.get('BRAND_CACHE_TTL', 900))
+    # ...unless that job waits unclaimed this long (no worker), then the next read refreshes inline
+    BRAND_REFRESH_MAX_WAIT = int(os.environ.get('BRAND_REFRESH_MAX_WAIT', 300))
+
+    # Per-endpoint request/SQL metrics on /metrics (Prometheus format, needs X-API-Key)
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+
     # API Configuration
     API_KEY = os.environ.get('API_KEY', 'projects-crm-api-key')
     AGENCY_CRM_URL = os.environ.get('AGENCY_CRM_URL', 'http://localhost:5001')
@@ -0,0 +1,77 @@
+"""full-text search index
+
+Revision ID: b5305217cb5d
+Revises: d0f34d767f65
+Create Date: 2026-10-18 09:33:08.244820
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b5305217cb5d'
+down_revision = 'd0f34d767f65'
+branch_labels = None
+depends_on = None
+
+# FTS5 is SQLite-only; see app/search.py for the layout (rowid = id * 4 + kind)
+PROJECT_ROW = """
+    {row}.id * 4 + 1, 'project', NULL, {row}.code, {row}.name, {row}.client_brand_name,
+    coalesce({row}.comments, '') || ' ' || coalesce({row}.overall_info, '')
+"""
+CAMPAIGN_ROW = """
+    {row}.id * 4 + 2, 'campaign', {row}.project_id, {row}.code, {row}.name,
+    (SELECT client_brand_name FROM projects WHERE projects.id = {row}.project_id), {row}.overall_info
+"""
+PLAN_ROW = """
+    {row}.id * 4 + 3, 'plan', {row}.campaign_id, NULL, {row}.name,
+    (SELECT projects.client_brand_name FROM campaigns JOIN projects ON projects.id = campaigns.project_id
+     WHERE campaigns.id = {row}.campaign_id), {row}.description
+"""
+SOURCES = (
+    ('projects', 1, 'code, name, client_brand_name, comments, overall_info', PROJECT_ROW),
+    ('campaigns', 2, 'code, name, overall_info, project_id', CAMPAIGN_ROW),
+    ('plans', 3, 'name, description, campaign_id', PLAN_ROW),
+)
+COLUMNS = 'rowid, kind, parent_id, code, name, brand, body'
+
+
+def upgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    op.execute(
+        "CREATE VIRTUAL TABLE search_index USING fts5("
+        "kind UNINDEXED, parent_id UNINDEXED, code, name, brand, body, "
+        "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+    )
+    for table, kind, columns, row in SOURCES:
+        insert = f'INSERT INTO search_index ({COLUMNS}) SELECT {row.format(row="new")};'
+        delete = f'DELETE FROM search_index WHERE rowid = old.id * 4 + {kind};'
+        op.execute(f'CREATE TRIGGER {table}_search_insert AFTER INSERT ON {table} BEGIN {insert} END')
+        op.execute(f'CREATE TRIGGER {table}_search_update AFTER UPDATE OF {columns} ON {table} '
+                   f'BEGIN {delete} {insert} END')
+        op.execute(f'CREATE TRIGGER {table}_search_delete AFTER DELETE ON {table} BEGIN {delete} END')
+    op.execute(
+        'CREATE TRIGGER projects_search_brand AFTER UPDATE OF client_brand_name ON projects '
+        'WHEN old.client_brand_name IS NOT new.client_brand_name BEGIN '
+        'UPDATE search_index SET brand = new.client_brand_name WHERE rowid IN ('
+        'SELECT id * 4 + 2 FROM campaigns WHERE project_id = new.id UNION ALL '
+        'SELECT plans.id * 4 + 3 FROM plans JOIN campaigns ON campaigns.id = plans.campaign_id '
+        'WHERE campaigns.project_id = new.id); END'
+    )
+
+    # Index the existing rows (same as `flask rebuild-search-index`)
+    for table, _, _, row in SOURCES:
+        op.execute(f'INSERT INTO search_index ({COLUMNS}) SELECT {row.format(row=table)} FROM {table}')
+    op.execute("INSERT INTO search_index (search_index) VALUES ('optimize')")
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    op.execute('DROP TRIGGER IF EXISTS projects_search_brand')
+    for table, _, _, _ in SOURCES:
+        for action in ('insert', 'update', 'delete'):
+            op.execute(f'DROP TRIGGER IF EXISTS {table}_search_{action}')
+    op.execute('DROP TABLE IF EXISTS search_index')
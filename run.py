@@ -5,9 +5,14 @@ from dotenv import load_dotenv
 load_dotenv('/home/vainiusl/py_projects/projects-crm/.env')
 
 from app import create_app, db
-from app.models import User, Project, Campaign, Plan
-from app.services import AgencyCRMService
+from app.models import User, Project, Campaign, Plan, Tombstone
+from app.services import AgencyCRMService, BrandService
+from app.jobs import work
+from datetime import datetime, timedelta
 import click
+import signal
+import sys
+import threading
 
 app = create_app()
 
@@ -19,8 +24,74 @@ def make_shell_context():
 def sync_users():
     """Sync users from agency-crm to projects-crm"""
     click.echo('Syncing users from agency-crm...')
-    synced_count = AgencyCRMService.sync_all_users()
-    click.echo(f'Successfully synced {synced_count} users')
+    try:
+        counts = AgencyCRMService.sync_all_users()
+    except Exception as e:
+        raise click.ClickException(f'User sync failed: {e}')
+    click.echo(f"Successfully synced {counts['created']} users")
+    click.echo(f"  {counts['created']} created, {counts['updated']} updated, "
+               f"{counts['unchanged']} unchanged, {counts['failed']} failed")
+
+@app.cli.command()
+def sync_brands():
+    """Refresh the local brand mirror from agency-crm"""
+    click.echo('Syncing brands from agency-crm...')
+    try:
+        counts = BrandService.refresh()
+    except Exception as e:
+        raise click.ClickException(f'Brand sync failed: {e}')
+    click.echo(f"Brands: {counts['created']} created, {counts['updated']} updated, "
+               f"{counts['deactivated']} deactivated, {counts['unchanged']} unchanged")
+
+@app.cli.command()
+@click.option('--days', default=90, show_default=True, help='Keep tombstones newer than this')
+def prune_tombstones(days):
+    """Delete deletion tombstones older than --days"""
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    deleted = Tombstone.query.filter(Tombstone.deleted_at < cutoff).delete(synchronize_session=False)
+    db.session.commit()
+    click.echo(f'Pruned {deleted} tombstones older than {days} days')
+
+@app.cli.command()
+@click.option('--once', is_flag=True, help='Exit once no job is due instead of polling')
+@click.option('--worker-id', default=None, help='Name recorded on claimed jobs (default host:pid)')
+def worker(once, worker_id):
+    """Run queued background jobs (ekranu push, user sync, brand refresh)"""
+    stop = threading.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda *args: stop.set())
+    click.echo('Worker started, waiting for jobs...')
+    processed = work(worker_id=worker_id, once=once, stop=stop)
+    click.echo(f'Worker stopped after {processed} jobs')
+
+@app.cli.command()
+@click.option('--users', default=20, show_default=True, help='Planners (seed-user-N@example.com, password "password")')
+@click.option('--projects', default=500, show_default=True, help='Projects to add')
+@click.option('--brands', default=40, show_default=True, help='Brands 1..N in the local mirror')
+@click.option('--campaigns-per-project', default=4, show_default=True, help='Mean campaigns per project')
+@click.option('--plans-per-campaign', default=3, show_default=True, help='Mean plans per campaign')
+@click.option('--seed', 'random_seed', default=42, show_default=True, help='Random seed, for repeatable data')
+def seed(users, projects, brands, campaigns_per_project, plans_per_campaign, random_seed):
+    """Fill the database with synthetic data for load tests and benchmarks"""
+    from app.seeding import seed_database
+    counts = seed_database(users=users, projects=projects, brands=brands,
+                           campaigns_per_project=campaigns_per_project,
+                           plans_per_campaign=plans_per_campaign, random_seed=random_seed)
+    click.echo(f"Seeded {counts['users']} users, {counts['brands']} brands, {counts['projects']} projects, "
+               f"{counts['campaigns']} campaigns and {counts['plans']} plans")
+
+@app.cli.command()
+def rebuild_counters():
+    """Recount the stored project/campaign/plan totals of every user and project"""
+    from app.models import rebuild_counters as rebuild
+    users, projects = rebuild()
+    click.echo(f'Rebuilt counters for {users} users and {projects} projects')
+
+@app.cli.command()
+def rebuild_search_index():
+    """Re-index every project, campaign and plan for full-text search"""
+    from app.search import rebuild_search_index as rebuild
+    click.echo(f'Indexed {rebuild()} projects, campaigns and plans')
 
 @app.cli.command()
 def create_db():
@@ -28,7 +99,25 @@ def create_db():
     db.create_all()
     click.echo('Database tables created successfully')
 
+@app.cli.command()
+@click.option('--workers', type=int, help='Worker processes (default: WEB_CONCURRENCY or 2 x CPUs + 1)')
+@click.option('--threads', type=int, help='Threads per worker (default: GUNICORN_THREADS or 4)')
+@click.option('--bind', help='Address to listen on (default: 0.0.0.0:$PORT, port 5002)')
+def serve(workers, threads, bind):
+    """Serve with gunicorn: preloaded app, pre-forked threaded workers (see gunicorn.conf.py)"""
+    basedir = os.path.dirname(os.path.abspath(__file__))
+    args = [sys.executable, '-m', 'gunicorn', '--chdir', basedir,
+            '--config', os.path.join(basedir, 'gunicorn.conf.py')]
+    if workers:
+        args += ['--workers', str(workers)]
+    if threads:
+        args += ['--threads', str(threads)]
+    if bind:
+        args += ['--bind', bind]
+    args.append('wsgi:app')
+    # Hand the process over to the gunicorn master so it receives SIGTERM/SIGINT directly
+    os.execv(sys.executable, args)
+
 if __name__ == '__main__':
-    with app.app_context():
-        db.create_all()
+    # Development server only; use `flask serve` in production and `flask db upgrade` for the schema
     app.run(debug=True, port=5002, host='0.0.0.0')
\ No newline at end of file
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""Query budgets for every route in app/api/routes.py.
+
+Each request runs inside app.testing.query_budget, which fails when the
+route sends more statements than its budget or repeats a statement with
+only its parameters changed (a per-row lazy load). When a budget fails,
+fix the query (load_only, contains_eager, a bulk statement) rather than
+raising the number.
+"""
+
+import json
+import threading
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from app import db
+from app.models import User, Project, Campaign, Plan, Job
+from app.testing import create_test_app, query_budget
+
+API_KEY = 'api-test-key'
+HEADERS = {'X-API-Key': API_KEY}
+WEBHOOK_HEADERS = {'X-Webhook-Secret': 'shared-secret-key'}
+
+# (method, url, json body, expected status, query budget)
+READ_ROUTES = [
+    ('GET', '/api/projects', None, 200, 2),
+    ('GET', '/api/projects?fields=id,code,campaign_count,plan_budget_total', None, 200, 2),
+    ('GET', '/api/projects?updated_since=2000-01-01T00:00:00Z&limit=2', None, 200, 2),
+    ('GET', '/api/campaigns', None, 200, 2),
+    ('GET', '/api/campaigns?fields=id,code,project_name,plan_count', None, 200, 2),
+    ('GET', '/api/campaigns?updated_since=2000-01-01T00:00:00Z', None, 200, 2),
+    ('GET', '/api/campaigns/1', None, 200, 1),
+    ('GET', '/api/campaigns/1/plans', None, 200, 3),
+    ('GET', '/api/plans/1', None, 200, 1),
+    ('GET', '/api/deletions?since=2000-01-01T00:00:00Z', None, 200, 2),
+]
+
+# Plan writes include two UPDATEs keeping the project and user totals current
+WRITE_ROUTES = [
+    ('POST', '/api/sync-user', {'email': 'new@example.com', 'agency_crm_id': 500, 'name': 'New User'}, 201, 3),
+    ('POST', '/api/sync-user', {'email': 'new2@example.com', 'agency_crm_id': 500, 'name': 'New User'}, 200, 3),
+    ('POST', '/api/campaigns/1/plans', {'budget': 10}, 201, 8),
+    ('POST', '/api/plans/batch', {'plans': [{'campaign_id': c, 'budget': 1} for c in (1, 2, 3) for _ in range(5)]},
+     201, 21),
+    ('PUT', '/api/campaigns/2/plans', {'plans': [{'name': 'Plan1', 'budget': 5}, {'name': 'Fresh'}]}, 200, 10),
+    ('PATCH', '/api/plans/1', {'budget': 42}, 200, 3),
+    ('DELETE', '/api/plans/2', None, 200, 5),
+    ('DELETE', '/api/campaigns/3/plans/by-name/Plan1', None, 200, 6),
+    ('POST', '/api/campaigns/sync-to-ekranu', {'full': False}, 202, 3),
+]
+
+# Statements a route may legitimately repeat, by URL
+ALLOWED_REPEATS = {
+    # SQLite cannot promise RETURNING order for a multi-row INSERT, so SQLAlchemy
+    # sends one INSERT per plan to return ids in input order. The plan counters
+    # of all campaigns in the batch are advanced by a single UPDATE.
+    '/api/plans/batch': ('INSERT INTO plans',),
+}
+
+
+class AgencyCRMStub(BaseHTTPRequestHandler):
+    """Answers POST /api/authenticate like agency-crm"""
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        if body.get('password') == 'secret':
+            status, payload = 200, {'user': {'id': 900, 'email': body['email'], 'name': 'Stub User'}}
+        else:
+            status, payload = 401, {'error': 'Invalid credentials'}
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+def make_client(**settings):
+    app = create_test_app(API_KEY=API_KEY, HTTP_RETRIES=0, **settings)
+    context = app.app_context()
+    context.push()
+    user = User(email='planner@example.com', agency_crm_id=1)
+    db.session.add(user)
+    for i in range(4):
+        project = Project(code=f'PLN-00-{i + 1:03d}', name=f'Project {i}', client_brand_id=1,
+                          start_date=date(2026, 1, 1), end_date=date(2026, 12, 31), created_by=user)
+        db.session.add(project)
+        for j in range(3):
+            campaign = Campaign(code=f'{project.code}-{chr(65 + j)}', name=f'Campaign {j}', project=project,
+                                start_date=date(2026, 1, 1), end_date=date(2026, 2, 1))
+            db.session.add(campaign)
+            for k in range(3):
+                db.session.add(Plan(name=f'Plan{k + 1}', campaign=campaign, budget=100.0 * k))
+    db.session.commit()
+    return app, context, app.test_client()
+
+
+def call(client, method, url, body, status, budget, headers=HEADERS):
+    with query_budget(budget, allow_repeated=ALLOWED_REPEATS.get(url, ())):
+        response = client.open(url, method=method, json=body, headers=headers)
+    assert response.status_code == status, f'{method} {url} -> {response.status_code}: {response.data[:300]}'
+    # Later requests must not reuse objects this one left in the session
+    db.session.remove()
+    return response
+
+
+def test_read_routes_within_budget():
+    app, context, client = make_client()
+    try:
+        for method, url, body, status, budget in READ_ROUTES:
+            call(client, method, url, body, status, budget)
+    finally:
+        context.pop()
+
+
+def test_write_routes_within_budget():
+    app, context, client = make_client()
+    try:
+        for method, url, body, status, budget in WRITE_ROUTES:
+            call(client, method, url, body, status, budget)
+        assert Job.query.filter_by(kind='ekranu_push').count() == 1
+    finally:
+        context.pop()
+
+
+def test_webhooks_within_budget():
+    app, context, client = make_client()
+    try:
+        user = {'email': 'hook@example.com', 'first_name': 'Hook', 'last_name': 'User'}
+        call(client, 'POST', '/api/webhooks/user_created', user, 201, 3, WEBHOOK_HEADERS)
+        call(client, 'POST', '/api/webhooks/user_updated', dict(user, first_name='Changed'), 200, 2,
+             WEBHOOK_HEADERS)
+        call(client, 'POST', '/api/webhooks/user_deleted', {'email': user['email']}, 200, 2, WEBHOOK_HEADERS)
+    finally:
+        context.pop()
+
+
+def test_login_with_agency_crm_within_budget():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), AgencyCRMStub)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    app, context, client = make_client(AGENCY_CRM_URL=f'http://127.0.0.1:{server.server_port}')
+    try:
+        credentials = {'email': 'stub@example.com', 'password': 'secret'}
+        # The first call reads the shared agency-crm circuit state, later ones use the cached copy
+        call(client, 'POST', '/api/auth/login-with-agency-crm', credentials, 200, 4)
+        call(client, 'POST', '/api/auth/login-with-agency-crm', credentials, 200, 1)
+        call(client, 'POST', '/api/auth/login-with-agency-crm', dict(credentials, password='wrong'), 401, 0)
+    finally:
+        context.pop()
+        server.shutdown()
+
+
+def test_query_budget_flags_lazy_loads():
+    app, context, client = make_client()
+    try:
+        try:
+            with query_budget(100):
+                for campaign in Campaign.query.all():
+                    len(campaign.plans)
+        except AssertionError as e:
+            assert 'N+1: 12 x SELECT plans' in str(e)
+        else:
+            raise AssertionError('per-campaign plan loads were not flagged')
+    finally:
+        context.pop()
+
+
+
+def test_stats_rejects_malformed_id_lists():
+    app, context, client = make_client()
+    try:
+        response = call(client, 'GET', '/api/stats?project_id=1,2&project_id=3', None, 200, 1)
+        assert response.get_json()['totals']['project_count'] == 3
+        for url, name in [('/api/stats?project_id=1,x', 'project_id'),
+                          ('/api/stats?campaign_id=1.5', 'campaign_id')]:
+            response = call(client, 'GET', url, None, 400, 0)
+            assert response.get_json() == {'error': f'{name} must be a comma-separated list of integers'}, url
+    finally:
+        context.pop()
+
+
+if __name__ == '__main__':
+    test_read_routes_within_budget()
+    test_write_routes_within_budget()
+    test_webhooks_within_budget()
+    test_login_with_agency_crm_within_budget()
+    test_query_budget_flags_lazy_loads()
+    test_stats_rejects_malformed_id_lists()
+    print('✓ All API routes are within their query budgets')
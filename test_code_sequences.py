@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""Concurrency tests for project and campaign code allocation"""
+
+import os
+import tempfile
+import threading
+import time
+from datetime import date
+
+from app import create_app, db
+from app.models import Campaign, CodeSequence, Project, User, campaign_suffix, campaign_suffix_number
+from config import Config
+
+THREADS = 8
+ROUNDS = 15
+
+
+def make_app(path):
+    class TestConfig(Config):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{path}'
+        SQLALCHEMY_ENGINE_OPTIONS = {'connect_args': {'timeout': 30}}
+
+    app = create_app(TestConfig)
+    with app.app_context():
+        db.create_all()
+        user = User(email='codes@example.com', first_name='Code', last_name='Test')
+        db.session.add(user)
+        db.session.commit()
+    return app
+
+
+def hammer(app, user_id, block_size, results, errors):
+    def worker():
+        try:
+            with app.app_context():
+                for _ in range(ROUNDS):
+                    codes = Project.allocate_project_codes(block_size)
+                    for code in codes:
+                        db.session.add(Project(
+                            code=code, name=code, client_brand_id=1,
+                            start_date=date.today(), end_date=date.today(),
+                            created_by_id=user_id
+                        ))
+                    db.session.commit()
+                    results.extend(codes)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker) for _ in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def run_allocation(block_size):
+    with tempfile.TemporaryDirectory() as tmp:
+        app = make_app(os.path.join(tmp, 'codes.db'))
+        results, errors = [], []
+        hammer(app, 1, block_size, results, errors)
+
+        assert not errors, errors
+        expected = THREADS * ROUNDS * block_size
+        assert len(results) == expected
+        assert len(set(results)) == expected
+        numbers = sorted(int(code.rsplit('-', 1)[-1]) for code in results)
+        assert numbers == list(range(1, expected + 1))
+
+        with app.app_context():
+            assert Project.query.count() == expected
+            prefix = results[0].rsplit('-', 1)[0]
+            assert db.session.get(CodeSequence, prefix).value == expected
+            db.engine.dispose()
+
+
+def test_single_codes_are_unique_under_concurrency():
+    run_allocation(1)
+
+
+def test_code_blocks_are_contiguous_and_unique():
+    run_allocation(5)
+
+
+def test_sequence_is_seeded_from_existing_codes():
+    with tempfile.TemporaryDirectory() as tmp:
+        app = make_app(os.path.join(tmp, 'codes.db'))
+        with app.app_context():
+            prefix = Project.allocate_project_codes(1)[0].rsplit('-', 1)[0]
+            db.session.rollback()
+            db.session.query(CodeSequence).delete()
+            db.session.add(Project(
+                code=f'{prefix}-041', name='Existing', client_brand_id=1,
+                start_date=date.today(), end_date=date.today(), created_by_id=1
+            ))
+            db.session.commit()
+
+            assert Project.generate_project_code() == f'{prefix}-042'
+            db.session.rollback()
+            db.engine.dispose()
+
+
+def test_sequence_is_created_inside_an_open_write_transaction():
+    with tempfile.TemporaryDirectory() as tmp:
+        app = make_app(os.path.join(tmp, 'codes.db'))
+        with app.app_context():
+            db.session.query(CodeSequence).delete()
+            # The session now holds SQLite's write lock, as a request does after its first flush
+            db.session.add(Project(
+                code='PLN-00-007', name='Flushed', client_brand_id=1,
+                start_date=date.today(), end_date=date.today(), created_by_id=1
+            ))
+            db.session.flush()
+
+            started = time.perf_counter()
+            code = Project.generate_project_code()
+            assert time.perf_counter() - started < 0.5
+            assert code.endswith('-001')
+            db.session.commit()
+            assert CodeSequence.query.count() == 1
+            db.engine.dispose()
+
+
+def test_campaign_suffixes_continue_past_z():
+    assert [campaign_suffix(n) for n in (1, 26, 27, 28, 52, 53, 702, 703)] == \
+        ['A', 'Z', 'AA', 'AB', 'AZ', 'BA', 'ZZ', 'AAA']
+    for number in range(1, 1000):
+        assert campaign_suffix_number(campaign_suffix(number)) == number
+
+
+def test_campaign_codes_are_unique_under_concurrency():
+    with tempfile.TemporaryDirectory() as tmp:
+        app = make_app(os.path.join(tmp, 'codes.db'))
+        with app.app_context():
+            project = Project(
+                code='PLN-00-001', name='Campaigns', client_brand_id=1,
+                start_date=date.today(), end_date=date.today(), created_by_id=1
+            )
+            db.session.add(project)
+            db.session.add(Campaign(
+                code='PLN-00-001-C', name='Existing', project=project,
+                start_date=date.today(), end_date=date.today()
+            ))
+            db.session.commit()
+            project_id = project.id
+
+        results, errors = [], []
+
+        def worker():
+            try:
+                with app.app_context():
+                    project = db.session.get(Project, project_id)
+                    for _ in range(ROUNDS):
+                        codes = Campaign.allocate_campaign_codes(project, 2)
+                        for code in codes:
+                            db.session.add(Campaign(
+                                code=code, name=code, project_id=project_id,
+                                start_date=date.today(), end_date=date.today()
+                            ))
+                        db.session.commit()
+                        results.extend(codes)
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=worker) for _ in range(THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert not errors, errors
+        expected = THREADS * ROUNDS * 2
+        numbers = sorted(campaign_suffix_number(code.rsplit('-', 1)[-1]) for code in results)
+        assert numbers == list(range(4, expected + 4))
+
+        with app.app_context():
+            assert db.session.get(Project, project_id).last_campaign_number == expected + 3
+            db.engine.dispose()
+
+
+if __name__ == '__main__':
+    test_single_codes_are_unique_under_concurrency()
+    test_code_blocks_are_contiguous_and_unique()
+    test_sequence_is_seeded_from_existing_codes()
+    test_sequence_is_created_inside_an_open_write_transaction()
+    test_campaign_suffixes_continue_past_z()
+    test_campaign_codes_are_unique_under_concurrency()
+    print('✓ Project and campaign code allocation is unique under concurrency')
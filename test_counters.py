@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""Stored project/campaign/plan totals stay equal to a full recount"""
+
+from datetime import date
+
+from app import db
+from app.models import User, Project, Campaign, Plan, rebuild_counters
+from app.testing import create_test_app, login, query_budget
+
+API_KEY = 'counters-test-key'
+HEADERS = {'X-API-Key': API_KEY}
+
+
+def make_app():
+    app = create_test_app(API_KEY=API_KEY)
+    context = app.app_context()
+    context.push()
+    return app, context
+
+
+def add_project(user, number, campaigns=2, plans=3):
+    project = Project(code=f'PLN-00-{number:03d}', name=f'Project {number}', client_brand_id=1,
+                      start_date=date(2026, 1, 1), end_date=date(2026, 12, 31), created_by=user)
+    db.session.add(project)
+    for j in range(campaigns):
+        campaign = Campaign(code=f'{project.code}-{chr(65 + j)}', name=f'Campaign {j}', project=project,
+                            start_date=date(2026, 1, 1), end_date=date(2026, 2, 1))
+        db.session.add(campaign)
+        for k in range(plans):
+            db.session.add(Plan(name=f'Plan{k + 1}', campaign=campaign))
+    return project
+
+
+def totals():
+    """Every stored total, to compare before and after a rebuild"""
+    db.session.expire_all()
+    users = [(u.id, u.total_projects, u.total_campaigns, u.total_plans) for u in User.query.order_by(User.id)]
+    projects = [(p.id, p.total_campaigns, p.total_plans) for p in Project.query.order_by(Project.id)]
+    return users, projects
+
+
+def assert_totals_match_recount():
+    stored = totals()
+    rebuild_counters()
+    assert stored == totals()
+
+
+def test_orm_writes_keep_totals_current():
+    app, context = make_app()
+    try:
+        alice, bob = User(email='alice@example.com'), User(email='bob@example.com')
+        db.session.add_all([alice, bob])
+        first = add_project(alice, 1)
+        add_project(alice, 2, campaigns=1, plans=4)
+        add_project(bob, 3)
+        db.session.commit()
+
+        assert (alice.total_projects, alice.total_campaigns, alice.total_plans) == (2, 3, 10)
+        assert (first.total_campaigns, first.total_plans) == (2, 6)
+        assert_totals_match_recount()
+
+        db.session.delete(first.campaigns[0].plans[0])
+        db.session.commit()
+        db.session.delete(first.campaigns[1])
+        db.session.commit()
+        assert (first.total_campaigns, first.total_plans) == (1, 2)
+        assert (alice.total_campaigns, alice.total_plans) == (2, 6)
+
+        db.session.delete(Project.query.filter_by(code='PLN-00-002').one())
+        db.session.commit()
+        assert (alice.total_projects, alice.total_campaigns, alice.total_plans) == (1, 1, 2)
+        assert (bob.total_projects, bob.total_campaigns, bob.total_plans) == (1, 2, 6)
+        assert_totals_match_recount()
+    finally:
+        context.pop()
+
+
+def test_bulk_plan_routes_adjust_totals():
+    app, context = make_app()
+    try:
+        user = User(email='bulk@example.com')
+        db.session.add(user)
+        project = add_project(user, 1)
+        db.session.commit()
+        first, second = [campaign.id for campaign in project.campaigns]
+        client = app.test_client()
+
+        response = client.post('/api/plans/batch', headers=HEADERS, json={
+            'plans': [{'campaign_id': first}] * 4 + [{'campaign_id': second}]
+        })
+        assert response.status_code == 201
+        response = client.put(f'/api/campaigns/{second}/plans', headers=HEADERS, json={
+            'plans': [{'name': 'Plan1'}, {'name': 'Fresh'}]
+        })
+        assert response.status_code == 200
+
+        db.session.expire_all()
+        assert (project.total_campaigns, project.total_plans) == (2, 3 + 4 + 2)
+        assert user.total_plans == 9
+        assert_totals_match_recount()
+    finally:
+        context.pop()
+
+
+def test_rebuild_repairs_drift_without_touching_updated_at():
+    app, context = make_app()
+    try:
+        user = User(email='drift@example.com')
+        db.session.add(user)
+        project = add_project(user, 1)
+        db.session.commit()
+        stamp = project.updated_at
+        db.session.execute(db.update(User).values(total_plans=0))
+        db.session.execute(db.update(Project).values(total_campaigns=99, updated_at=stamp))
+        db.session.commit()
+
+        rebuild_counters()
+        db.session.expire_all()
+        assert (project.total_campaigns, project.total_plans, user.total_plans) == (2, 6, 6)
+        assert project.updated_at == stamp
+    finally:
+        context.pop()
+
+
+def test_dashboard_reads_stored_totals():
+    app, context = make_app()
+    try:
+        user = User(email='dash@example.com')
+        db.session.add(user)
+        for number in range(1, 8):
+            add_project(user, number)
+        db.session.commit()
+        client = app.test_client()
+        login(client, user)
+        db.session.remove()
+
+        # The Flask-Login user lookup plus the recent projects query
+        with query_budget(2):
+            response = client.get('/')
+        assert response.status_code == 200
+        assert b'>7</h2>' in response.data and b'>14</h2>' in response.data and b'>42</h2>' in response.data
+    finally:
+        context.pop()
+
+
+if __name__ == '__main__':
+    test_orm_writes_keep_totals_current()
+    test_bulk_plan_routes_adjust_totals()
+    test_rebuild_repairs_drift_without_touching_updated_at()
+    test_dashboard_reads_stored_totals()
+    print('All counter tests passed')
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""ekranu push: only changes go out, in chunks, a failed run resumes and removals wait for an acknowledgement"""
+
+import os
+from datetime import date
+
+import requests
+
+from app import db, http_client
+from app.jobs import enqueue, claim_next, run_job
+from app.models import User, Project, Campaign, EkranuPush, Job
+from app.services import EkranuSyncService
+from app.testing import create_test_app
+
+
+class FakeEkranu:
+    """Stands in for ekranu's pooled session: records every import body, fails call `fail_at` if set"""
+
+    def __init__(self, acknowledges_removals=True):
+        self.bodies = []
+        self.fail_at = None
+        self.acknowledges_removals = acknowledges_removals
+
+    def request(self, method, url, json=None, **kwargs):
+        self.bodies.append(json)
+        response = requests.Response()
+        if len(self.bodies) == self.fail_at:
+            response.status_code, response._content = 500, b'{"error": "database is locked"}'
+            return response
+        result = {'imported_count': len(json['kampanijos'])}
+        if self.acknowledges_removals:
+            result['removed_count'] = len(json.get('removed_external_ids', []))
+        response.status_code = 200
+        response._content = requests.models.complexjson.dumps(result).encode()
+        return response
+
+    def sent(self):
+        """(ids sent, ids removed) of each call, as campaign numbers"""
+        number = lambda external_id: int(external_id.rsplit('_', 1)[-1])
+        return [([number(k['external_id']) for k in body['kampanijos']],
+                 [number(e) for e in body.get('removed_external_ids', [])]) for body in self.bodies]
+
+
+API_KEY = 'ekranu-test-key'
+
+
+def make_app(upstream):
+    app = create_test_app(API_KEY=API_KEY, EKRANU_SYNC_CHUNK_SIZE=2, CIRCUIT_FAILURE_THRESHOLD=100)
+    context = app.app_context()
+    context.push()
+    http_client._sessions[(os.getpid(), 'ekranu', None)] = upstream
+    user = User(email='pusher@example.com')
+    project = Project(code='PLN-26-001', name='Launch', client_brand_id=1, client_brand_name='Rimi',
+                      start_date=date(2026, 1, 1), end_date=date(2026, 12, 31), created_by=user)
+    db.session.add_all([user, project] + [
+        Campaign(code=f'PLN-26-001-{chr(64 + n)}', name=f'Campaign {n}', project=project,
+                 start_date=date(2026, 1, 1), end_date=date(2026, 2, 1))
+        for n in range(1, 6)
+    ])
+    db.session.commit()
+    return app, context
+
+
+def tear_down(context):
+    http_client._sessions.pop((os.getpid(), 'ekranu', None), None)
+    context.pop()
+
+
+def pushed_ids():
+    return sorted(push.campaign_id for push in EkranuPush.query)
+
+
+def test_push_sends_changes_in_chunks_and_resumes():
+    upstream = FakeEkranu()
+    app, context = make_app(upstream)
+    try:
+        upstream.fail_at = 2
+        summary = EkranuSyncService.push_campaigns()
+        assert not summary['success'] and 'HTTP 500' in summary['error']
+        assert [chunk.get('error') is None for chunk in summary['chunks']] == [True, False]
+        # The accepted chunk is recorded, so the retry starts after it
+        assert pushed_ids() == [1, 2]
+
+        upstream.fail_at = None
+        summary = EkranuSyncService.push_campaigns()
+        assert summary['success'] and (summary['sent'], summary['unchanged'], summary['imported']) == (3, 2, 3)
+        assert upstream.sent() == [([1, 2], []), ([3, 4], []), ([3, 4], []), ([5], [])]
+        assert pushed_ids() == [1, 2, 3, 4, 5]
+
+        # Nothing changed, nothing sent
+        summary = EkranuSyncService.push_campaigns()
+        assert (summary['sent'], summary['unchanged'], summary['chunks']) == (0, 5, [])
+
+        # A rename resends that campaign, a brand change all of them; `full` resends regardless
+        db.session.get(Campaign, 2).name = 'Radio'
+        db.session.commit()
+        EkranuSyncService.push_campaigns()
+        assert upstream.sent()[-1] == ([2], [])
+        assert upstream.bodies[-1]['kampanijos'][0]['name'] == 'Rimi - Radio'
+        db.session.get(Project, 1).client_brand_name = 'Maxima'
+        db.session.commit()
+        assert EkranuSyncService.push_campaigns()['sent'] == 5
+        assert EkranuSyncService.push_campaigns(full=True)['sent'] == 5
+    finally:
+        tear_down(context)
+
+
+def test_removals_are_kept_until_acknowledged():
+    upstream = FakeEkranu(acknowledges_removals=False)
+    app, context = make_app(upstream)
+    try:
+        EkranuSyncService.push_campaigns()
+        db.session.get(Campaign, 1).status = 'completed'
+        db.session.delete(db.session.get(Campaign, 4))
+        db.session.commit()
+
+        summary = EkranuSyncService.push_campaigns()
+        assert summary['success'] and (summary['removed'], summary['removal_unacknowledged']) == (0, 2)
+        assert upstream.sent()[-1] == ([], [1, 4])
+        assert pushed_ids() == [1, 2, 3, 4, 5]
+
+        # Sent again until ekranu confirms it removed them
+        upstream.acknowledges_removals = True
+        summary = EkranuSyncService.push_campaigns()
+        assert (summary['removed'], summary['removal_unacknowledged']) == (2, 0)
+        assert upstream.sent()[-1] == ([], [1, 4])
+        assert pushed_ids() == [2, 3, 5]
+        assert EkranuSyncService.push_campaigns()['chunks'] == []
+    finally:
+        tear_down(context)
+
+
+def test_push_job_reports_each_chunk_while_running():
+    upstream = FakeEkranu()
+    app, context = make_app(upstream)
+    try:
+        client = app.test_client()
+        polled = []
+        post = upstream.request
+
+        def request(method, url, **kwargs):
+            # What a client polling the job sees just before each chunk goes out
+            polled.append(client.get(f'/api/jobs/{job_id}', headers={'X-API-Key': API_KEY}).get_json()['result'])
+            return post(method, url, **kwargs)
+
+        upstream.request = request
+        upstream.fail_at = 3
+        job_id = enqueue('ekranu_push').id
+        run_job(claim_next('test-worker'))
+        assert [result and [chunk['chunk'] for chunk in result['chunks']] for result in polled] == [None, [1], [1, 2]]
+
+        # A failed run keeps the chunks it got through next to the error
+        job = db.session.get(Job, job_id, populate_existing=True)
+        assert job.status == 'pending' and 'HTTP 500' in job.last_error
+        assert [chunk.get('error') is None for chunk in job.result['chunks']] == [True, True, False]
+    finally:
+        tear_down(context)
+
+
+if __name__ == '__main__':
+    test_push_sends_changes_in_chunks_and_resumes()
+    test_removals_are_kept_until_acknowledged()
+    test_push_job_reports_each_chunk_while_running()
+    print('All ekranu push tests passed')
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""The per-upstream circuit breaker: refuses calls to a failing upstream and lets callers fall back at once"""
+
+import os
+import socket
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import pytest
+import requests
+
+from app import db, http_client
+from app.http_client import CircuitBreaker, CircuitOpenError
+from app.models import User, UpstreamCircuit
+from app.services import AgencyCRMService
+from app.testing import capture_queries, create_test_app
+
+API_KEY = 'circuit-test-key'
+HEADERS = {'X-API-Key': API_KEY}
+
+
+class Clock:
+    def __init__(self):
+        self.now = datetime(2026, 1, 1)
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += timedelta(seconds=seconds)
+
+
+class FakeSession:
+    """Stands in for an upstream's pooled session: fails or answers with `status`"""
+
+    def __init__(self):
+        self.calls = 0
+        self.status = None
+
+    def request(self, method, url, **kwargs):
+        self.calls += 1
+        if isinstance(self.status, Exception):
+            raise self.status
+        if self.status is None:
+            raise requests.exceptions.ConnectTimeout('timed out')
+        response = requests.Response()
+        response.status_code = self.status
+        response._content = b'{"user": {"id": 7, "email": "remote@example.com"}}'
+        return response
+
+
+def make_app():
+    """App whose agency-crm calls go to a FakeSession"""
+    app = create_test_app(API_KEY=API_KEY, CIRCUIT_FAILURE_THRESHOLD=2, CIRCUIT_RESET_TIMEOUT=30)
+    session = FakeSession()
+    for retries in (None, 0):
+        http_client._sessions[(os.getpid(), 'agency_crm', retries)] = session
+    return app, session
+
+
+def tear_down():
+    for retries in (None, 0):
+        http_client._sessions.pop((os.getpid(), 'agency_crm', retries), None)
+
+
+def test_breaker_states_are_shared_between_workers():
+    app = create_test_app()
+    with app.app_context():
+        clock = Clock()
+        # Two breakers for one upstream stand for two gunicorn workers
+        first, second = (CircuitBreaker('upstream', failure_threshold=3, reset_timeout=10, clock=clock)
+                         for _ in range(2))
+        assert first.before_call() is False
+        assert not first.record_failure('boom') and not second.record_failure('boom')
+        assert second.before_call() is True and second.record_success() is False
+        assert db.session.get(UpstreamCircuit, 'upstream').failures == 0
+
+        first.record_failure('boom')
+        second.record_failure('boom')
+        assert first.record_failure('boom')
+        with pytest.raises(CircuitOpenError):
+            second.before_call()
+        clock.advance(9.9)
+        with pytest.raises(requests.exceptions.RequestException):
+            first.before_call()
+
+        # After the cool-down exactly one trial goes out; its failure reopens at once
+        clock.advance(0.1)
+        assert second.before_call() is True
+        with pytest.raises(CircuitOpenError):
+            first.before_call()
+        assert second.record_failure('still down')
+        [state] = http_client.circuit_states()
+        assert state['state'] == 'open' and state['last_error'] == 'still down'
+
+        clock.advance(10)
+        assert first.before_call() is True
+        assert first.record_success() and second.before_call() is False
+        db.session.expire_all()
+        row = db.session.get(UpstreamCircuit, 'upstream')
+        assert (row.state, row.opened_total, row.rejected_total, row.failures) == ('closed', 2, 3, 0)
+
+
+def test_state_is_cached_per_process_and_written_on_change():
+    app = create_test_app()
+    with app.app_context():
+        clock = Clock()
+        caches = ({}, {})
+        first, second = (CircuitBreaker('upstream', failure_threshold=2, reset_timeout=10, clock=clock,
+                                        cache=cache, cache_ttl=60) for cache in caches)
+        assert first.before_call() is False and second.before_call() is False
+        # A healthy upstream costs no query per call
+        with capture_queries() as log:
+            for _ in range(5):
+                assert first.before_call() is False and second.before_call() is False
+        assert log.count == 0
+
+        first.record_failure('boom')
+        assert first.record_failure('boom')
+        # The other worker sees the open circuit once its cached copy expires
+        assert second.before_call() is False
+        caches[1]['upstream']['expires'] = 0
+        with pytest.raises(CircuitOpenError):
+            second.before_call()
+        with capture_queries() as log:
+            for _ in range(3):
+                with pytest.raises(CircuitOpenError):
+                    second.before_call()
+        assert log.count == 0
+        row = db.session.get(UpstreamCircuit, 'upstream')
+        assert row.rejected_total == 1 and second.pending_rejected() == 3
+
+        # Unwritten refusals go out with the next write
+        clock.advance(10)
+        assert second.before_call() is True and second.record_success()
+        db.session.expire_all()
+        assert (row.state, row.rejected_total) == ('closed', 4)
+
+
+def test_a_locked_database_does_not_turn_a_call_into_an_error():
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_test_app(f'sqlite:///{os.path.join(tmp, "circuit.db")}', CIRCUIT_LOCK_TIMEOUT=0.2)
+        session = FakeSession()
+        for retries in (None, 0):
+            http_client._sessions[(os.getpid(), 'agency_crm', retries)] = session
+        try:
+            with app.app_context():
+                # The request's own session holds SQLite's write lock while it calls out
+                db.session.add(User(email='writer@example.com'))
+                db.session.flush()
+                started = time.perf_counter()
+                with pytest.raises(requests.exceptions.ConnectTimeout):
+                    http_client.get('agency_crm', 'http://agency-crm/api/brands')
+                assert time.perf_counter() - started < 1.0
+                session.status = 200
+                assert http_client.get('agency_crm', 'http://agency-crm/api/brands').status_code == 200
+                db.session.commit()
+                db.engine.dispose()
+        finally:
+            tear_down()
+
+
+def test_local_errors_release_the_trial_without_counting():
+    app, session = make_app()
+    try:
+        with app.app_context():
+            db.session.add(UpstreamCircuit(upstream='agency_crm', state='open', failures=2, opened_total=1,
+                                           rejected_total=0, opened_at=datetime.utcnow() - timedelta(minutes=1)))
+            db.session.commit()
+            session.status = TypeError('bad keyword argument')
+            with pytest.raises(TypeError):
+                http_client.get('agency_crm', 'http://agency-crm/api/brands')
+            db.session.expire_all()
+            row = db.session.get(UpstreamCircuit, 'agency_crm')
+            assert (row.state, row.failures, row.trial_started_at) == ('half_open', 2, None)
+
+            # The next caller gets the trial, and its success closes the circuit
+            session.status = 200
+            assert http_client.get('agency_crm', 'http://agency-crm/api/brands').status_code == 200
+            db.session.expire_all()
+            assert (row.state, row.failures) == ('closed', 0)
+    finally:
+        tear_down()
+
+
+def test_login_falls_back_without_waiting_on_an_open_circuit():
+    app, session = make_app()
+    try:
+        with app.app_context():
+            user = User(email='local@example.com')
+            user.set_password('secret')
+            db.session.add(user)
+            db.session.commit()
+
+        for attempt in range(4):
+            client = app.test_client()
+            response = client.post('/auth/login', data={'email': 'local@example.com', 'password': 'secret'})
+            assert response.status_code == 302 and '/auth/login' not in response.location, attempt
+        # Two failures opened the circuit; the later logins never called agency-crm
+        assert session.calls == 2
+
+        state = app.test_client().get('/api/upstreams', headers=HEADERS).get_json()['upstreams']
+        assert [(s['upstream'], s['state'], s['rejected_total']) for s in state] == [('agency_crm', 'open', 2)]
+        text = app.test_client().get('/metrics', headers=HEADERS).data.decode()
+        assert 'upstream_circuit_state{upstream="agency_crm"} 2' in text
+        assert 'upstream_circuit_opened_total{upstream="agency_crm"} 1' in text
+    finally:
+        tear_down()
+
+
+def test_login_makes_one_attempt_against_a_blackholed_upstream():
+    # A listener that never accepts, with its backlog already full: new
+    # connections time out like a firewalled host (connect errors are the
+    # ones urllib3 retries for every method, POST included)
+    blackhole = socket.socket()
+    blackhole.bind(('127.0.0.1', 0))
+    blackhole.listen(0)
+    port = blackhole.getsockname()[1]
+    filler = socket.create_connection(('127.0.0.1', port))
+    app = create_test_app(AGENCY_CRM_URL=f'http://127.0.0.1:{port}', AGENCY_CRM_AUTH_TIMEOUT=0.5,
+                          HTTP_RETRIES=2, HTTP_BACKOFF_FACTOR=0.1)
+    try:
+        with app.app_context():
+            user = User(email='local@example.com')
+            user.set_password('secret')
+            db.session.add(user)
+            db.session.commit()
+
+        started = time.perf_counter()
+        response = app.test_client().post('/auth/login', data={'email': 'local@example.com', 'password': 'secret'})
+        elapsed = time.perf_counter() - started
+        assert response.status_code == 302 and '/auth/login' not in response.location
+        # One 0.5s connect timeout plus the local password check (~0.3s), not three timeouts and backoff
+        assert elapsed < 1.3, elapsed
+    finally:
+        filler.close()
+        blackhole.close()
+        tear_down()
+
+
+def test_server_errors_count_and_client_errors_do_not():
+    app, session = make_app()
+    try:
+        with app.app_context():
+            session.status = 401
+            for _ in range(3):
+                assert AgencyCRMService.authenticate_user('someone@example.com', 'wrong') is None
+            assert http_client.circuit_states() == []
+
+            session.status = 503
+            assert AgencyCRMService.get_brands() == [] and AgencyCRMService.get_brands() == []
+            assert http_client.circuit_states()[0]['state'] == 'open'
+            assert AgencyCRMService.get_brands() == []
+        assert session.calls == 5
+    finally:
+        tear_down()
+
+
+if __name__ == '__main__':
+    test_breaker_states_are_shared_between_workers()
+    test_state_is_cached_per_process_and_written_on_change()
+    test_a_locked_database_does_not_turn_a_call_into_an_error()
+    test_local_errors_release_the_trial_without_counting()
+    test_login_falls_back_without_waiting_on_an_open_circuit()
+    test_login_makes_one_attempt_against_a_blackholed_upstream()
+    test_server_errors_count_and_client_errors_do_not()
+    print('All HTTP client tests passed')
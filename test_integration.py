@@ -3,14 +3,15 @@
 Test script to demonstrate agency-crm and projects-crm integration
 """
 
+import os
 import requests
 import json
 import time
 
-# Configuration
-AGENCY_CRM_URL = "http://localhost:5000/api"
-PROJECTS_CRM_URL = "http://localhost:5002/api"
-API_KEY = "dev-api-key"
+# Configuration (point AGENCY_CRM_URL at benchmarks/fake_upstreams.py to run without agency-crm)
+AGENCY_CRM_URL = os.environ.get('AGENCY_CRM_URL', 'http://localhost:5000').rstrip('/') + '/api'
+PROJECTS_CRM_URL = os.environ.get('PROJECTS_CRM_URL', 'http://localhost:5002').rstrip('/') + '/api'
+API_KEY = os.environ.get('AGENCY_CRM_API_KEY', 'dev-api-key')
 WEBHOOK_SECRET = "shared-secret-key"
 
 def test_api_endpoints():
@@ -35,8 +36,8 @@ def test_api_endpoints():
     except requests.exceptions.ConnectionError as e:
         print(f"❌ Connection error: {e}")
         print("Make sure both applications are running:")
-        print("  Agency CRM: http://localhost:5000")
-        print("  Projects CRM: http://localhost:5002")
+        print(f"  Agency CRM: {AGENCY_CRM_URL}")
+        print(f"  Projects CRM: {PROJECTS_CRM_URL}")
         return False
     except Exception as e:
         print(f"❌ Error: {e}")
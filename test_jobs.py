@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""Outbox jobs: claimed once, retried with backoff, released when a worker dies, never silently done"""
+
+import os
+from datetime import datetime, timedelta
+
+import requests
+
+from app import db, http_client
+from app.jobs import enqueue, claim_next, job_handler, release_stale, run_job, work
+from app.models import User, Job, Brand, SyncState
+from app.services import BrandService
+from app.testing import create_test_app
+
+
+class FakeAgencyCRM:
+    """Stands in for agency-crm's pooled session: serves `brands`, and user pages failing from `fail_from_page` on"""
+
+    def __init__(self, pages, fail_from_page=None, brands=()):
+        self.pages = pages
+        self.fail_from_page = fail_from_page
+        self.brands = list(brands)
+        self.requested = []
+
+    def request(self, method, url, params=None, **kwargs):
+        if url.endswith('/brands'):
+            self.requested.append('brands')
+            return self.respond({'brands': self.brands})
+        page = params['page']
+        self.requested.append(page)
+        if self.fail_from_page is not None and page >= self.fail_from_page:
+            raise requests.exceptions.ConnectionError('agency-crm went away')
+        return self.respond({'users': self.pages[page - 1], 'has_next': page < len(self.pages)})
+
+    @staticmethod
+    def respond(body):
+        response = requests.Response()
+        response.status_code = 200
+        response._content = requests.models.complexjson.dumps(body).encode()
+        return response
+
+
+def make_app(upstream, **settings):
+    app = create_test_app(**{'JOB_MAX_ATTEMPTS': 2, 'JOB_BACKOFF_BASE': 60, 'CIRCUIT_FAILURE_THRESHOLD': 100,
+                             **settings})
+    context = app.app_context()
+    context.push()
+    if upstream is not None:
+        for retries in (None, 0):
+            http_client._sessions[(os.getpid(), 'agency_crm', retries)] = upstream
+    return app, context
+
+
+def tear_down(context):
+    for retries in (None, 0):
+        http_client._sessions.pop((os.getpid(), 'agency_crm', retries), None)
+    context.pop()
+
+
+def user_page(first, count):
+    return [{'id': n, 'email': f'remote{n}@example.com', 'first_name': f'User{n}'}
+            for n in range(first, first + count)]
+
+
+def run_due_job():
+    job = claim_next('test-worker')
+    assert job is not None
+    return run_job(job)
+
+
+class Flaky:
+    """Handler for `flaky` jobs: raises until `failures` is used up, then returns the payload"""
+    failures = 0
+    calls = 0
+
+    @staticmethod
+    def reset(failures):
+        Flaky.failures, Flaky.calls = failures, 0
+
+
+@job_handler('flaky')
+def _flaky_job(payload):
+    Flaky.calls += 1
+    if Flaky.calls <= Flaky.failures:
+        raise RuntimeError(f'failure {Flaky.calls}')
+    return {'echo': payload}
+
+
+def make_due(job):
+    job.run_at = datetime.utcnow()
+    db.session.commit()
+
+
+def test_failures_back_off_exponentially_up_to_the_cap():
+    app, context = make_app(None, JOB_MAX_ATTEMPTS=5, JOB_BACKOFF_MAX=150)
+    try:
+        Flaky.reset(failures=3)
+        job = enqueue('flaky', {'n': 1})
+        delays = []
+        for attempt in range(1, 4):
+            before = datetime.utcnow()
+            job = run_due_job()
+            assert (job.status, job.attempts, job.last_error) == ('pending', attempt, f'failure {attempt}')
+            assert job.locked_by is None and claim_next('test-worker') is None
+            delays.append(round((job.run_at - before).total_seconds()))
+            make_due(job)
+        assert delays == [60, 120, 150]
+
+        job = run_due_job()
+        assert (job.status, job.attempts, job.result, job.last_error) == ('done', 4, {'echo': {'n': 1}}, None)
+        assert job.finished_at is not None
+
+        Flaky.reset(failures=10)
+        job = enqueue('flaky', max_attempts=1)
+        assert run_due_job().status == 'failed' and Flaky.calls == 1
+        # A kind with no handler (yet) is retried like any other failure
+        enqueue('no_such_kind')
+        job = run_due_job()
+        assert job.status == 'pending' and 'No handler' in job.last_error
+    finally:
+        tear_down(context)
+
+
+def test_claims_dedupe_and_stale_locks():
+    app, context = make_app(None, JOB_LOCK_TIMEOUT=900)
+    try:
+        first = enqueue('flaky', dedupe=True)
+        assert enqueue('flaky', dedupe=True).id == first.id
+        later = enqueue('flaky', {'n': 2})
+        later.run_at = datetime.utcnow() + timedelta(minutes=5)
+        db.session.commit()
+
+        # Due jobs only, and each one to a single worker
+        claimed = claim_next('worker-a')
+        assert claimed.id == first.id and (claimed.status, claimed.locked_by) == ('running', 'worker-a')
+        assert claim_next('worker-b') is None
+        assert enqueue('flaky', dedupe=True).id == first.id
+
+        # A worker died holding the job: it is handed out again after JOB_LOCK_TIMEOUT
+        assert release_stale() == 0
+        claimed.locked_at = datetime.utcnow() - timedelta(seconds=901)
+        db.session.commit()
+        assert release_stale() == 1
+        db.session.expire_all()
+        assert (claimed.status, claimed.locked_by) == ('pending', None)
+
+        Flaky.reset(failures=0)
+        assert work('worker-b', once=True) == 1
+        db.session.expire_all()
+        assert (claimed.status, claimed.attempts, claimed.locked_by) == ('done', 2, None)
+        assert later.status == 'pending' and Flaky.calls == 1
+    finally:
+        tear_down(context)
+
+
+def test_user_sync_job_retries_when_a_page_fails():
+    upstream = FakeAgencyCRM([user_page(1, 2), user_page(3, 2)], fail_from_page=2)
+    app, context = make_app(upstream, AGENCY_CRM_USERS_PAGE_SIZE=2)
+    try:
+        job = enqueue('sync_users')
+        job = run_due_job()
+        assert job.status == 'pending' and job.attempts == 1
+        assert 'agency-crm went away' in job.last_error
+        assert job.run_at > datetime.utcnow() + timedelta(seconds=50)
+        # The page fetched before the failure stays synced
+        assert User.query.count() == 2
+
+        make_due(job)
+        job = run_due_job()
+        assert job.status == 'failed' and job.finished_at is not None
+        assert upstream.requested == [1, 2, 1, 2]
+
+        upstream.fail_from_page = None
+        retry = enqueue('sync_users')
+        retry = run_due_job()
+        assert retry.status == 'done' and retry.result['created'] == 2 and retry.result['unchanged'] == 2
+        assert User.query.count() == 4
+    finally:
+        tear_down(context)
+
+
+def test_brand_refresh_runs_inline_when_no_worker_takes_the_job():
+    upstream = FakeAgencyCRM([], brands=[{'id': 1, 'name': 'Rimi'}])
+    app, context = make_app(upstream, BRAND_CACHE_TTL=900, BRAND_REFRESH_MAX_WAIT=300)
+    try:
+        # First use fills the empty mirror inline
+        assert [b.name for b in BrandService.get_brands()] == ['Rimi']
+        state = db.session.get(SyncState, 'brands')
+
+        # Stale: a job is queued and the mirror is served as is
+        upstream.brands.append({'id': 2, 'name': 'Maxima'})
+        state.last_success_at = state.last_attempt_at = datetime.utcnow() - timedelta(seconds=1000)
+        db.session.commit()
+        assert [b.name for b in BrandService.get_brands()] == ['Rimi']
+        job = Job.query.filter_by(kind='refresh_brands').one()
+        assert job.status == 'pending' and upstream.requested == ['brands']
+
+        # A job waiting out its backoff is not overdue
+        job.run_at = datetime.utcnow() + timedelta(seconds=600)
+        job.created_at = datetime.utcnow() - timedelta(seconds=600)
+        db.session.commit()
+        BrandService.get_brands()
+        assert upstream.requested == ['brands']
+
+        # Due for longer than BRAND_REFRESH_MAX_WAIT and nobody took it: refresh inline, once
+        job.run_at = datetime.utcnow() - timedelta(seconds=301)
+        db.session.commit()
+        assert sorted(b.name for b in BrandService.get_brands()) == ['Maxima', 'Rimi']
+        BrandService.get_brands()
+        assert upstream.requested == ['brands', 'brands'] and Brand.query.count() == 2
+    finally:
+        tear_down(context)
+
+
+if __name__ == '__main__':
+    test_failures_back_off_exponentially_up_to_the_cap()
+    test_claims_dedupe_and_stale_locks()
+    test_user_sync_job_retries_when_a_page_fails()
+    test_brand_refresh_runs_inline_when_no_worker_takes_the_job()
+    print('All job tests passed')
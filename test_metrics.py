@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""/metrics: request series are labelled with the worker that served them"""
+
+import os
+
+from flask import g
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from app import db
+from app.metrics import registry
+from app.testing import create_test_app
+
+API_KEY = 'metrics-test-key'
+HEADERS = {'X-API-Key': API_KEY}
+
+
+def test_request_series_carry_the_worker_pid():
+    app = create_test_app(API_KEY=API_KEY)
+    registry.reset()
+    client = app.test_client()
+    client.get('/api/projects', headers=HEADERS)
+    client.get('/api/projects')
+
+    text = client.get('/metrics', headers=HEADERS).data.decode()
+    worker = f'worker="{os.getpid()}"'
+    assert f'http_requests_total{{{worker},method="GET",endpoint="api.get_projects",status="200"}} 1' in text
+    assert f'http_requests_total{{{worker},method="GET",endpoint="api.get_projects",status="401"}} 1' in text
+    series = [line for line in text.splitlines() if line.startswith('http_')]
+    assert series and all(worker in line for line in series)
+
+
+def test_failed_statements_are_counted_and_leave_nothing_behind():
+    app = create_test_app(API_KEY=API_KEY)
+    with app.test_request_context():
+        for _ in range(3):
+            try:
+                db.session.execute(text('SELECT * FROM no_such_table'))
+            except OperationalError:
+                db.session.rollback()
+        db.session.execute(text('SELECT 1'))
+        assert g.metrics_query_count == 4
+        assert db.session.connection().info['metrics_query_started'] == {}
+
+
+if __name__ == '__main__':
+    test_request_series_carry_the_worker_pid()
+    test_failed_statements_are_counted_and_leave_nothing_behind()
+    print('All metrics tests passed')
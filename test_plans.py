@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""Plan batch and reconcile: default names per campaign, and exactly the create/update/delete diff"""
+
+from datetime import date
+
+from app import db
+from app.models import User, Project, Campaign, Plan, Tombstone
+from app.testing import create_test_app
+
+API_KEY = 'plans-test-key'
+HEADERS = {'X-API-Key': API_KEY}
+
+
+def make_app():
+    app = create_test_app(API_KEY=API_KEY)
+    context = app.app_context()
+    context.push()
+    user = User(email='planner@example.com')
+    project = Project(code='PLN-26-001', name='Launch', client_brand_id=1, start_date=date(2026, 1, 1),
+                      end_date=date(2026, 12, 31), created_by=user)
+    campaign = Campaign(code='PLN-26-001-A', name='Radio', project=project,
+                        start_date=date(2026, 1, 1), end_date=date(2026, 2, 1))
+    db.session.add_all([user, project, campaign] + [
+        Plan(name=f'Plan{n}', campaign=campaign, description=f'Plan number {n}', budget=100.0 * n, status='draft')
+        for n in (1, 2, 3)
+    ])
+    db.session.commit()
+    return app, context, campaign.id
+
+
+def plans(campaign_id):
+    db.session.expire_all()
+    return [(plan.id, plan.name, plan.budget, plan.status)
+            for plan in Plan.query.filter_by(campaign_id=campaign_id).order_by(Plan.id)]
+
+
+def test_batch_names_plans_per_campaign():
+    app, context, first = make_app()
+    try:
+        second = Campaign(code='PLN-26-001-B', name='TV', project_id=1,
+                          start_date=date(2026, 1, 1), end_date=date(2026, 2, 1))
+        db.session.add_all([second, Plan(name='Plan7', campaign=second)])
+        db.session.commit()
+        second = second.id
+        client = app.test_client()
+        # The first campaign's counter is set by this call, the second one's seeded from Plan7
+        assert client.post(f'/api/campaigns/{first}/plans', headers=HEADERS, json={'budget': 1}).status_code == 201
+
+        response = client.post('/api/plans/batch', headers=HEADERS, json={'plans': [
+            {'campaign_id': second}, {'campaign_id': first}, {'campaign_id': second, 'name': 'Spot'},
+            {'campaign_id': first}, {'campaign_id': second},
+        ]})
+        assert response.status_code == 201
+        assert [(p['campaign_id'], p['name']) for p in response.get_json()['plans']] == [
+            (second, 'Plan8'), (first, 'Plan5'), (second, 'Spot'), (first, 'Plan6'), (second, 'Plan10')]
+        db.session.expire_all()
+        assert [c.last_plan_number for c in Campaign.query.order_by(Campaign.id)] == [6, 10]
+    finally:
+        context.pop()
+
+
+def test_reconcile_applies_the_diff():
+    app, context, campaign_id = make_app()
+    try:
+        client = app.test_client()
+        response = client.put(f'/api/campaigns/{campaign_id}/plans', headers=HEADERS, json={'plans': [
+            {'id': 1, 'name': 'Renamed', 'budget': 150},
+            {'name': 'Plan2'},
+            {'name': 'Podcast', 'status': 'approved'},
+            {'budget': 50.5},
+        ]})
+        assert response.status_code == 200, response.get_json()
+        body = response.get_json()
+        assert body['updated'] == [{'id': 1, 'name': 'Renamed', 'changed': ['budget', 'name']}]
+        assert body['unchanged'] == 1
+        # Every new plan reserves a number, named or not
+        assert body['created'] == [{'id': 4, 'name': 'Podcast'}, {'id': 5, 'name': 'Plan5'}]
+        assert body['deleted'] == [{'id': 3, 'name': 'Plan3'}]
+        assert plans(campaign_id) == [(1, 'Renamed', 150.0, 'draft'), (2, 'Plan2', 200.0, 'draft'),
+                                      (4, 'Podcast', 0.0, 'approved'), (5, 'Plan5', 50.5, 'draft')]
+        # Omitted fields are left alone
+        assert db.session.get(Plan, 1).description == 'Plan number 1'
+        [tombstone] = Tombstone.query.all()
+        assert (tombstone.entity_type, tombstone.entity_id, tombstone.parent_id) == ('plan', 3, campaign_id)
+
+        # The same set again changes nothing
+        response = client.put(f'/api/campaigns/{campaign_id}/plans', headers=HEADERS, json=[
+            {'id': 1}, {'id': 2}, {'name': 'Podcast'}, {'name': 'Plan5'}
+        ])
+        body = response.get_json()
+        assert (body['created'], body['updated'], body['deleted'], body['unchanged']) == ([], [], [], 4)
+
+        # An empty set deletes everything
+        response = client.put(f'/api/campaigns/{campaign_id}/plans', headers=HEADERS, json={'plans': []})
+        assert [plan['id'] for plan in response.get_json()['deleted']] == [1, 2, 4, 5]
+        assert plans(campaign_id) == [] and Tombstone.query.count() == 5
+    finally:
+        context.pop()
+
+
+def test_reconcile_rejects_bad_entries_before_writing():
+    app, context, campaign_id = make_app()
+    try:
+        client = app.test_client()
+        before = plans(campaign_id)
+        for entry, field in [
+            ({'id': 1, 'name': None}, 'name'),
+            ({'id': 1, 'name': '  '}, 'name'),
+            ({'name': 'Fresh', 'budget': 'a lot'}, 'budget'),
+            ({'name': 'Fresh', 'budget': True}, 'budget'),
+            ({'id': 2, 'status': 7}, 'status'),
+            ({'id': 99}, 'id'),
+        ]:
+            response = client.put(f'/api/campaigns/{campaign_id}/plans', headers=HEADERS,
+                                  json={'plans': [{'id': 3}, entry]})
+            assert response.status_code == 400, (entry, response.get_json())
+            assert [(d['index'], d['field']) for d in response.get_json()['details']] == [(1, field)], entry
+        assert plans(campaign_id) == before and Tombstone.query.count() == 0
+
+        assert client.put(f'/api/campaigns/{campaign_id}/plans', headers=HEADERS,
+                          json={'plans': [{'name': 'A'}, {'name': 'A'}]}).status_code == 400
+        assert client.put(f'/api/campaigns/{campaign_id}/plans', headers=HEADERS, json={}).status_code == 400
+        assert client.put('/api/campaigns/99/plans', headers=HEADERS, json=[]).status_code == 404
+        assert plans(campaign_id) == before
+        # Status is free text, as it always was for TV-Planner
+        assert client.post(f'/api/campaigns/{campaign_id}/plans', headers=HEADERS,
+                           json={'status': 'active'}).status_code == 201
+    finally:
+        context.pop()
+
+
+def test_patch_follows_the_same_rules():
+    app, context, campaign_id = make_app()
+    try:
+        client = app.test_client()
+        before = plans(campaign_id)
+        for body, field in [({'name': None}, 'name'), ({'name': ''}, 'name'), ({'budget': 'abc'}, 'budget'),
+                            ({'status': ['final']}, 'status'), ({'description': 3}, 'description')]:
+            response = client.patch('/api/plans/1', headers=HEADERS, json=body)
+            assert response.status_code == 400, (body, response.get_json())
+            assert [d['field'] for d in response.get_json()['details']] == [field], body
+        assert plans(campaign_id) == before
+
+        response = client.patch('/api/plans/1', headers=HEADERS, json={'budget': 42, 'status': 'active'})
+        assert response.status_code == 200
+        assert plans(campaign_id)[0] == (1, 'Plan1', 42.0, 'active')
+    finally:
+        context.pop()
+
+
+if __name__ == '__main__':
+    test_batch_names_plans_per_campaign()
+    test_reconcile_applies_the_diff()
+    test_reconcile_rejects_bad_entries_before_writing()
+    test_patch_follows_the_same_rules()
+    print('All plan tests passed')
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""Query-plan regression suite: hot-path routes must not full-scan a table.
+
+Every statement a route sends is captured and run through SQLite's
+EXPLAIN QUERY PLAN against a seeded database. A plan step of the form
+"SCAN <table>" (no index) fails the test.
+"""
+
+from datetime import date, datetime, timedelta
+
+from app import db
+from app.models import User, Project, Campaign, Plan, Tombstone
+from app.testing import create_test_app, login, capture_queries, full_scans
+
+API_KEY = 'query-plan-key'
+SINCE = (datetime.utcnow() - timedelta(days=1)).isoformat()
+
+API_ROUTES = [
+    ('GET', '/api/projects'),
+    ('GET', f'/api/projects?updated_since={SINCE}'),
+    ('GET', '/api/projects?limit=5&cursor=2'),
+    ('GET', '/api/campaigns'),
+    ('GET', f'/api/campaigns?updated_since={SINCE}'),
+    ('GET', '/api/campaigns?fields=id,code,plan_count,project_name'),
+    ('GET', '/api/campaigns/1'),
+    ('GET', '/api/campaigns/1/plans'),
+    ('GET', '/api/campaigns/for-ekranu'),
+    ('GET', '/api/plans/1'),
+    ('GET', f'/api/deletions?since={SINCE}&entity_type=plan'),
+    ('GET', '/api/stats?project_id=1&group_by=campaign'),
+    ('GET', '/api/search?q=Campaign%201&type=campaign,plan'),
+    ('DELETE', '/api/campaigns/2/plans/by-name/Plan1'),
+]
+
+WEB_ROUTES = [
+    ('GET', '/'),
+    ('GET', '/projects/'),
+    ('GET', '/projects/?sort=start_date&status=active'),
+    ('GET', '/projects/?sort=-end_date&brand=1&from=2026-01-01&to=2026-06-30'),
+    ('GET', '/projects/?sort=code&code=PLN-00-01'),
+    ('GET', '/projects/1'),
+    ('GET', '/campaigns/1'),
+    ('GET', '/search?q=PLN-00-01'),
+]
+
+
+def seed():
+    users = [User(email=f'user{i}@example.com', agency_crm_id=i) for i in range(1, 4)]
+    db.session.add_all(users)
+    for i in range(30):
+        project = Project(
+            code=f'PLN-00-{i + 1:03d}', name=f'Project {i}', client_brand_id=i % 5,
+            start_date=date(2026, 1, 1), end_date=date(2026, 12, 31),
+            created_by=users[i % len(users)], status='active' if i % 4 else 'completed'
+        )
+        db.session.add(project)
+        for j in range(4):
+            campaign = Campaign(
+                code=f'{project.code}-{chr(65 + j)}', name=f'Campaign {j}', project=project,
+                start_date=date(2026, 1, 1), end_date=date(2026, 2, 1),
+                status='active' if j % 3 else 'completed'
+            )
+            db.session.add(campaign)
+            for k in range(3):
+                db.session.add(Plan(name=f'Plan{k + 1}', campaign=campaign, budget=100.0 * k))
+    db.session.add(Tombstone(entity_type='plan', entity_id=9999, parent_id=1, name='Gone'))
+    db.session.commit()
+    return users[0]
+
+
+def scans_for(client, method, url, headers=None):
+    with capture_queries() as queries:
+        response = client.open(url, method=method, headers=headers or {})
+    assert response.status_code < 400, f'{method} {url} -> {response.status_code}: {response.data[:200]}'
+    offending = []
+    for query in queries:
+        tables = full_scans(query)
+        if tables:
+            offending.append((tables, query.statement))
+    return offending
+
+
+def check(routes, client, headers=None):
+    failures = []
+    for method, url in routes:
+        for tables, statement in scans_for(client, method, url, headers):
+            failures.append(f'{method} {url} full-scans {", ".join(tables)}:\n    {statement}')
+    assert not failures, '\n'.join(failures)
+
+
+def make_client():
+    app = create_test_app(API_KEY=API_KEY)
+    context = app.app_context()
+    context.push()
+    user = seed()
+    client = app.test_client()
+    return app, context, client, user
+
+
+def test_api_routes_use_indexes():
+    app, context, client, user = make_client()
+    try:
+        check(API_ROUTES, client, {'X-API-Key': API_KEY})
+    finally:
+        context.pop()
+
+
+def test_web_routes_use_indexes():
+    app, context, client, user = make_client()
+    try:
+        login(client, user)
+        check(WEB_ROUTES, client)
+    finally:
+        context.pop()
+
+
+if __name__ == '__main__':
+    test_api_routes_use_indexes()
+    test_web_routes_use_indexes()
+    print('✓ No hot-path query full-scans a table')
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""Full-text search: the FTS5 index follows every write and ranks across projects, campaigns and plans"""
+
+from datetime import date
+
+from app import db
+from app.models import User, Project, Campaign, Plan
+from app.search import match_expression, rebuild_search_index, search
+from app.testing import create_test_app, login, query_budget
+
+API_KEY = 'search-test-key'
+HEADERS = {'X-API-Key': API_KEY}
+
+
+def make_app():
+    app = create_test_app(API_KEY=API_KEY)
+    context = app.app_context()
+    context.push()
+    user = User(email='finder@example.com')
+    project = Project(code='PLN-26-001', name='Spring Launch', client_brand_id=1, client_brand_name='Švyturys',
+                      comments='Outdoor billboards in Klaipėda', overall_info='Youth audience',
+                      start_date=date(2026, 3, 1), end_date=date(2026, 6, 1), created_by=user)
+    campaign = Campaign(code='PLN-26-001-A', name='Radio burst', project=project, overall_info='Morning drive slots',
+                        start_date=date(2026, 3, 1), end_date=date(2026, 4, 1))
+    db.session.add_all([
+        project, campaign,
+        Plan(name='Plan1', campaign=campaign, description='Podcast sponsorship'),
+        Project(code='PLN-26-002', name='Winter Sale', client_brand_id=2, client_brand_name='Rimi',
+                start_date=date(2026, 11, 1), end_date=date(2026, 12, 31), created_by=user),
+    ])
+    db.session.commit()
+    return app, context, user
+
+
+def found(query, kinds=None):
+    return [(hit['kind'], hit['id']) for hit in search(query, kinds)]
+
+
+def test_index_follows_orm_writes():
+    app, context, _ = make_app()
+    try:
+        assert found('klaipeda') == [('project', 1)]
+        assert found('podcast') == [('plan', 1)]
+        assert found('PLN-26-001-A') == [('campaign', 1)]
+        # Campaigns and plans carry their project's brand
+        assert sorted(found('svyt')) == [('campaign', 1), ('plan', 1), ('project', 1)]
+        assert found('svyt', ['plan']) == [('plan', 1)]
+
+        project = db.session.get(Project, 1)
+        project.name, project.client_brand_name = 'Summer Launch', 'Utenos'
+        db.session.commit()
+        assert found('spring') == [] and found('summer') == [('project', 1)]
+        assert sorted(found('utenos')) == [('campaign', 1), ('plan', 1), ('project', 1)]
+
+        db.session.get(Plan, 1).description = 'Newsletter'
+        db.session.commit()
+        assert found('podcast') == [] and found('newsletter') == [('plan', 1)]
+
+        db.session.delete(project)
+        db.session.commit()
+        assert found('utenos') == [] and found('winter') == [('project', 2)]
+    finally:
+        context.pop()
+
+
+def test_ranking_and_bulk_writes():
+    app, context, _ = make_app()
+    try:
+        client = app.test_client()
+        response = client.post('/api/plans/batch', headers=HEADERS, json={
+            'plans': [{'campaign_id': 1, 'description': 'Radio jingle'}, {'campaign_id': 1}]
+        })
+        assert response.status_code == 201
+        # A name match outranks one in the free text
+        assert found('radio') == [('campaign', 1), ('plan', 2)]
+
+        db.session.execute(db.text('DELETE FROM search_index'))
+        db.session.commit()
+        assert found('radio') == []
+        assert rebuild_search_index() == 2 + 1 + 3
+        assert found('radio') == [('campaign', 1), ('plan', 2)]
+    finally:
+        context.pop()
+
+
+def test_user_input_is_not_fts_syntax():
+    assert match_expression('PLN-26 "spring') == '"PLN 26"* "spring"*'
+    assert match_expression('  -- * ( ') is None
+    app, context, _ = make_app()
+    try:
+        assert found('NOT AND ( OR "') == []
+        assert found('spring NEAR(') == []
+        assert found('spring launch') == [('project', 1)]
+    finally:
+        context.pop()
+
+
+def test_search_api():
+    app, context, _ = make_app()
+    try:
+        client = app.test_client()
+        assert client.get('/api/search?q=radio').status_code == 401
+        assert client.get('/api/search', headers=HEADERS).status_code == 400
+        assert client.get('/api/search?q=radio&type=brand', headers=HEADERS).status_code == 400
+        assert client.get('/api/search?q=radio&limit=0', headers=HEADERS).status_code == 400
+
+        with query_budget(1):
+            response = client.get('/api/search?q=radio%20burst', headers=HEADERS)
+        assert response.status_code == 200
+        [item] = response.get_json()['items']
+        assert (item['type'], item['id'], item['project_id'], item['code']) == ('campaign', 1, 1, 'PLN-26-001-A')
+        assert '<mark>Radio</mark>' in item['snippet']
+
+        items = client.get('/api/search?q=svyturys&type=project,plan', headers=HEADERS).get_json()['items']
+        assert sorted((item['type'], item['id']) for item in items) == [('plan', 1), ('project', 1)]
+        assert [item.get('campaign_id') for item in items if item['type'] == 'plan'] == [1]
+    finally:
+        context.pop()
+
+
+def test_search_page_escapes_user_text():
+    app, context, user = make_app()
+    try:
+        db.session.get(Project, 2).comments = '<script>alert(1)</script> clearance'
+        db.session.commit()
+        client = app.test_client()
+        login(client, user)
+        db.session.remove()
+
+        response = client.get('/search?q=clearance')
+        assert response.status_code == 200
+        html = response.data.decode()
+        assert '<script>alert' not in html and '&lt;script&gt;' in html
+        assert '<mark>clearance</mark>' in html and 'href="/projects/2"' in html
+
+        html = client.get('/search?q=podcast').data.decode()
+        assert 'href="/campaigns/1"' in html
+        assert 'No projects, campaigns or plans match' in client.get('/search?q=nothing').data.decode()
+    finally:
+        context.pop()
+
+
+if __name__ == '__main__':
+    test_index_follows_orm_writes()
+    test_ranking_and_bulk_writes()
+    test_user_input_is_not_fts_syntax()
+    test_search_api()
+    test_search_page_escapes_user_text()
+    print('All search tests passed')
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""Delta sync: ?updated_since= plus /api/deletions replay every change, and unchanged lists answer 304"""
+
+from datetime import date, datetime, timedelta
+
+from app import db
+from app.models import User, Project, Campaign, Plan
+from app.testing import create_test_app, query_budget
+
+API_KEY = 'sync-test-key'
+HEADERS = {'X-API-Key': API_KEY}
+LONG_AGO = datetime(2026, 1, 1)
+
+
+def make_app():
+    app = create_test_app(API_KEY=API_KEY, SYNC_OVERLAP=60)
+    context = app.app_context()
+    context.push()
+    user = User(email='sync@example.com')
+    project = Project(code='PLN-26-001', name='Launch', client_brand_id=1, start_date=date(2026, 1, 1),
+                      end_date=date(2026, 12, 31), created_by=user, updated_at=LONG_AGO)
+    db.session.add_all([user, project])
+    for letter in 'AB':
+        campaign = Campaign(code=f'PLN-26-001-{letter}', name=f'Campaign {letter}', project=project,
+                            start_date=date(2026, 1, 1), end_date=date(2026, 2, 1), updated_at=LONG_AGO)
+        db.session.add(campaign)
+        for n in (1, 2, 3):
+            db.session.add(Plan(name=f'Plan{n}', campaign=campaign, updated_at=LONG_AGO))
+    db.session.commit()
+    return app, context
+
+
+def sync_timestamp(response):
+    return datetime.fromisoformat(response.headers['X-Sync-Timestamp'])
+
+
+def test_updated_since_catches_writes_committed_after_the_read():
+    app, context = make_app()
+    try:
+        client = app.test_client()
+        response = client.get('/api/campaigns/1/plans', headers=HEADERS)
+        read_at = datetime.utcnow()
+        stamp = sync_timestamp(response)
+        assert read_at - timedelta(seconds=61) < stamp <= read_at - timedelta(seconds=60)
+        assert len(response.get_json()) == 3
+
+        # A writer flushed (stamping updated_at) just before that read and committed just after
+        plan = db.session.get(Plan, 2)
+        plan.budget, plan.updated_at = 500.0, read_at - timedelta(seconds=1)
+        db.session.commit()
+        client.patch('/api/plans/3', headers=HEADERS, json={'budget': 250})
+
+        response = client.get(f'/api/campaigns/1/plans?updated_since={stamp.isoformat()}', headers=HEADERS)
+        assert [(p['id'], p['budget']) for p in response.get_json()] == [(2, 500.0), (3, 250.0)]
+        # Rows from before the overlap window are not sent again
+        assert client.get('/api/campaigns/2/plans?updated_since=' + stamp.isoformat(),
+                          headers=HEADERS).get_json() == []
+        assert client.get('/api/campaigns/1/plans?updated_since=yesterday', headers=HEADERS).status_code == 400
+
+        # Campaigns count as changed when their project does
+        db.session.get(Project, 1).name = 'Relaunch'
+        db.session.commit()
+        response = client.get(f'/api/campaigns?updated_since={stamp.isoformat()}Z&fields=id', headers=HEADERS)
+        assert response.get_json() == [{'id': 1}, {'id': 2}]
+    finally:
+        context.pop()
+
+
+def test_deletions_list_orm_and_bulk_deletes():
+    app, context = make_app()
+    try:
+        client = app.test_client()
+        response = client.get('/api/deletions', headers=HEADERS)
+        assert response.get_json() == []
+        stamp = sync_timestamp(response).isoformat()
+
+        # ORM deletes, directly and through the campaign -> plans cascade
+        assert client.delete('/api/plans/1', headers=HEADERS).status_code == 200
+        assert client.delete('/api/campaigns/1/plans/by-name/Plan2', headers=HEADERS).status_code == 200
+        db.session.delete(db.session.get(Campaign, 2))
+        db.session.commit()
+        # A bulk delete by the reconcile endpoint writes its tombstones itself
+        campaign = Campaign(code='PLN-26-001-C', name='Campaign C', project_id=1,
+                            start_date=date(2026, 1, 1), end_date=date(2026, 2, 1))
+        dropped = Plan(name='Plan1', campaign=campaign)
+        db.session.add_all([campaign, dropped, Plan(name='Plan2', campaign=campaign)])
+        db.session.commit()
+        dropped_id, campaign_id = dropped.id, campaign.id
+        response = client.put(f'/api/campaigns/{campaign_id}/plans', headers=HEADERS, json=[{'name': 'Plan2'}])
+        assert response.status_code == 200
+
+        response = client.get(f'/api/deletions?since={stamp}', headers=HEADERS)
+        deleted = sorted((t['entity_type'], t['entity_id'], t['parent_id']) for t in response.get_json())
+        assert deleted == sorted([('campaign', 2, 1), ('plan', 1, 1), ('plan', 2, 1), ('plan', 4, 2),
+                                  ('plan', 5, 2), ('plan', 6, 2), ('plan', dropped_id, campaign_id)])
+        response = client.get(f'/api/deletions?since={stamp}&entity_type=campaign', headers=HEADERS)
+        assert [(t['entity_id'], t['code'], t['name']) for t in response.get_json()] == [
+            (2, 'PLN-26-001-B', 'Campaign B')]
+        later = (datetime.utcnow() + timedelta(minutes=5)).isoformat()
+        assert client.get(f'/api/deletions?since={later}', headers=HEADERS).get_json() == []
+    finally:
+        context.pop()
+
+
+def test_etag_round_trip():
+    app, context = make_app()
+    try:
+        client = app.test_client()
+        response = client.get('/api/projects', headers=HEADERS)
+        etag = response.headers['ETag']
+        assert response.status_code == 200 and response.get_json()[0]['campaign_count'] == 2
+
+        # An unchanged list costs one aggregate query and no body
+        with query_budget(1):
+            response = client.get('/api/projects', headers={**HEADERS, 'If-None-Match': etag})
+        assert response.status_code == 304 and response.data == b''
+        assert response.headers['ETag'] == etag and 'X-Sync-Timestamp' in response.headers
+
+        # Each page, field set and format is tagged separately
+        for url, accept in [('/api/projects?limit=1', '*/*'), ('/api/projects?fields=id,plan_count', '*/*'),
+                            ('/api/projects', 'application/x-ndjson')]:
+            response = client.get(url, headers={**HEADERS, 'If-None-Match': etag, 'Accept': accept})
+            assert response.status_code == 200 and response.headers['ETag'] != etag, url
+
+        # Embedded counts move the tag when a child row goes away
+        response = client.get('/api/projects?fields=id,plan_count', headers=HEADERS)
+        counted = response.headers['ETag']
+        client.delete('/api/plans/1', headers=HEADERS)
+        response = client.get('/api/projects?fields=id,plan_count', headers={**HEADERS, 'If-None-Match': counted})
+        assert response.status_code == 200 and response.get_json() == [{'id': 1, 'plan_count': 5}]
+        assert client.get('/api/projects', headers={**HEADERS, 'If-None-Match': etag}).status_code == 304
+
+        db.session.get(Project, 1).name = 'Relaunch'
+        db.session.commit()
+        response = client.get('/api/projects', headers={**HEADERS, 'If-None-Match': etag})
+        assert response.status_code == 200 and response.get_json()[0]['name'] == 'Relaunch'
+        assert client.get('/api/projects', headers={**HEADERS, 'If-None-Match': response.headers['ETag']}
+                          ).status_code == 304
+    finally:
+        context.pop()
+
+
+if __name__ == '__main__':
+    test_updated_since_catches_writes_committed_after_the_read()
+    test_deletions_list_orm_and_bulk_deletes()
+    test_etag_round_trip()
+    print('All sync tests passed')
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""The project pages run a fixed number of queries, however much data sits behind them"""
+
+import re
+from datetime import date, timedelta
+
+from app import db
+from app.models import User, Project, Campaign, Plan
+from app.testing import create_test_app, login, query_budget
+
+CAMPAIGNS = 25
+PLANS = 4
+
+
+def make_client():
+    app = create_test_app()
+    context = app.app_context()
+    context.push()
+    user = User(email='viewer@example.com')
+    project = Project(code='PLN-00-001', name='Big Project', client_brand_id=1, created_by=user,
+                      start_date=date(2026, 1, 1), end_date=date(2026, 12, 31))
+    db.session.add(project)
+    for i in range(CAMPAIGNS):
+        campaign = Campaign(code=f'PLN-00-001-{i}', name=f'Campaign {i}', project=project,
+                            start_date=date(2026, 1, 1), end_date=date(2026, 2, 1))
+        db.session.add(campaign)
+        for k in range(PLANS):
+            db.session.add(Plan(name=f'Plan{k + 1}', campaign=campaign, budget=100.0 if k else None))
+    db.session.commit()
+    client = app.test_client()
+    login(client, user)
+    db.session.remove()
+    return context, client
+
+
+def test_project_page_aggregates_in_sql():
+    context, client = make_client()
+    try:
+        # Logged-in user, the project, its campaigns with their aggregates
+        with query_budget(3):
+            response = client.get('/projects/1')
+        assert response.status_code == 200
+        html = response.data.decode()
+        assert f'<strong>Total Campaigns:</strong> {CAMPAIGNS}' in html
+        assert f'<strong>Total Plans:</strong> {CAMPAIGNS * PLANS}' in html
+        assert f'<strong>Total Budget:</strong> €{CAMPAIGNS * (PLANS - 1) * 100:.2f}' in html
+        assert html.count(f'<td>{PLANS}</td>') == CAMPAIGNS
+    finally:
+        context.pop()
+
+
+def test_campaign_page_aggregates_in_sql():
+    context, client = make_client()
+    try:
+        # Logged-in user, the campaign joined to its project, its plans
+        with query_budget(3):
+            response = client.get('/campaigns/2')
+        assert response.status_code == 200
+        html = response.data.decode()
+        assert 'Big Project (PLN-00-001)' in html
+        assert f'<strong>Total Plans:</strong> {PLANS}' in html
+        assert f'<strong>Total Budget:</strong> €{(PLANS - 1) * 100:.2f}' in html
+        assert client.get('/campaigns/999').status_code == 404
+        assert client.get('/projects/999').status_code == 404
+    finally:
+        context.pop()
+
+
+def project_codes(response):
+    return re.findall(r'<td><strong>(PLN-[\d-]+)</strong>', response.data.decode())
+
+
+def link(response, cursor):
+    match = re.search(rf'href="(/projects/\?[^"]*{cursor}=[^"]*)"', response.data.decode())
+    return match and match.group(1).replace('&amp;', '&')
+
+
+def make_list_client(count=23):
+    app = create_test_app(PROJECTS_PER_PAGE=5)
+    context = app.app_context()
+    context.push()
+    user, other = User(email='lister@example.com'), User(email='other@example.com')
+    for i in range(count):
+        # Start dates repeat so keyset ties on the sort column are exercised
+        db.session.add(Project(code=f'PLN-{25 + i % 2}-{i + 1:03d}', name=f'Project {i}',
+                               client_brand_id=1 + i % 3, status='completed' if i % 4 == 0 else 'active',
+                               start_date=date(2026, 1, 1) + timedelta(days=7 * (i // 3)),
+                               end_date=date(2026, 3, 1) + timedelta(days=7 * (i // 3)), created_by=user))
+    db.session.add(Project(code='PLN-25-999', name='Not mine', client_brand_id=1, created_by=other,
+                           start_date=date(2026, 1, 1), end_date=date(2026, 2, 1)))
+    db.session.commit()
+    client = app.test_client()
+    login(client, user)
+    db.session.remove()
+    return context, client
+
+
+def walk(client, url):
+    """Codes of every page reached by following Next from `url`, one budgeted request per page"""
+    codes, pages = [], 0
+    while url:
+        with query_budget(3):
+            response = client.get(url)
+        assert response.status_code == 200
+        codes.extend(project_codes(response))
+        pages += 1
+        url = link(response, 'after')
+    return codes, pages
+
+
+def test_project_list_keyset_pages():
+    context, client = make_list_client()
+    try:
+        for sort in ('-created_at', 'start_date', '-start_date', 'end_date', 'code', '-code'):
+            codes, pages = walk(client, f'/projects/?sort={sort}')
+            assert pages == 5 and len(codes) == 23 and len(set(codes)) == 23, sort
+            assert 'PLN-25-999' not in codes
+        codes, _ = walk(client, '/projects/?sort=code')
+        assert codes == sorted(codes)
+
+        first = client.get('/projects/?sort=start_date')
+        second = client.get(link(first, 'after'))
+        back = client.get(link(second, 'before'))
+        assert project_codes(back) == project_codes(first)
+        assert link(back, 'before') is None
+    finally:
+        context.pop()
+
+
+def test_project_list_filters():
+    context, client = make_list_client()
+    try:
+        codes, _ = walk(client, '/projects/?status=completed')
+        assert len(codes) == 6
+        codes, _ = walk(client, '/projects/?code=pln-26')
+        assert len(codes) == 11 and all(code.startswith('PLN-26-') for code in codes)
+        codes, _ = walk(client, '/projects/?brand=2&sort=end_date')
+        assert codes == [f'PLN-{25 + i % 2}-{i + 1:03d}' for i in range(23) if i % 3 == 1]
+        # Running at some point in the range: the first six ended on March 1 or 8
+        codes, _ = walk(client, '/projects/?from=2026-03-09&to=2026-03-10')
+        assert sorted(codes) == sorted(f'PLN-{25 + i % 2}-{i + 1:03d}' for i in range(6, 23))
+        assert client.get('/projects/?after=not-a-cursor&sort=nonsense&from=junk').status_code == 200
+    finally:
+        context.pop()
+
+
+if __name__ == '__main__':
+    test_project_page_aggregates_in_sql()
+    test_campaign_page_aggregates_in_sql()
+    test_project_list_keyset_pages()
+    test_project_list_filters()
+    print('All view tests passed')
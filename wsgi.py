@@ -0,0 +1,7 @@
+"""WSGI entry point for production servers: gunicorn --config gunicorn.conf.py wsgi:app
+
+Schema changes are not applied here; run `flask db upgrade` before starting.
+"""
+from app import create_app
+
+app = create_app()